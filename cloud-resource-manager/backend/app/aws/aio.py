@@ -0,0 +1,76 @@
+# Async facades over the boto3 helpers
+# app/aws/aio.py
+#
+# Same signatures and return values as the sync helpers in ec2/s3/dynamodb/
+# lambda_fn/metrics; each call runs on the cloud I/O pool with a timeout.
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..concurrency import run_blocking
+from . import dynamodb, ec2, lambda_fn, metrics, s3
+
+
+# ---- EC2 ----
+
+async def create_instance(name: str, region: str, client_token: str | None = None) -> Tuple[str, str]:
+    return await run_blocking(ec2.create_instance, name, region, client_token)
+
+
+async def get_instance_states(instance_ids: Iterable[str], region: str | None = None) -> Dict[str, str]:
+    return await run_blocking(ec2.get_instance_states, list(instance_ids), region)
+
+
+async def terminate_instance(instance_id: str) -> None:
+    return await run_blocking(ec2.terminate_instance, instance_id)
+
+
+# ---- S3 ----
+
+async def create_bucket(name: str, region: str = s3.AWS_REGION, token: str | None = None) -> Tuple[str, str]:
+    return await run_blocking(s3.create_bucket, name, region, token)
+
+
+async def delete_bucket(bucket_name: str, region: str = s3.AWS_REGION) -> bool:
+    return await run_blocking(s3.delete_bucket, bucket_name, region)
+
+
+# ---- DynamoDB ----
+
+async def create_table(name: str, region: str = dynamodb.AWS_REGION, token: str | None = None) -> Tuple[str, str]:
+    return await run_blocking(dynamodb.create_table, name, region, token)
+
+
+async def delete_table(table_name: str, region: str = dynamodb.AWS_REGION) -> bool:
+    return await run_blocking(dynamodb.delete_table, table_name, region)
+
+
+async def get_table_status(table_name: str, region: str = dynamodb.AWS_REGION) -> str | None:
+    return await run_blocking(dynamodb.get_table_status, table_name, region)
+
+
+# ---- Lambda ----
+
+async def create_basic_function(name: str, region: str = lambda_fn.AWS_REGION) -> Tuple[str, str]:
+    # logical-only today, no I/O – no need for a worker thread
+    return lambda_fn.create_basic_function(name, region)
+
+
+# ---- CloudWatch ----
+
+async def get_ec2_cpu_network(
+    instance_id: str,
+    window: int = metrics.DEFAULT_WINDOW,
+    period: int = metrics.DEFAULT_PERIOD,
+) -> List[Dict[str, Any]]:
+    return await run_blocking(metrics.get_ec2_cpu_network, instance_id, window, period)
+
+
+async def get_ec2_fleet_metrics(
+    instance_ids: Iterable[str],
+    window: int = metrics.DEFAULT_WINDOW,
+    period: int = metrics.DEFAULT_PERIOD,
+    statistics: Optional[Dict[str, str]] = None,
+    end: Optional[int] = None,
+) -> Dict[str, Any]:
+    return await run_blocking(metrics.get_ec2_fleet_metrics, list(instance_ids), window, period, statistics, None, end)
@@ -0,0 +1,152 @@
+# Shared boto3 client registry
+# app/aws/clients.py
+#
+# Creating a client loads botocore's service model and builds a new HTTP
+# connection pool, so helpers in app/aws/* share one client per
+# (service, region) instead of calling boto3.client() on every operation.
+# boto3 clients are thread-safe once created; creation itself goes through
+# a lock because boto3 sessions are not.
+#
+# Every client handed out is wrapped in a GuardedClient, so each API call
+# (and each paginator page) passes the rate limiter and circuit breaker
+# for its (service, region) in app/resilience.py.
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, ParamValidationError
+
+from .. import resilience
+
+DEFAULT_REGION = os.getenv("AWS_DEFAULT_REGION", "ap-south-1")
+
+# Connection pool per client; should cover the worker pools that share it
+MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+TCP_KEEPALIVE = os.getenv("AWS_TCP_KEEPALIVE", "1") == "1"
+RETRY_MODE = os.getenv("AWS_RETRY_MODE", "standard")  # "legacy" | "standard" | "adaptive"
+MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "3"))
+
+_lock = threading.Lock()
+_session: boto3.session.Session | None = None
+_clients: Dict[Tuple[str, str], Any] = {}
+
+# Error codes AWS uses to say "slow down"
+THROTTLING_CODES = {
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottledException",
+    "TooManyRequestsException", "ProvisionedThroughputExceededException", "RequestLimitExceeded",
+    "RequestThrottled", "SlowDown", "BandwidthLimitExceeded", "EC2ThrottledException",
+    "PriorRequestNotComplete", "LimitExceededException",
+}
+# Error codes that mean every call will fail, not just this one
+CREDENTIAL_CODES = {
+    "UnrecognizedClientException", "InvalidClientTokenId", "AuthFailure", "ExpiredToken",
+    "ExpiredTokenException", "RequestExpired", "SignatureDoesNotMatch", "InvalidAccessKeyId",
+}
+
+
+def classify(error: BaseException) -> str:
+    """resilience outcome for an exception raised by a boto3 call."""
+    if isinstance(error, ClientError):
+        err = error.response.get("Error", {})
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+        if err.get("Code") in THROTTLING_CODES or status == 429:
+            return resilience.THROTTLED
+        if err.get("Code") in CREDENTIAL_CODES or status >= 500:
+            return resilience.FAILURE
+        return resilience.OK        # NotFound, AlreadyExists, ...: AWS answered
+    if isinstance(error, BotoCoreError) and not isinstance(error, ParamValidationError):
+        return resilience.FAILURE   # no credentials, endpoint unreachable, timeouts
+    return resilience.OK
+
+
+class GuardedPaginator:
+    def __init__(self, paginator: Any, guard: resilience.Guard, operation: str):
+        self._paginator = paginator
+        self._guard = guard
+        self._operation = operation
+
+    def paginate(self, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        # each page is a separate API call, so each goes through the guard
+        pages = iter(self._paginator.paginate(**kwargs))
+        done = object()
+        while True:
+            page = self._guard.run(self._operation, next, pages, done)
+            if page is done:
+                return
+            yield page
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._paginator, name)
+
+
+class GuardedClient:
+    """A boto3 client (or stub) whose API calls go through a resilience.Guard."""
+
+    def __init__(self, client: Any, guard: resilience.Guard):
+        self._client = client
+        self._guard = guard
+        # real clients list their API methods; for stubs, every public method counts
+        meta = getattr(client, "meta", None)
+        self._operations = set(meta.method_to_api_mapping) if meta is not None else None
+
+    def get_paginator(self, operation_name: str) -> GuardedPaginator:
+        return GuardedPaginator(self._client.get_paginator(operation_name), self._guard, operation_name)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        guarded = name in self._operations if self._operations is not None else (
+            callable(attr) and not name.startswith("_")
+        )
+        if not guarded:
+            return attr
+        run: Callable[..., Any] = self._guard.run
+        return lambda *args, **kwargs: run(name, attr, *args, **kwargs)
+
+
+def _guarded(service: str, region: str, client: Any) -> GuardedClient:
+    return GuardedClient(client, resilience.guard("AWS", service, region, classify))
+
+
+def client_config() -> Config:
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        tcp_keepalive=TCP_KEEPALIVE,
+        retries={"mode": RETRY_MODE, "max_attempts": MAX_ATTEMPTS},
+    )
+
+
+def get_client(service: str, region: str | None = None):
+    """Return the shared client for (service, region), creating it on first use."""
+    key = (service, region or DEFAULT_REGION)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    global _session
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            if _session is None:
+                _session = boto3.session.Session()
+            client = _guarded(service, key[1], _session.client(service, region_name=key[1], config=client_config()))
+            _clients[key] = client
+    return client
+
+
+def set_client(service: str, client: Any, region: str | None = None) -> None:
+    """Register a client (e.g. a stub) for (service, region); it is guarded like a real one."""
+    region = region or DEFAULT_REGION
+    with _lock:
+        _clients[(service, region)] = _guarded(service, region, client)
+
+
+def clear_clients() -> None:
+    """Drop every cached client and the session (new credentials, tests, benchmarks)."""
+    global _session
+    with _lock:
+        _clients.clear()
+        _session = None
@@ -1,21 +1,31 @@
 # DynamoDB helper functions
 # app/aws/dynamodb.py
+import logging
 import os
 import uuid
 
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 
+from . import clients
+
+logger = logging.getLogger(__name__)
+
 AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "ap-south-1")
 
 
 def _client(region: str = AWS_REGION):
-    return boto3.client("dynamodb", region_name=region)
+    return clients.get_client("dynamodb", region)
 
 
-def create_table(name: str, region: str = AWS_REGION):
+def create_table(name: str, region: str = AWS_REGION, token: str | None = None):
+    """
+    Create an on-demand table and return (table_name, status).
+    With a token the name suffix comes from it, so a retry with the same
+    token finds its own table instead of creating a second one.
+    """
     dynamo = _client(region)
-    table_name = f"{name.replace(' ', '_')}_{uuid.uuid4().hex[:6]}"
+    suffix = token[:6] if token else uuid.uuid4().hex[:6]
+    table_name = f"{name.replace(' ', '_')}_{suffix}"
 
     try:
         dynamo.create_table(
@@ -30,14 +40,17 @@ def create_table(name: str, region: str = AWS_REGION):
         )
         return table_name, "Creating"
     except (ClientError, NoCredentialsError) as e:
-        print("DynamoDB create failed, using logical-only table:", e)
+        if isinstance(e, ClientError) and e.response.get("Error", {}).get("Code") == "ResourceInUseException":
+            # created by an earlier attempt with the same token
+            return table_name, "Creating"
+        logger.warning("DynamoDB create failed, using logical-only table", extra={"table": table_name, "error": str(e)})
         fake_id = f"aws-ddb-local-{uuid.uuid4().hex[:6]}"
         return fake_id, "NotCreatedInAWS"
 
 
 def delete_table(table_name: str, region: str = AWS_REGION) -> bool:
     if table_name.startswith("aws-ddb-local-"):
-        print("[DynamoDB] Skipping delete for logical-only table:", table_name)
+        logger.info("skipping delete for logical-only table", extra={"table": table_name})
         return True
 
     dynamo = _client(region)
@@ -45,7 +58,7 @@ def delete_table(table_name: str, region: str = AWS_REGION) -> bool:
         dynamo.delete_table(TableName=table_name)
         return True
     except ClientError as e:
-        print("DynamoDB delete failed:", e)
+        logger.warning("DynamoDB delete failed", extra={"table": table_name, "error": str(e)})
         return False
 
 
@@ -58,5 +71,5 @@ def get_table_status(table_name: str, region: str = AWS_REGION) -> str | None:
         resp = dynamo.describe_table(TableName=table_name)
         return resp["Table"]["TableStatus"].capitalize()
     except ClientError as e:
-        print("DynamoDB status check failed:", e)
+        logger.warning("DynamoDB status check failed", extra={"table": table_name, "error": str(e)})
         return None
@@ -1,33 +1,45 @@
 # app/aws/ec2.py
 from __future__ import annotations
 
+import logging
 import os
 from datetime import datetime
-from typing import Tuple
+from typing import Dict, Iterable, List, Tuple
 
-import boto3
 from botocore.exceptions import ClientError
 
+from . import clients
+
+logger = logging.getLogger(__name__)
+
 DEFAULT_REGION = os.getenv("AWS_DEFAULT_REGION", "ap-south-1")
 
 # You can override these from .env if needed
 AMI_ID = os.getenv("AWS_EC2_AMI_ID", "ami-0f58b397bc5c1f2e8")  # check in AWS console
 INSTANCE_TYPE = os.getenv("AWS_EC2_INSTANCE_TYPE", "t3.micro")  # free-tier eligible in most accounts
 
+# describe_instances accepts up to 1000 IDs per call; smaller chunks keep a
+# single bad ID from forcing a large fallback.
+DESCRIBE_CHUNK_SIZE = int(os.getenv("AWS_EC2_DESCRIBE_CHUNK_SIZE", "200"))
+
 
 def _ec2(region: str | None = None):
-    return boto3.client("ec2", region_name=region or DEFAULT_REGION)
+    return clients.get_client("ec2", region or DEFAULT_REGION)
 
 
-def create_instance(name: str, region: str) -> Tuple[str, str]:
+def create_instance(name: str, region: str, client_token: str | None = None) -> Tuple[str, str]:
     """
     Create a single free-tier EC2 instance and return (instance_id, status).
     Status will usually start as 'pending'.
     If AWS rejects the call, we return a logical ID and 'Error' so UI still works.
+    Repeating a call with the same client_token returns the same instance
+    instead of launching another one.
     """
     client = _ec2(region)
+    extra = {"ClientToken": client_token} if client_token else {}
     try:
         resp = client.run_instances(
+            **extra,
             ImageId=AMI_ID,
             InstanceType=INSTANCE_TYPE,
             MinCount=1,
@@ -44,23 +56,23 @@ def create_instance(name: str, region: str) -> Tuple[str, str]:
         )
         instance = resp["Instances"][0]
         instance_id = instance["InstanceId"]
-        print(f"[EC2] Created instance {instance_id} in {region}")
+        logger.info("created instance", extra={"instance_id": instance_id, "region": region})
         return instance_id, "pending"
     except ClientError as e:
         # Log the exact AWS error, but don't crash the API
-        print("[EC2] create_instance failed:", e)
+        logger.warning("create_instance failed", extra={"region": region, "error": str(e)})
         logical_id = f"ec2-error-{datetime.utcnow().isoformat()}"
         return logical_id, "Error"
 
 
-def get_instance_state(instance_id: str) -> str | None:
+def get_instance_state(instance_id: str, region: str | None = None) -> str | None:
     """
     Return EC2 state: 'pending', 'running', 'stopping', 'stopped', 'terminated', etc.
     """
     if not instance_id or instance_id.startswith("ec2-error-"):
         return None
 
-    client = _ec2(None)
+    client = _ec2(region)
     try:
         resp = client.describe_instances(InstanceIds=[instance_id])
         reservations = resp.get("Reservations", [])
@@ -69,10 +81,44 @@ def get_instance_state(instance_id: str) -> str | None:
         inst = reservations[0]["Instances"][0]
         return inst["State"]["Name"]
     except ClientError as e:
-        print("[EC2] get_instance_state failed:", e)
+        logger.warning("get_instance_state failed", extra={"instance_id": instance_id, "error": str(e)})
         return None
 
 
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def get_instance_states(instance_ids: Iterable[str], region: str | None = None) -> Dict[str, str]:
+    """
+    Batched version of get_instance_state.
+    Looks up many instances with one describe_instances call per chunk and
+    returns {instance_id: state}. IDs AWS doesn't know about are left out.
+    If a chunk is rejected (e.g. one ID no longer exists), that chunk falls
+    back to per-instance lookups so the other IDs still resolve.
+    """
+    ids = [i for i in dict.fromkeys(instance_ids) if i and not i.startswith("ec2-error-")]
+    if not ids:
+        return {}
+
+    client = _ec2(region)
+    states: Dict[str, str] = {}
+    for chunk in _chunks(ids, DESCRIBE_CHUNK_SIZE):
+        try:
+            resp = client.describe_instances(InstanceIds=chunk)
+            for reservation in resp.get("Reservations", []):
+                for inst in reservation.get("Instances", []):
+                    states[inst["InstanceId"]] = inst["State"]["Name"]
+        except ClientError as e:
+            logger.warning("batched describe failed, retrying one by one", extra={"ids": len(chunk), "error": str(e)})
+            for instance_id in chunk:
+                state = get_instance_state(instance_id, region)
+                if state:
+                    states[instance_id] = state
+    return states
+
+
 def terminate_instance(instance_id: str) -> None:
     """
     Terminate a running instance. If it fails, we just log.
@@ -83,6 +129,6 @@ def terminate_instance(instance_id: str) -> None:
     client = _ec2(None)
     try:
         client.terminate_instances(InstanceIds=[instance_id])
-        print(f"[EC2] Terminate called for {instance_id}")
+        logger.info("terminate called", extra={"instance_id": instance_id})
     except ClientError as e:
-        print("[EC2] terminate_instance failed:", e)
+        logger.warning("terminate_instance failed", extra={"instance_id": instance_id, "error": str(e)})
@@ -1,23 +1,152 @@
 # app/aws/metrics.py
 from __future__ import annotations
 
+import logging
 import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable, Optional
 
-import boto3
 from botocore.exceptions import ClientError
 
+from . import clients
+
+logger = logging.getLogger(__name__)
+
 DEFAULT_REGION = os.getenv("AWS_DEFAULT_REGION", "ap-south-1")
 
+DEFAULT_WINDOW = 2 * 60 * 60  # last 2 hours
+DEFAULT_PERIOD = 300          # 5 min points (CloudWatch basic resolution)
+
+# CloudWatch metric -> (column name, default statistic)
+EC2_METRICS = {
+    "CPUUtilization": ("cpu", "Average"),
+    "NetworkIn": ("networkIn", "Sum"),
+    "NetworkOut": ("networkOut", "Sum"),
+}
+STATISTICS = ("Average", "Sum", "Minimum", "Maximum", "SampleCount")
+
+# GetMetricData takes at most 500 queries per request
+MAX_QUERIES_PER_CALL = 500
+
 
 def _cloudwatch(region: str | None = None):
-    return boto3.client("cloudwatch", region_name=region or DEFAULT_REGION)
+    return clients.get_client("cloudwatch", region or DEFAULT_REGION)
+
+
+def iso_utc(epoch: int) -> str:
+    # naive UTC, same format as datetime.utcnow().isoformat() elsewhere
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def time_axis(window: int, period: int, end: Optional[int] = None) -> tuple:
+    """(start epoch, number of slots) for the last `window` seconds, aligned to `period`."""
+    if end is None:
+        end = int(datetime.now(timezone.utc).timestamp())
+    end = end // period * period
+    slots = window // period
+    return end - slots * period, slots
+
+
+def estimate_memory(cpu: Optional[float]) -> Optional[float]:
+    # EC2 doesn't give Memory usage by default → make a simple estimate
+    # so the second chart is not empty (this part is 'derived', not real).
+    return None if cpu is None else min(100.0, cpu * 0.6 + 20.0)
 
 
-def get_ec2_cpu_network(instance_id: str) -> List[Dict[str, Any]]:
+def get_ec2_fleet_metrics(
+    instance_ids: Iterable[str],
+    window: int = DEFAULT_WINDOW,
+    period: int = DEFAULT_PERIOD,
+    statistics: Optional[Dict[str, str]] = None,
+    region: str | None = None,
+    end: Optional[int] = None,
+) -> Dict[str, Any]:
     """
-    Fetch real CloudWatch metrics for a single EC2 instance.
+    CPU / NetworkIn / NetworkOut for many instances with GetMetricData
+    (3 queries per instance, up to 500 queries per request, paginated).
+
+    Returns column-oriented data on one shared time axis:
+      {
+        "period": 300,
+        "timestamps": [iso, ...],
+        "series": {instance_id: {"cpu": [..], "memory": [..], "networkIn": [..], "networkOut": [..]}},
+      }
+    Each column has one slot per timestamp; None where CloudWatch had no point.
+    `statistics` overrides the statistic per CloudWatch metric name; `end`
+    (epoch seconds, default now) pins the axis so callers can line up other data.
+    Raises ClientError on API failure.
+    """
+    ids = [i for i in dict.fromkeys(instance_ids) if i and not i.startswith("ec2-error-")]
+    stats = {name: stat for name, (_, stat) in EC2_METRICS.items()}
+    stats.update(statistics or {})
+
+    # period-aligned axis so every instance's points land in the same slots
+    start_epoch, slots = time_axis(window, period, end)
+    end_epoch = start_epoch + slots * period
+    series: Dict[str, Dict[str, List[Optional[float]]]] = {
+        iid: {col: [None] * slots for col, _ in EC2_METRICS.values()} for iid in ids
+    }
+
+    if ids:
+        cw = _cloudwatch(region)
+        paginator = cw.get_paginator("get_metric_data")
+        per_call = MAX_QUERIES_PER_CALL // len(EC2_METRICS)
+        for chunk_start in range(0, len(ids), per_call):
+            chunk = ids[chunk_start:chunk_start + per_call]
+            # query id -> (instance id, column); ids must match [a-z][a-zA-Z0-9_]*
+            targets: Dict[str, tuple] = {}
+            queries = []
+            for n, iid in enumerate(chunk):
+                for m, (metric, (col, _)) in enumerate(EC2_METRICS.items()):
+                    qid = f"q{n}_{m}"
+                    targets[qid] = (iid, col)
+                    queries.append({
+                        "Id": qid,
+                        "MetricStat": {
+                            "Metric": {
+                                "Namespace": "AWS/EC2",
+                                "MetricName": metric,
+                                "Dimensions": [{"Name": "InstanceId", "Value": iid}],
+                            },
+                            "Period": period,
+                            "Stat": stats[metric],
+                        },
+                        "ReturnData": True,
+                    })
+
+            pages = paginator.paginate(
+                MetricDataQueries=queries,
+                StartTime=datetime.fromtimestamp(start_epoch, timezone.utc),
+                EndTime=datetime.fromtimestamp(end_epoch, timezone.utc),
+                ScanBy="TimestampAscending",
+            )
+            for page in pages:
+                for result in page.get("MetricDataResults", []):
+                    iid, col = targets[result["Id"]]
+                    column = series[iid][col]
+                    for ts, value in zip(result.get("Timestamps", []), result.get("Values", [])):
+                        slot = (int(ts.timestamp()) - start_epoch) // period
+                        if 0 <= slot < slots:
+                            column[slot] = float(value)
+
+    for cols in series.values():
+        cols["memory"] = [estimate_memory(v) for v in cols["cpu"]]
+
+    return {
+        "period": period,
+        "timestamps": [iso_utc(start_epoch + i * period) for i in range(slots)],
+        "series": series,
+    }
+
+
+def get_ec2_cpu_network(
+    instance_id: str,
+    window: int = DEFAULT_WINDOW,
+    period: int = DEFAULT_PERIOD,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch real CloudWatch metrics for a single EC2 instance over the last
+    `window` seconds at `period`-second resolution.
     Returns list of dicts:
       { "time": iso, "cpu": float, "memory": float, "networkIn": float, "networkOut": float }
     Memory is estimated (EC2 doesn't expose it natively without CW Agent).
@@ -25,68 +154,27 @@ def get_ec2_cpu_network(instance_id: str) -> List[Dict[str, Any]]:
     if not instance_id or instance_id.startswith("ec2-error-"):
         return []
 
-    cw = _cloudwatch(None)
-
-    end = datetime.utcnow()
-    start = end - timedelta(hours=2)  # last 2 hours
-    period = 300  # 5 min points (CloudWatch basic resolution)
-
-    def fetch(metric_name: str, stat: str) -> List[Dict[str, Any]]:
-        resp = cw.get_metric_statistics(
-            Namespace="AWS/EC2",
-            MetricName=metric_name,
-            Dimensions=[{"Name": "InstanceId", "Value": instance_id}],
-            StartTime=start,
-            EndTime=end,
-            Period=period,
-            Statistics=[stat],
-        )
-        return resp.get("Datapoints", [])
-
     try:
-        cpu_points = fetch("CPUUtilization", "Average")
-        net_in_points = fetch("NetworkIn", "Sum")
-        net_out_points = fetch("NetworkOut", "Sum")
+        data = get_ec2_fleet_metrics([instance_id], window, period)
     except ClientError as e:
-        print("[CW] get_ec2_cpu_network failed:", e)
+        logger.warning("get_ec2_cpu_network failed", extra={"instance_id": instance_id, "error": str(e)})
         return []
 
-    # Index by timestamp to merge metrics
-    by_ts: Dict[datetime, Dict[str, Any]] = {}
-
-    for p in cpu_points:
-        ts = p["Timestamp"]
-        by_ts.setdefault(ts, {})["cpu"] = float(p.get("Average", 0.0))
-
-    for p in net_in_points:
-        ts = p["Timestamp"]
-        by_ts.setdefault(ts, {})["networkIn"] = float(p.get("Sum", 0.0))
-
-    for p in net_out_points:
-        ts = p["Timestamp"]
-        by_ts.setdefault(ts, {})["networkOut"] = float(p.get("Sum", 0.0))
-
-    # Build final list, sorted by time
+    cols = data["series"][instance_id]
     result: List[Dict[str, Any]] = []
-    for ts in sorted(by_ts.keys()):
-        entry = by_ts[ts]
-        cpu = float(entry.get("cpu", 0.0))
-        net_in = float(entry.get("networkIn", 0.0))
-        net_out = float(entry.get("networkOut", 0.0))
-
-        # EC2 doesn't give Memory usage by default → make a simple estimate
-        # so the second chart is not empty (this part is 'derived', not real).
-        memory = min(100.0, cpu * 0.6 + 20.0)
-
+    for i, ts in enumerate(data["timestamps"]):
+        cpu, net_in, net_out = cols["cpu"][i], cols["networkIn"][i], cols["networkOut"][i]
+        if cpu is None and net_in is None and net_out is None:
+            continue
         result.append(
             {
-                "time": ts.isoformat(),
-                "cpu": cpu,
-                "memory": memory,
-                "networkIn": net_in,
-                "networkOut": net_out,
+                "time": ts,
+                "cpu": cpu or 0.0,
+                "memory": estimate_memory(cpu or 0.0),
+                "networkIn": net_in or 0.0,
+                "networkOut": net_out or 0.0,
             }
         )
 
-    print(f"[CW] Loaded {len(result)} points for {instance_id}")
+    logger.debug("loaded CloudWatch points", extra={"instance_id": instance_id, "points": len(result)})
     return result
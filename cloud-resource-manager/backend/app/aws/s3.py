@@ -1,21 +1,31 @@
 # S3 helper functions
 # app/aws/s3.py
+import logging
 import os
 import uuid
 
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 
+from . import clients
+
+logger = logging.getLogger(__name__)
+
 AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "ap-south-1")
 
 
 def _client(region: str = AWS_REGION):
-    return boto3.client("s3", region_name=region)
+    return clients.get_client("s3", region)
 
 
-def create_bucket(name: str, region: str = AWS_REGION):
+def create_bucket(name: str, region: str = AWS_REGION, token: str | None = None):
+    """
+    Create a bucket and return (bucket_name, status).
+    With a token the name suffix comes from it, so a retry with the same
+    token finds its own bucket instead of creating a second one.
+    """
     s3 = _client(region)
-    bucket_name = f"{name.lower()}-{uuid.uuid4().hex[:8]}"
+    suffix = token[:8] if token else uuid.uuid4().hex[:8]
+    bucket_name = f"{name.lower()}-{suffix}"
 
     try:
         if region == "us-east-1":
@@ -27,23 +37,56 @@ def create_bucket(name: str, region: str = AWS_REGION):
             )
         return bucket_name, "Running"
     except (ClientError, NoCredentialsError) as e:
-        print("S3 create failed, using logical-only bucket:", e)
+        if isinstance(e, ClientError) and e.response.get("Error", {}).get("Code") == "BucketAlreadyOwnedByYou":
+            # created by an earlier attempt with the same token
+            return bucket_name, "Running"
+        logger.warning("S3 create failed, using logical-only bucket", extra={"bucket": bucket_name, "error": str(e)})
         fake_id = f"aws-s3-local-{uuid.uuid4().hex[:8]}"
         return fake_id, "NotCreatedInAWS"
 
 
+# DeleteObjects accepts at most this many keys per call
+DELETE_BATCH_SIZE = 1000
+
+
+def empty_bucket(bucket_name: str, region: str = AWS_REGION) -> int:
+    """
+    Delete every object in the bucket, one DeleteObjects call per listing
+    page (ListObjectsV2 pages are at most 1,000 keys, the DeleteObjects cap).
+    Returns the number of objects deleted; raises ClientError if any key
+    could not be deleted.
+    """
+    s3 = _client(region)
+    deleted = 0
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, PaginationConfig={"PageSize": DELETE_BATCH_SIZE}):
+        keys = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+        for i in range(0, len(keys), DELETE_BATCH_SIZE):
+            chunk = keys[i:i + DELETE_BATCH_SIZE]
+            resp = s3.delete_objects(Bucket=bucket_name, Delete={"Objects": chunk, "Quiet": True})
+            errors = resp.get("Errors", [])
+            if errors:
+                first = errors[0]
+                raise ClientError(
+                    {"Error": {"Code": first.get("Code", "DeleteObjectsFailed"),
+                               "Message": f"{len(errors)} key(s) not deleted, e.g. {first.get('Key')}: "
+                                          f"{first.get('Message', '')}"}},
+                    "DeleteObjects",
+                )
+            deleted += len(chunk)
+    return deleted
+
+
 def delete_bucket(bucket_name: str, region: str = AWS_REGION) -> bool:
     if bucket_name.startswith("aws-s3-local-"):
-        print("[S3] Skipping delete for logical-only bucket:", bucket_name)
+        logger.info("skipping delete for logical-only bucket", extra={"bucket": bucket_name})
         return True
 
     s3 = _client(region)
     try:
-        resp = s3.list_objects_v2(Bucket=bucket_name)
-        for obj in resp.get("Contents", []):
-            s3.delete_object(Bucket=bucket_name, Key=obj["Key"])
+        empty_bucket(bucket_name, region)
         s3.delete_bucket(Bucket=bucket_name)
         return True
     except ClientError as e:
-        print("S3 delete failed:", e)
+        logger.warning("S3 delete failed", extra={"bucket": bucket_name, "error": str(e)})
         return False
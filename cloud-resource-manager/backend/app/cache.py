@@ -0,0 +1,143 @@
+# In-process TTL + LRU cache with request coalescing
+# app/cache.py
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from . import telemetry
+
+
+def aligned_expiry(period: float, now: float | None = None, lag: float = 0.0) -> float:
+    """
+    Wall-clock time of the next `period` boundary (+ lag). CloudWatch
+    publishes one point per period, so anything cached before the boundary
+    is still current until then.
+    """
+    now = time.time() if now is None else now
+    return (now // period + 1) * period + lag
+
+
+class TTLCache:
+    """
+    Async cache keyed by any hashable. Entries expire at an absolute time
+    chosen by the caller and the least recently used entry is evicted once
+    `max_entries` is reached.
+
+    Concurrent misses for the same key share one in-flight load; if the
+    load raises, every waiter gets the exception and nothing is cached.
+
+    A cache created with a `name` is exported as cache_* metrics.
+    """
+
+    def __init__(self, max_entries: int = 1024, name: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0     # misses that waited on someone else's load
+        self.evictions = 0     # dropped to stay under max_entries
+        self.expirations = 0   # found stale on lookup
+        if name:
+            _named[name] = self
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """(found, value) without loading; counts as a hit or miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return False, None
+
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        load: Callable[[], Awaitable[Any]],
+        expires_at: Callable[[], float],
+    ) -> Any:
+        """
+        Return the cached value or run `load()` once for all concurrent
+        callers. `expires_at()` is evaluated when the load finishes.
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+        else:
+            fut = asyncio.ensure_future(self._load(key, load, expires_at))
+            self._inflight[key] = fut
+        # shield: a caller that goes away mustn't cancel the load for the others
+        return await asyncio.shield(fut)
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[Any]], expires_at: Callable[[], float]) -> Any:
+        try:
+            value = await load()
+            self.set(key, value, expires_at())
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxEntries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_named: Dict[str, TTLCache] = {}
+
+telemetry.Counter(
+    "cache_lookups_total", "Cache lookups by result (hit, miss, coalesced).", ("cache", "result"),
+    collect=lambda: {
+        (name, result): getattr(c, attr)
+        for name, c in _named.items()
+        for result, attr in (("hit", "hits"), ("miss", "misses"), ("coalesced", "coalesced"))
+    },
+)
+telemetry.Gauge(
+    "cache_hit_ratio", "Hits over lookups since startup.", ("cache",),
+    collect=lambda: {(name,): c.stats()["hitRatio"] for name, c in _named.items()},
+)
+telemetry.Gauge(
+    "cache_entries", "Entries currently cached.", ("cache",),
+    collect=lambda: {(name,): len(c._entries) for name, c in _named.items()},
+)
+
+# CloudWatch series from one GetMetricData request (providers/aws.py). An entry
+# covers a whole fleet of instances, keyed by ("fleet", instance ids, window,
+# period, statistics, end of the time axis), and expires at the next period.
+metrics_cache = TTLCache(max_entries=int(os.getenv("METRICS_CACHE_SIZE", "1024")), name="metrics")
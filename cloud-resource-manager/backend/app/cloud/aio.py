@@ -0,0 +1,20 @@
+# Async entry points for the GCP / Azure mocks
+# app/cloud/aio.py
+#
+# The mocks do no I/O, so they run inline; these exist so callers can treat
+# every provider the same way (await, gather, timeouts).
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+from . import azure_mock, gcp_mock
+
+_MOCKS = {"GCP": gcp_mock, "Azure": azure_mock}
+
+
+async def create_resource(provider: str, name: str, rtype: str, region: str) -> Tuple[str, str]:
+    return _MOCKS[provider].create_resource(name, rtype, region)
+
+
+async def generate_metrics(provider: str) -> List[Dict]:
+    return _MOCKS[provider].generate_metrics()
@@ -0,0 +1,86 @@
+# Helpers for running blocking cloud SDK calls from async code
+# app/concurrency.py
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Iterable, List, TypeVar
+
+from . import telemetry
+
+T = TypeVar("T")
+
+# boto3 is blocking, so its calls run here instead of on Starlette's shared
+# threadpool. A pile of slow provisioning calls can fill this pool, but it
+# can't starve request handling (/health etc.) the way sync routes could.
+CLOUD_IO_WORKERS = int(os.getenv("CLOUD_IO_WORKERS", "32"))
+CLOUD_CALL_TIMEOUT = float(os.getenv("CLOUD_CALL_TIMEOUT", "30"))  # seconds
+
+cloud_executor = ThreadPoolExecutor(max_workers=CLOUD_IO_WORKERS, thread_name_prefix="cloud-io")
+
+_pending = 0                # submitted to cloud_executor and not finished
+_running = 0                # of those, picked up by a worker thread
+_count_lock = threading.Lock()
+
+
+def _run_counted(ctx: contextvars.Context, call: Callable[[], T]) -> T:
+    global _running
+    with _count_lock:
+        _running += 1
+    try:
+        # in the caller's context, so logs from the worker carry its request id
+        return ctx.run(call)
+    finally:
+        with _count_lock:
+            _running -= 1
+
+
+def _cloud_threads():
+    return {
+        ("cloud-io", "max"): CLOUD_IO_WORKERS,
+        ("cloud-io", "busy"): _running,
+        ("cloud-io", "queued"): _pending - _running,
+    }
+
+
+telemetry.threadpool(_cloud_threads)
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, timeout: float | None = None, **kwargs: Any) -> T:
+    """
+    Run a blocking call on the cloud I/O pool and await it.
+    Raises asyncio.TimeoutError after `timeout` seconds (CLOUD_CALL_TIMEOUT by
+    default). The worker thread can't be interrupted and finishes in the
+    background, but the caller stops waiting for it.
+    """
+    global _pending
+    with _count_lock:
+        _pending += 1
+    work = cloud_executor.submit(_run_counted, contextvars.copy_context(), functools.partial(fn, *args, **kwargs))
+    # on the executor's future: it finishes when the thread does, even if we stop waiting
+    work.add_done_callback(_finished)
+    return await asyncio.wait_for(asyncio.wrap_future(work), timeout if timeout is not None else CLOUD_CALL_TIMEOUT)
+
+
+def _finished(_work: "Future[Any]") -> None:
+    global _pending
+    with _count_lock:
+        _pending -= 1
+
+
+async def gather_limited(aws: Iterable[Awaitable[T]], limit: int) -> List[T | BaseException]:
+    """
+    asyncio.gather with at most `limit` awaitables running at once.
+    Exceptions are returned in place of results, like return_exceptions=True.
+    """
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def run(aw: Awaitable[T]) -> T:
+        async with sem:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=True)
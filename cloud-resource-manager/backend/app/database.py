@@ -1,28 +1,141 @@
 # SQLAlchemy DB setup (we will fill this)
 # app/database.py
-from sqlalchemy import create_engine
+import os
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./cloudmgr.db"
+from . import telemetry
+
+load_dotenv()  # engines are created at import, before main.py loads .env
+
+# A SQLite URL: the schema and queries are SQLite-specific (sync triggers,
+# FTS5, partial indexes, ON CONFLICT upserts, json_each), so other backends
+# are refused at startup. The async routes use the same database through
+# aiosqlite (ASYNC_DATABASE_URL, or derived from DATABASE_URL).
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./cloudmgr.db")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+
+# Connection pool (per engine)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))       # seconds to wait for a connection
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))       # seconds; -1 = never
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+# SQLite connection settings. WAL lets readers run alongside the single
+# writer, and busy_timeout makes a writer wait for the lock instead of
+# failing with "database is locked".
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")   # safe with WAL
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite"}
+
+
+def _check_backend(url: str | URL) -> URL:
+    u = make_url(url)
+    if u.get_backend_name() != "sqlite":
+        raise ValueError(
+            f"Unsupported database {u.get_backend_name()!r} in {u.render_as_string(hide_password=True)}: "
+            "the schema and queries are written for SQLite; use a sqlite:/// URL"
+        )
+    return u
 
-# For SQLite + FastAPI, we need this flag
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
 
+def async_url_for(url: str | URL) -> URL:
+    """The async-driver form of a sync database URL."""
+    u = _check_backend(url)
+    return u.set(drivername=_ASYNC_DRIVERS.get(u.get_backend_name(), u.drivername))
+
+
+def engine_options(url: str | URL) -> Dict[str, Any]:
+    """create_engine() keyword arguments for `url` from the settings above."""
+    u = _check_backend(url)
+    opts: Dict[str, Any] = {"echo": ECHO, "pool_pre_ping": POOL_PRE_PING}
+    if u.get_backend_name() == "sqlite":
+        # the sqlite3 module's own lock wait; busy_timeout below covers aiosqlite too
+        opts["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if u.database in (None, "", ":memory:"):
+            # one shared in-memory connection: pool sizing doesn't apply
+            return opts
+    opts.update(
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+    )
+    return opts
+
+
+def _set_sqlite_pragmas(dbapi_conn, _record) -> None:
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    finally:
+        cur.close()
+
+
+def make_engine(url: str | URL = SQLALCHEMY_DATABASE_URL):
+    """Sync engine with the pool and SQLite settings applied."""
+    eng = create_engine(url, **engine_options(url))
+    if eng.dialect.name == "sqlite":
+        event.listen(eng, "connect", _set_sqlite_pragmas)
+    telemetry.instrument_engine(eng)
+    return eng
+
+
+def make_async_engine(url: str | URL | None = None):
+    """Async engine for `url` (default: ASYNC_DATABASE_URL, or the async form of DATABASE_URL)."""
+    url = url or ASYNC_DATABASE_URL or async_url_for(SQLALCHEMY_DATABASE_URL)
+    eng = create_async_engine(url, **engine_options(url))
+    if eng.dialect.name == "sqlite":
+        event.listen(eng.sync_engine, "connect", _set_sqlite_pragmas)
+    telemetry.instrument_engine(eng.sync_engine)
+    return eng
+
+
+engine = make_engine()
+
+# Sync sessions: migrations, scripts and benchmarks
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = make_async_engine()
+
+# expire_on_commit=False: attributes stay loaded after commit, so building a
+# response never triggers an implicit (and in async, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
-def get_db():
+def _pool_stats() -> Dict[tuple, float]:
+    out = {}
+    for name, eng in (("sync", engine), ("async", async_engine.sync_engine)):
+        pool = eng.pool
+        if hasattr(pool, "checkedout"):
+            out[(name, "checked_out")] = pool.checkedout()
+            out[(name, "size")] = pool.size()
+    return out
+
+
+telemetry.Gauge("db_pool_connections", "Connections per engine pool: size and checked out.", ("engine", "state"),
+                collect=_pool_stats)
+
+
+async def get_db():
     """
     Dependency for FastAPI routes.
-    Opens a DB session for each request and closes it afterwards.
+    Opens an async DB session for each request and closes it afterwards.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,83 @@
+# Structured logging
+# app/log.py
+"""
+App modules log through `logging.getLogger(__name__)`; setup() sends the
+"app" logger tree to stderr as one JSON object per line (LOG_FORMAT=json)
+or as readable text (LOG_FORMAT=text). Every record carries the id of
+the HTTP request it was logged under (request_id, set by
+telemetry.TelemetryMiddleware and returned as X-Request-ID), and any
+`extra={...}` fields become top-level keys.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()  # read at import, before main.py loads .env
+
+LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+FORMAT = os.getenv("LOG_FORMAT", "json")   # "json" | "text"
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not `extra` fields
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp the current request id on the record (runs in the logging thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+def _extras(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in record.__dict__.items() if k not in _STANDARD and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            out["request_id"] = record.request_id
+        out.update(_extras(record))
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        ts = datetime.fromtimestamp(record.created, timezone.utc).strftime("%H:%M:%S.%f")[:-3]
+        rid = f" [{record.request_id}]" if getattr(record, "request_id", None) else ""
+        extras = "".join(f" {k}={v}" for k, v in _extras(record).items())
+        line = f"{ts} {record.levelname:<7} {record.name}{rid} {record.getMessage()}{extras}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def setup(level: str = LEVEL, fmt: str = FORMAT) -> None:
+    """Configure the "app" logger once; later calls are no-ops."""
+    logger = logging.getLogger("app")
+    if any(isinstance(h.formatter, (JsonFormatter, TextFormatter)) for h in logger.handlers):
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+    handler.addFilter(RequestIdFilter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
@@ -1,22 +1,81 @@
 # app/main.py
-from datetime import datetime, timedelta
-from typing import List
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Literal, Optional
 
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Body, Depends, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
 
-from .database import Base, engine, get_db
-from . import models, schemas
-from .aws import ec2, s3, dynamodb, lambda_fn, metrics as aws_metrics
-from .cloud import gcp_mock, azure_mock
+from .concurrency import gather_limited
+from .database import AsyncSessionLocal, engine, get_db
+from . import log, migrations, models, profiler, providers, resilience, schemas, queries, search, sync, telemetry, tracing
+from .aws import metrics as aws_metrics
+from .cache import metrics_cache
+from .services import aggregation, alerts, audit, cost, events, jobs, ledger, metrics_store, monitoring, reconciler as status_reconciler
 
-load_dotenv()
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Cloud Resource Manager API")
+load_dotenv()
+log.setup()
+
+# Largest array accepted by the /resources:batch endpoints
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+# Most resource ids accepted by /metrics/fleet
+FLEET_MAX_IDS = int(os.getenv("FLEET_MAX_IDS", "500"))
+# Cloud calls in flight at once for one batch request (/resources:batch)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CLOUD_CONCURRENCY", "8"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # schema changes are a separate step (python -m app.migrations); refuse an old schema
+    migrations.ensure_current(engine)
+    # cost rollups are maintained incrementally; start from an exact recount
+    async with AsyncSessionLocal() as db:
+        await cost.rebuild(db)
+        await alerts.on_cost(db)
+        await db.commit()
+    # delta sync forgets deletes older than SYNC_TOMBSTONE_DAYS
+    sync.pruner.start()
+    # Cloud statuses are refreshed in the background, not per request
+    if status_reconciler.ENABLED:
+        status_reconciler.reconciler.start()
+    # audit entries are batched by one writer; started before anything records
+    audit.writer.start()
+    # provisioning workers (also resumes jobs left over from a previous run)
+    await jobs.queue.start()
+    if metrics_store.ENABLED:
+        metrics_store.collector.start()
+    if ledger.ENABLED:
+        ledger.ledger.start()
+    if audit.ARCHIVE_ENABLED:
+        audit.archiver.start()
+    if search.INDEXER_ENABLED:
+        search.indexer.start()
+    yield
+    await search.indexer.stop()
+    await sync.pruner.stop()
+    await audit.archiver.stop()
+    await ledger.ledger.stop()
+    await metrics_store.collector.stop()
+    await jobs.queue.stop()
+    await status_reconciler.reconciler.stop()
+    # last: drains entries recorded by the tasks above
+    await audit.writer.stop()
+
+
+app = FastAPI(title="Cloud Resource Manager API", lifespan=lifespan)
+# before any route is declared: splits traced requests into dependencies / endpoint / serialize
+app.router.route_class = tracing.TracedRoute
 
 # -----------------------------------------------------
 # CORS for React/Vite frontend
@@ -33,34 +92,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Sync-Version", "X-Request-ID", "X-Debug-Trace"],
 )
+# outermost: times the whole request (CORS included), sets the request id and traces
+if telemetry.ENABLED:
+    app.add_middleware(telemetry.TelemetryMiddleware)
 
 
 @app.get("/health")
-def health_check():
-    return {"status": "ok"}
+async def health_check():
+    """
+    Always 200 while the API is up. "degraded" while any provider circuit
+    breaker is open; `breakers` has one entry per (provider, service, region)
+    called so far.
+    """
+    breakers = resilience.snapshot()
+    degraded = any(b["state"] != "closed" for b in breakers)
+    return {"status": "degraded" if degraded else "ok", "breakers": breakers}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text format 0.0.4); see app/telemetry.py for the series."""
+    if not telemetry.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(telemetry.render(), media_type=telemetry.CONTENT_TYPE)
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse, include_in_schema=False)
+async def debug_profile(
+    seconds: float = Query(10, gt=0, le=profiler.MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000, description="Milliseconds between samples"),
+    idle: bool = Query(False, description="Keep samples of threads waiting for work"),
+):
+    """
+    Sample every thread's stack for `seconds` and return them as folded
+    stacks (flamegraph.pl, speedscope, inferno). PROFILER_ENABLED=1 only.
+    """
+    if not profiler.ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+    try:
+        folded = await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000, idle)
+    except profiler.ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(folded)
 
 
 # -----------------------------------------------------
 # Helpers
 # -----------------------------------------------------
-def estimate_inr_cost(provider: str, rtype: str) -> float:
-    if provider == "AWS":
-        if rtype == "VM":
-            return 800.0
-        if rtype == "Storage":
-            return 50.0
-        if rtype == "Database":
-            return 300.0
-        if rtype == "Serverless":
-            return 50.0
-        if rtype == "Load Balancer":
-            return 200.0
-    if provider in ("GCP", "Azure"):
-        return 900.0
-    return 0.0
-
-
 def generate_mock_metrics(num_points: int = 24) -> List[schemas.MetricPoint]:
     now = datetime.utcnow()
     points: List[schemas.MetricPoint] = []
@@ -82,225 +162,219 @@ def generate_mock_metrics(num_points: int = 24) -> List[schemas.MetricPoint]:
     return points
 
 
-# -----------------------------------------------------
-# Resources (CRUD)
-# -----------------------------------------------------
-@app.get("/resources", response_model=list[schemas.ResourceBase])
-def list_resources(db: Session = Depends(get_db)):
-    resources = db.query(models.Resource).all()
-
-    # --- Refresh AWS statuses and normalise them ---
-    for r in resources:
-        if r.provider != "AWS":
-            continue
+def epoch_seconds(dt: datetime) -> int:
+    # naive datetimes are UTC throughout the app
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
 
-        try:
-            # EC2 instances
-            if r.type == "VM":
-                state = ec2.get_instance_state(r.external_id or "")
-
-                # Map raw EC2 states to our friendly statuses
-                state_map = {
-                    "pending": "Running",       # treat as up for UI
-                    "running": "Running",
-                    "stopping": "Stopped",
-                    "stopped": "Stopped",
-                    "shutting-down": "Stopped",
-                    "terminated": "Terminated",
-                }
-                mapped = state_map.get(state.lower(), r.status or "Unknown") if state else r.status
-
-                if mapped and mapped != r.status:
-                    r.status = mapped
-                    r.updated_at = datetime.utcnow()
-
-            # DynamoDB tables
-            elif r.type == "Database":
-                raw = dynamodb.get_table_status(r.external_id or "")
-                # DynamoDB statuses (simplified)
-                table_map = {
-                    "creating": "Running",
-                    "updating": "Running",
-                    "active": "Running",
-                    "deleting": "Deleted",
-                }
-                mapped = table_map.get(raw.lower(), r.status or "Unknown") if raw else r.status
-                if mapped and mapped != r.status:
-                    r.status = mapped
-                    r.updated_at = datetime.utcnow()
-
-            # S3 storage – if it exists we treat as Running
-            elif r.type == "Storage":
-                if r.status != "Running":
-                    r.status = "Running"
-                    r.updated_at = datetime.utcnow()
 
-        except Exception as e:
-            # If AWS is unreachable / credentials issue etc
-            print("Status refresh failed:", r.id, r.external_id, "->", e)
-            if r.status not in ("Running", "Stopped", "Terminated", "Deleted"):
-                r.status = "Failed"
-                r.updated_at = datetime.utcnow()
+def to_resource_schema(r: models.Resource) -> schemas.ResourceBase:
+    return schemas.ResourceBase(
+        id=r.id,
+        name=r.name,
+        provider=r.provider,
+        type=r.type,
+        region=r.region,
+        status=r.status,
+        cpu=r.cpu,
+        memory=r.memory,
+        storage=r.storage,
+        costPerMonth=r.cost_per_month_inr,
+        uptime=r.uptime,
+        tags=r.tags or [],
+        lastRefreshedAt=r.last_refreshed_at.isoformat() if r.last_refreshed_at else None,
+    )
 
-    db.commit()
 
-    out: list[schemas.ResourceBase] = []
-    for r in resources:
-        out.append(
-            schemas.ResourceBase(
-                id=r.id,
-                name=r.name,
-                provider=r.provider,
-                type=r.type,
-                region=r.region,
-                status=r.status,
-                cpu=r.cpu,
-                memory=r.memory,
-                storage=r.storage,
-                costPerMonth=r.cost_per_month_inr,
-                uptime=r.uptime,
-                tags=r.tags or [],
-            )
-        )
+def resource_changes(r: models.Resource, changes: Dict) -> Dict:
+    """Body of a resource.updated event: the id plus the edited fields."""
+    out = {"id": r.id}
+    for field in ("name", "region", "status", "tags"):
+        if changes.get(field) is not None:
+            out[field] = getattr(r, field)
     return out
 
 
-@app.post("/resources", response_model=schemas.ResourceBase)
-def create_resource(payload: schemas.ResourceCreate, db: Session = Depends(get_db)):
-    provider = payload.provider
-    rtype = payload.type
-    region = payload.region
-
-    # Lock AWS to Mumbai
-    if provider == "AWS":
-        region = "ap-south-1"
-
-    external_id = ""
-    status = "Creating"
-    cpu = None
-    memory = None
-    storage = None
-
-    # ----- AWS real resources -----
-    if provider == "AWS":
-        try:
-            if rtype == "VM":
-                instance_id, raw_status = ec2.create_instance(payload.name, region)
-                external_id = instance_id
-                # normalise EC2 initial state
-                if raw_status and raw_status.lower() in ("pending", "running"):
-                    status = "Running"
-                else:
-                    status = raw_status or "Running"
-                cpu = "1 vCPU"
-                memory = "1 GB"
-
-            elif rtype == "Storage":
-                bucket_name, raw_status = s3.create_bucket(payload.name, region)
-                external_id = bucket_name
-                status = raw_status or "Running"
-                storage = "5 GB"
-
-            elif rtype == "Database":
-                table_name, raw_status = dynamodb.create_table(payload.name, region)
-                external_id = table_name
-                # DynamoDB starts as CREATING; treat as Running for UI
-                if raw_status and raw_status.lower() in ("creating", "active", "updating"):
-                    status = "Running"
-                else:
-                    status = raw_status or "Running"
-
-            elif rtype == "Serverless":
-                fn_name, raw_status = lambda_fn.create_basic_function(payload.name, region)
-                external_id = fn_name
-                status = raw_status or "Running"
-
-            elif rtype == "Load Balancer":
-                # still logical only for demo
-                external_id = f"aws-lb-{payload.name}"
-                status = "NotSupportedInFreeTier"
-
-        except Exception as e:
-            # Any AWS failure -> mark Failed
-            print("AWS create failed:", e)
-            external_id = ""
-            status = "Failed"
-
-    # ----- GCP (mock) -----
-    elif provider == "GCP":
-        try:
-            external_id, status = gcp_mock.create_resource(payload.name, rtype, region)
-        except Exception as e:
-            print("GCP mock create failed:", e)
-            external_id = ""
-            status = "Failed"
+# -----------------------------------------------------
+# Resources (CRUD)
+# -----------------------------------------------------
+@app.get("/resources", response_model=list[schemas.ResourceBase])
+async def list_resources(
+    request: Request,
+    response: Response,
+    provider: Optional[str] = None,
+    rtype: Optional[str] = Query(None, alias="type"),
+    status: Optional[str] = None,
+    region: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=queries.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,status"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    One page of resources ordered by id. The next page's cursor is sent in
+    the X-Next-Cursor header (absent on the last page).
+    Statuses are kept fresh by the background reconciler; this is a plain DB read.
+
+    Responses carry an ETag; a matching If-None-Match gets 304 after a
+    single version read. X-Sync-Version is the starting point for
+    /resources:changes.
+    """
+    etag, versions, fresh = await sync.conditional(db, ["resources"], request.url.query, if_none_match)
+    sync_headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Sync-Version": str(versions["resources"])}
+    if fresh:
+        return Response(status_code=304, headers=sync_headers)
+
+    names = queries.parse_fields(fields, queries.RESOURCE_FIELDS)
+    filters = queries.ResourceFilters(provider=provider, type=rtype, status=status, region=region)
+    page_size = queries.clamp_limit(limit)
+    result = await db.execute(queries.resource_query(filters, cursor, names).limit(page_size + 1))
+    rows = result.scalars().all() if names is None else result.all()
+    rows, next_cursor = queries.split_page(rows, page_size, queries.resource_cursor)
+
+    headers = dict(sync_headers)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if names is not None:
+        return JSONResponse([queries.project_row(r, names) for r in rows], headers=headers)
+
+    response.headers.update(headers)
+    return [to_resource_schema(r) for r in rows]
+
+
+@app.get("/resources:changes", response_model=schemas.ResourceChanges)
+async def resource_changes_since(
+    since: int = Query(..., ge=0, description="X-Sync-Version or the previous response's version"),
+    limit: Optional[int] = Query(None, ge=1, le=queries.MAX_LIMIT),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Delta sync: resources created or changed after version `since`, plus
+    the ids deleted since then. 410 if the deletes are too old to report.
+    """
+    rows, deleted, version, more = await sync.changes(db, models.Resource, since, queries.clamp_limit(limit))
+    return schemas.ResourceChanges(
+        version=version, changed=[to_resource_schema(r) for r in rows], deleted=deleted, more=more
+    )
 
-    # ----- Azure (mock) -----
-    elif provider == "Azure":
-        try:
-            external_id, status = azure_mock.create_resource(payload.name, rtype, region)
-        except Exception as e:
-            print("Azure mock create failed:", e)
-            external_id = ""
-            status = "Failed"
 
-    cost_inr = estimate_inr_cost(provider, rtype)
+def new_resource_job(payload: schemas.ResourceCreate, idempotency_key: Optional[str] = None):
+    """Unsaved "Creating" Resource row plus the queued Job that will provision it."""
+    provider = payload.provider
+    rtype = payload.type
+    adapter = providers.get(provider, rtype)
+    region = adapter.region(payload.region)
+    sizing = adapter.sizing
 
     db_res = models.Resource(
         name=payload.name,
         provider=provider,
         type=rtype,
         region=region,
-        status=status,
-        external_id=external_id,
-        cpu=cpu,
-        memory=memory,
-        storage=storage,
-        cost_per_month_inr=cost_inr,
+        status="Creating",
+        external_id="",
+        cpu=sizing.get("cpu"),
+        memory=sizing.get("memory"),
+        storage=sizing.get("storage"),
+        cost_per_month_inr=cost.estimate_monthly_cost(provider, rtype, region, payload.config),
         uptime=100.0,
         tags=[],
     )
-    db.add(db_res)
-    db.commit()
-    db.refresh(db_res)
-
-    log = models.ActionLog(
-        resource_id=db_res.id,
-        user_email="system",
-        action="create",
-        status="Success" if status != "Failed" else "Failure",
+    job = models.Job(
+        id=jobs.new_job_id(),
+        kind="create",
+        status="queued",
         provider=provider,
-        details={"external_id": external_id},
+        region=region,
+        idempotency_key=idempotency_key,
+        attempts=0,
+        resource=db_res,
     )
-    db.add(log)
-    db.commit()
+    return db_res, job
 
-    return schemas.ResourceBase(
-        id=db_res.id,
-        name=db_res.name,
-        provider=db_res.provider,
-        type=db_res.type,
-        region=db_res.region,
-        status=db_res.status,
-        cpu=db_res.cpu,
-        memory=db_res.memory,
-        storage=db_res.storage,
-        costPerMonth=db_res.cost_per_month_inr,
-        uptime=db_res.uptime,
-        tags=db_res.tags or [],
+
+@app.post("/resources", response_model=schemas.ResourceAccepted, status_code=202)
+async def create_resource(
+    payload: schemas.ResourceCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Record the resource as "Creating" and queue a provisioning job.
+    The cloud call happens in the background; poll /jobs/{jobId} for the result.
+    Repeating a request with the same Idempotency-Key returns the original job.
+    """
+    if idempotency_key:
+        existing = await _job_for_key(db, idempotency_key)
+        if existing is not None:
+            return existing
+
+    db_res, job = new_resource_job(payload, idempotency_key)
+    # resource + job + cost rollups in one transaction
+    db.add_all([db_res, job])
+    await cost.apply(db, added=[cost.share(db_res)])
+    try:
+        await alerts.on_cost(db)   # flushes: a duplicate Idempotency-Key can surface here
+        events.emit(db, "resource.created", to_resource_schema(db_res).model_dump())
+        await db.commit()
+    except IntegrityError:
+        # lost a race with a concurrent request carrying the same key
+        await db.rollback()
+        existing = await _job_for_key(db, idempotency_key)
+        if existing is None:
+            raise
+        return existing
+
+    jobs.queue.submit(job.id)
+    return schemas.ResourceAccepted(**to_resource_schema(db_res).model_dump(), jobId=job.id)
+
+
+async def _job_for_key(db: AsyncSession, key: str) -> Optional[schemas.ResourceAccepted]:
+    job = (
+        await db.execute(select(models.Job).where(models.Job.idempotency_key == key))
+    ).scalar_one_or_none()
+    if job is None:
+        return None
+    res = await db.get(models.Resource, job.resource_id) if job.resource_id else None
+    if res is None:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was used for a resource that no longer exists")
+    return schemas.ResourceAccepted(**to_resource_schema(res).model_dump(), jobId=job.id)
+
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobStatus)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(models.Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    res = await db.get(models.Resource, job.resource_id) if job.resource_id else None
+    return schemas.JobStatus(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        resourceId=job.resource_id,
+        attempts=job.attempts or 0,
+        error=job.error,
+        createdAt=job.created_at.isoformat(),
+        updatedAt=job.updated_at.isoformat(),
+        finishedAt=job.finished_at.isoformat() if job.finished_at else None,
+        resource=to_resource_schema(res) if res else None,
     )
 
 
 @app.put("/resources/{resource_id}", response_model=schemas.ResourceBase)
-def update_resource(
+async def update_resource(
     resource_id: int,
     payload: schemas.ResourceUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    res = db.query(models.Resource).filter(models.Resource.id == resource_id).first()
+    res = await db.get(models.Resource, resource_id)
     if not res:
         raise HTTPException(status_code=404, detail="Resource not found")
 
+    before = cost.share(res)
     if payload.name is not None:
         res.name = payload.name
     if payload.region is not None:
@@ -311,153 +385,537 @@ def update_resource(
         res.tags = payload.tags
 
     res.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(res)
-
-    log = models.ActionLog(
-        resource_id=res.id,
-        user_email="system",
-        action="update",
-        status="Success",
-        provider=res.provider,
-        details={"updated_fields": payload.model_dump(exclude_unset=True)},
-    )
-    db.add(log)
-    db.commit()
-
-    return schemas.ResourceBase(
-        id=res.id,
-        name=res.name,
-        provider=res.provider,
-        type=res.type,
-        region=res.region,
-        status=res.status,
-        cpu=res.cpu,
-        memory=res.memory,
-        storage=res.storage,
-        costPerMonth=res.cost_per_month_inr,
-        uptime=res.uptime,
-        tags=res.tags or [],
-    )
+    await cost.apply(db, [before], [cost.share(res)])
+    await alerts.on_status(db, [res])
+    await alerts.on_cost(db)
+    events.emit(db, "resource.updated", resource_changes(res, payload.model_dump(exclude_unset=True)))
+    await db.commit()
+    # recorded before the refresh: nothing may hold a pooled connection while waiting on the writer
+    await audit.writer.record(audit.entry("update", res, {"updated_fields": payload.model_dump(exclude_unset=True)}))
+    await db.refresh(res)
+    return to_resource_schema(res)
 
 
 @app.delete("/resources/{resource_id}")
-def delete_resource(resource_id: int, db: Session = Depends(get_db)):
-    res = db.query(models.Resource).filter(models.Resource.id == resource_id).first()
+async def delete_resource(resource_id: int, db: AsyncSession = Depends(get_db)):
+    res = await db.get(models.Resource, resource_id)
     if not res:
         raise HTTPException(status_code=404, detail="Resource not found")
 
-    if res.provider == "AWS":
+    if res.external_id:
         try:
-            if res.type == "VM":
-                ec2.terminate_instance(res.external_id or "")
-            elif res.type == "Storage":
-                s3.delete_bucket(res.external_id or "")
-            elif res.type == "Database":
-                dynamodb.delete_table(res.external_id or "")
-            # Serverless / LB: logical-only for now
+            await providers.delete(res.provider, res.type, res.external_id)
         except Exception as e:
-            print("Cloud delete failed, deleting only from DB:", e)
-
-    log = models.ActionLog(
-        resource_id=res.id,
-        user_email="system",
-        action="delete",
-        status="Success",
-        provider=res.provider,
-        details={},
-    )
-    db.add(log)
-    db.delete(res)
-    db.commit()
+            logger.warning("cloud delete failed, deleting only from DB", extra={"resource_id": resource_id, "error": str(e)})
+    else:
+        # not provisioned yet: a running job cleans up what it creates once it sees the row is gone
+        await jobs.cancel_pending(db, [res.id])
+
+    log = audit.entry("delete", res)
+    await metrics_store.forget(db, [res.id])
+    await ledger.accrue_removed(db, [res])
+    await cost.apply(db, removed=[cost.share(res)])
+    await alerts.forget(db, [res.id])
+    await alerts.on_cost(db)
+    events.emit(db, "resource.deleted", {"id": res.id})
+    await db.delete(res)
+    await db.commit()
+    await audit.writer.record(log)
     return {"message": "Deleted"}
 
 
+# -----------------------------------------------------
+# Batch create / update / delete
+# -----------------------------------------------------
+def _check_batch_size(n: int) -> None:
+    if n == 0:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if n > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+
+
+async def _resources_by_id(db: AsyncSession, ids: List[int]) -> Dict[int, models.Resource]:
+    result = await db.execute(select(models.Resource).where(models.Resource.id.in_(set(ids))))
+    return {r.id: r for r in result.scalars()}
+
+
+@app.post("/resources:batch", response_model=List[schemas.BatchItemResult], status_code=202)
+async def create_resources_batch(
+    payload: List[schemas.ResourceCreate],
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Queue one provisioning job per item; all rows are written in one
+    transaction. With an Idempotency-Key, item i uses "<key>:<i>", so a
+    retried batch returns the jobs it already created.
+    """
+    _check_batch_size(len(payload))
+    keys = [f"{idempotency_key}:{i}" for i in range(len(payload))] if idempotency_key else [None] * len(payload)
+
+    existing: Dict[str, models.Job] = {}
+    if idempotency_key:
+        result = await db.execute(select(models.Job).where(models.Job.idempotency_key.in_(keys)))
+        existing = {j.idempotency_key: j for j in result.scalars()}
+    known = await _resources_by_id(db, [j.resource_id for j in existing.values() if j.resource_id])
+
+    results: List[schemas.BatchItemResult] = []
+    new_rows = []
+    for i, (item, key) in enumerate(zip(payload, keys)):
+        if key in existing:
+            job = existing[key]
+            res = known.get(job.resource_id)
+            results.append(schemas.BatchItemResult(
+                index=i, id=job.resource_id, ok=res is not None, jobId=job.id,
+                resource=to_resource_schema(res) if res else None,
+                error=None if res else "Resource no longer exists",
+            ))
+            continue
+        db_res, job = new_resource_job(item, key)
+        new_rows.append((i, db_res, job))
+        results.append(None)
+
+    db.add_all([obj for _, db_res, job in new_rows for obj in (db_res, job)])
+    await cost.apply(db, added=[cost.share(db_res) for _, db_res, _ in new_rows])
+    try:
+        await alerts.on_cost(db)   # flushes: a duplicate Idempotency-Key can surface here
+        for _, db_res, _ in new_rows:
+            events.emit(db, "resource.created", to_resource_schema(db_res).model_dump())
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="A batch with this Idempotency-Key is already in progress")
+
+    for i, db_res, job in new_rows:
+        jobs.queue.submit(job.id)
+        results[i] = schemas.BatchItemResult(
+            index=i, id=db_res.id, ok=True, jobId=job.id, resource=to_resource_schema(db_res)
+        )
+    return results
+
+
+@app.put("/resources:batch", response_model=List[schemas.BatchItemResult])
+async def update_resources_batch(payload: List[schemas.ResourceBatchUpdate], db: AsyncSession = Depends(get_db)):
+    """Apply each update in one commit, then record one audit entry per updated item."""
+    _check_batch_size(len(payload))
+    found = await _resources_by_id(db, [item.id for item in payload])
+
+    now = datetime.utcnow()
+    results: List[schemas.BatchItemResult] = []
+    logs = []
+    before, after = [], []
+    for i, item in enumerate(payload):
+        res = found.get(item.id)
+        if res is None:
+            results.append(schemas.BatchItemResult(index=i, id=item.id, ok=False, error="Resource not found"))
+            continue
+        changes = item.model_dump(exclude_unset=True, exclude={"id"})
+        before.append(cost.share(res))
+        for field in ("name", "region", "status", "tags"):
+            if changes.get(field) is not None:
+                setattr(res, field, changes[field])
+        res.updated_at = now
+        after.append(cost.share(res))
+        events.emit(db, "resource.updated", resource_changes(res, changes))
+        logs.append(audit.entry("update", res, {"updated_fields": changes}, at=now))
+        results.append(schemas.BatchItemResult(index=i, id=res.id, ok=True))
+
+    await db.flush()
+    await cost.apply(db, before, after)
+    await alerts.on_status(db, [found[r.id] for r in results if r.ok])
+    await alerts.on_cost(db)
+    await db.commit()
+    await audit.writer.record(*logs)
+
+    for r in results:
+        if r.ok:
+            r.resource = to_resource_schema(found[r.id])
+    return results
+
+
+@app.delete("/resources:batch", response_model=List[schemas.BatchItemResult])
+async def delete_resources_batch(ids: List[int] = Body(...), db: AsyncSession = Depends(get_db)):
+    """
+    Delete the cloud side of every resource in parallel (at most
+    BATCH_CLOUD_CONCURRENCY calls at once), then remove the rows and write
+    record the audit entries. As with DELETE /resources/{id}, a
+    failed cloud delete still removes the row; the error is reported on the item.
+    """
+    _check_batch_size(len(ids))
+    found = await _resources_by_id(db, ids)
+    targets = list(found.values())
+
+    provisioned = [r for r in targets if r.external_id]
+    outcomes = await gather_limited(
+        (providers.delete(r.provider, r.type, r.external_id) for r in provisioned),
+        BATCH_CONCURRENCY,
+    )
+    cloud_errors = {r.id: repr(o) for r, o in zip(provisioned, outcomes) if isinstance(o, BaseException)}
+    for rid, err in cloud_errors.items():
+        logger.warning("cloud delete failed, deleting only from DB", extra={"resource_id": rid, "error": err})
+
+    if targets:
+        now = datetime.utcnow()
+        gone = [r.id for r in targets]
+        await jobs.cancel_pending(db, [r.id for r in targets if not r.external_id])
+        # same end state as the per-row delete: old logs cascade away, the delete log stays
+        await db.execute(delete(models.ActionLog).where(models.ActionLog.resource_id.in_(gone)))
+        await db.execute(delete(models.Resource).where(models.Resource.id.in_(gone)))
+        await metrics_store.forget(db, gone)
+        await ledger.accrue_removed(db, targets, now)
+        await cost.apply(db, removed=[cost.share(r) for r in targets])
+        await alerts.forget(db, gone)
+        await alerts.on_cost(db)
+        for rid in gone:
+            events.emit(db, "resource.deleted", {"id": rid})
+        await db.commit()
+        await audit.writer.record(*(audit.entry("delete", r, at=now) for r in targets))
+
+    results: List[schemas.BatchItemResult] = []
+    for i, rid in enumerate(ids):
+        if rid not in found:
+            results.append(schemas.BatchItemResult(index=i, id=rid, ok=False, error="Resource not found"))
+        else:
+            results.append(schemas.BatchItemResult(index=i, id=rid, ok=True, error=cloud_errors.get(rid)))
+    return results
+
+
 # -----------------------------------------------------
 # Metrics & Alerts
 # -----------------------------------------------------
 @app.get("/resources/{resource_id}/metrics", response_model=list[schemas.MetricPoint])
-def get_metrics(resource_id: int, db: Session = Depends(get_db)):
-    res = db.query(models.Resource).filter(models.Resource.id == resource_id).first()
+async def get_metrics(
+    resource_id: int,
+    window: int = Query(aws_metrics.DEFAULT_WINDOW, ge=60, le=15 * 24 * 3600, description="Seconds of history"),
+    period: int = Query(aws_metrics.DEFAULT_PERIOD, ge=60, le=24 * 3600, multiple_of=60, description="Seconds per point"),
+    db: AsyncSession = Depends(get_db),
+):
+    res = await db.get(models.Resource, resource_id)
     if not res:
         raise HTTPException(status_code=404, detail="Resource not found")
 
-    # --- AWS: try real CloudWatch, fallback to mock ---
-    if res.provider == "AWS" and res.type == "VM":
-        try:
-            raw = aws_metrics.get_ec2_cpu_network(res.external_id or "")
-            if raw:
-                return [schemas.MetricPoint(**m) for m in raw]
-        except Exception as e:
-            print("AWS metrics error, falling back to mock:", e)
-        return generate_mock_metrics()
+    # provider series (CloudWatch is cached until the next period); generic mock series otherwise
+    axis, found = await providers.metrics([res], window, period)
+    if res.id in found:
+        points = providers.to_points(axis, found[res.id][1])
+        if points:
+            return [schemas.MetricPoint(**p) for p in points]
+    return generate_mock_metrics()
 
-    # --- GCP / Azure: mock metrics for now ---
-    if res.provider == "GCP" and res.type == "VM":
-        try:
-            raw = gcp_mock.generate_metrics()
-            if raw:
-                return [schemas.MetricPoint(**m) for m in raw]
-        except Exception as e:
-            print("GCP mock metrics error, using generic:", e)
-        return generate_mock_metrics()
 
-    if res.provider == "Azure" and res.type == "VM":
-        try:
-            raw = azure_mock.generate_metrics()
-            if raw:
-                return [schemas.MetricPoint(**m) for m in raw]
-        except Exception as e:
-            print("Azure mock metrics error, using generic:", e)
-        return generate_mock_metrics()
+@app.get("/resources/{resource_id}/metrics/history", response_model=schemas.MetricHistory)
+async def get_metrics_history(
+    resource_id: int,
+    since: Optional[datetime] = Query(None, description="Start of the range (default: 24h before until)"),
+    until: Optional[datetime] = Query(None, description="End of the range (default: now)"),
+    resolution: Optional[int] = Query(None, description="Seconds per point: 300, 3600 or 86400 (default: picked from the range)"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Stored metric history from the local time-series store. Served from
+    SQLite only (5m points, 1h and 1d rollups), never from a provider.
+    """
+    res = await db.get(models.Resource, resource_id)
+    if not res:
+        raise HTTPException(status_code=404, detail="Resource not found")
 
-    # --- any other resource type/provider: generic mock series ---
-    return generate_mock_metrics()
+    end = epoch_seconds(until or datetime.utcnow())
+    start = epoch_seconds(since) if since else end - 24 * 3600
+    if start >= end:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    if resolution is not None and resolution not in metrics_store.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="resolution must be 300, 3600 or 86400")
+
+    data = await metrics_store.query_range(db, res.id, start, end, resolution)
+    return schemas.MetricHistory(
+        resolution=data["resolution"],
+        timestamps=[aws_metrics.iso_utc(ts) for ts in data.pop("ts")],
+        **{k: v for k, v in data.items() if k != "resolution"},
+    )
+
+
+@app.get("/metrics/fleet", response_model=schemas.FleetMetrics)
+async def get_fleet_metrics(
+    ids: str = Query(..., description="Comma-separated resource ids"),
+    window: int = Query(aws_metrics.DEFAULT_WINDOW, ge=60, le=15 * 24 * 3600, description="Seconds of history"),
+    period: int = Query(aws_metrics.DEFAULT_PERIOD, ge=60, le=24 * 3600, multiple_of=60, description="Seconds per point"),
+    stat: Optional[Literal["Average", "Sum", "Minimum", "Maximum", "SampleCount"]] = Query(
+        None, description="Statistic for every metric (default: Average for CPU, Sum for network)"
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Metrics for many resources in one request, as columns on a shared time
+    axis. AWS instances are fetched together with one GetMetricData query.
+    """
+    try:
+        wanted = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not wanted:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(wanted) > FLEET_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {FLEET_MAX_IDS} ids per request")
+    if window // period > 1440:
+        raise HTTPException(status_code=400, detail="window/period may not exceed 1440 points")
+
+    found = await _resources_by_id(db, wanted)
+    statistics = {name: stat for name in aws_metrics.EC2_METRICS} if stat else None
+    data = await monitoring.fleet_metrics([found[i] for i in wanted if i in found], window, period, statistics)
+    data["missing"] = data["missing"] + [i for i in wanted if i not in found]
+    return data
+
+
+@app.get("/metrics/aggregate", response_model=schemas.MetricAggregate, response_model_exclude_none=True)
+async def get_metrics_aggregate(
+    metric: Literal["cpu", "cpuMax", "memory", "networkIn", "networkOut"] = "cpu",
+    group_by: Optional[Literal["provider", "region", "type", "tag"]] = None,
+    since: Optional[datetime] = Query(None, description="Start of the range (default: 24h before until)"),
+    until: Optional[datetime] = Query(None, description="End of the range (default: now)"),
+    bucket: Optional[int] = Query(None, ge=300, description="Seconds per time bucket (default: whole range)"),
+    stats: str = Query("avg,max,p95,p99", description="Comma-separated subset of avg,max,p95,p99"),
+    provider: Optional[str] = None,
+    rtype: Optional[str] = Query(None, alias="type"),
+    region: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Fleet-wide avg/max/p95/p99 of one stored metric, optionally grouped
+    by provider, region, type or tag and split into time buckets.
+    Computed over the local metrics store; no provider calls.
+    """
+    wanted = [s.strip() for s in stats.split(",") if s.strip()]
+    unknown = [s for s in wanted if s not in aggregation.STATS]
+    if unknown or not wanted:
+        raise HTTPException(status_code=400, detail=f"stats must be a subset of {','.join(aggregation.STATS)}")
+
+    end = epoch_seconds(until or datetime.utcnow())
+    start = epoch_seconds(since) if since else end - 24 * 3600
+    if start >= end:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    resolution = metrics_store.pick_resolution(start, end)
+    if bucket is not None and bucket % resolution:
+        raise HTTPException(status_code=400, detail=f"bucket must be a multiple of {resolution}s for this range")
+    # whole points only, buckets on clock boundaries (e.g. on the hour)
+    end = end // resolution * resolution
+    start = start // (bucket or resolution) * (bucket or resolution)
+
+    where = [
+        getattr(models.Resource, attr) == value
+        for attr, value in (("provider", provider), ("type", rtype), ("region", region))
+        if value is not None
+    ]
+    matrix = await aggregation.load_matrix(db, metric, start, end, resolution, where)
+    groups = aggregation.aggregate(matrix, group_by, bucket, wanted)
+    step = bucket or (end - start)
+    return schemas.MetricAggregate(
+        metric=metric,
+        groupBy=group_by,
+        resolution=resolution,
+        bucket=step,
+        buckets=[aws_metrics.iso_utc(t) for t in range(start, end, step)],
+        groups=groups,
+    )
+
+
+@app.get("/metrics/cache")
+async def metrics_cache_stats():
+    """Hit/miss/eviction counters for the CloudWatch metrics cache."""
+    return metrics_cache.stats()
 
 
 @app.get("/alerts", response_model=list[schemas.Alert])
-def get_alerts(db: Session = Depends(get_db)):
-    alerts: list[schemas.Alert] = []
-    resources = db.query(models.Resource).all()
-    now = datetime.utcnow()
-    for r in resources:
-        if r.status not in ("Running", "Stopped"):
-            alerts.append(
-                schemas.Alert(
-                    id=f"alert-{r.id}-status",
-                    title=f"{r.name} is in {r.status} state",
-                    severity="Warning",
-                    time=now.isoformat(),
-                )
-            )
-    return alerts
+async def get_alerts(db: AsyncSession = Depends(get_db)):
+    """
+    Currently open alerts, newest first. Rules are evaluated when statuses,
+    metrics or costs change (services/alerts.py); this only reads the open
+    set through its partial index.
+    """
+    result = await db.execute(alerts.open_alerts_query())
+    return [schemas.Alert(**alerts.as_dict(a)) for a in result.scalars()]
+
+
+# -----------------------------------------------------
+# Server push
+# -----------------------------------------------------
+@app.get("/events")
+async def stream_events(
+    topics: Optional[str] = Query(None, description="comma-separated: resource,alert,metrics (default: all)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID", max_length=64),
+):
+    """
+    Server-Sent Events stream of committed changes: resource.created /
+    updated / deleted, alert.opened / resolved and metrics.points. Replaces
+    polling /resources, /alerts and the metrics endpoints; a client that
+    reconnects with Last-Event-ID gets what it missed (while still
+    buffered). An "event: reset" means events were missed (the client fell
+    behind, the buffer no longer reaches back that far, or the server
+    restarted) and it should refetch, e.g. via /resources:changes.
+    """
+    wanted = [t.strip() for t in topics.split(",") if t.strip()] if topics else list(events.TOPICS)
+    unknown = set(wanted) - set(events.TOPICS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(sorted(unknown))}")
+    return StreamingResponse(
+        events.bus.stream(wanted, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# -----------------------------------------------------
+# Costs
+# -----------------------------------------------------
+@app.get("/costs/summary", response_model=schemas.CostSummary)
+async def get_cost_summary(db: AsyncSession = Depends(get_db)):
+    """
+    Monthly cost totals by provider, region, type and tag. Served from
+    rollups that are updated with every resource write, so the cost of
+    this call doesn't grow with the inventory.
+    """
+    return await cost.summary(db)
+
+
+@app.get("/costs/ledger", response_model=schemas.CostLedger)
+async def get_cost_ledger(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    group_by: Optional[Literal["provider", "region", "type", "tag"]] = None,
+    granularity: Literal["day", "month", "total"] = "day",
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Accrued spend for days in [since, until) (default: the last 30 days),
+    per day or month, optionally grouped. Served from the daily ledger
+    partitions, so a year-long range reads at most 366 rows per key.
+    """
+    until = until or datetime.utcnow().date() + timedelta(days=1)
+    since = since or until - timedelta(days=30)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    return await ledger.spend(db, since, until, group_by, granularity)
+
+
+# -----------------------------------------------------
+# Search
+# -----------------------------------------------------
+@app.get("/search", response_model=schemas.SearchResults)
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=500, description='Words to find, e.g. "web-se tag:prod"'),
+    kind: Literal["all", "resources", "logs"] = "all",
+    limit: int = Query(search.DEFAULT_LIMIT, ge=1, le=search.MAX_LIMIT, description="Per kind"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Resources by name, tags, external id, region, provider and type (best
+    match first) and audit log entries by user, action, status, provider
+    and details (newest first). Words match as prefixes; "field:word"
+    limits a word to one field.
+    """
+    resources = await search.search_resources(db, q, limit) if kind in ("all", "resources") else []
+    logs = await search.search_logs(db, q, limit) if kind in ("all", "logs") else []
+    return schemas.SearchResults(
+        resources=[to_resource_schema(r) for r in resources],
+        logs=[to_log_entry(l) for l in logs],
+    )
 
 
 # -----------------------------------------------------
 # Logs & Users
 # -----------------------------------------------------
 @app.get("/logs", response_model=list[schemas.LogEntry])
-def list_logs(db: Session = Depends(get_db)):
-    logs = db.query(models.ActionLog).order_by(models.ActionLog.timestamp.desc()).all()
-    result: list[schemas.LogEntry] = []
-    for l in logs:
-        result.append(
-            schemas.LogEntry(
-                id=l.id,
-                timestamp=l.timestamp.isoformat(),
-                user=l.user_email or "system",
-                action=l.action,
-                resource=l.resource.name if l.resource else "",
-                status=l.status,
-                provider=l.provider,
-            )
-        )
-    return result
+async def list_logs(
+    request: Request,
+    response: Response,
+    provider: Optional[str] = None,
+    action: Optional[str] = None,
+    status: Optional[str] = None,
+    resource_id: Optional[int] = None,
+    since: Optional[datetime] = Query(None, description="Only entries at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only entries before this time"),
+    limit: Optional[int] = Query(None, ge=1, le=queries.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. timestamp,action"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    One page of audit log entries, newest first. The next page's cursor is
+    sent in the X-Next-Cursor header (absent on the last page).
+    Entries older than the hot window (AUDIT_HOT_DAYS) are archived; they
+    are included when `since` reaches back to them.
+    ETag / If-None-Match as for /resources; entries show resource names,
+    so the tag covers both tables.
+    """
+    etag, versions, fresh = await sync.conditional(
+        db, ["action_logs", "resources"], request.url.query, if_none_match
+    )
+    sync_headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Sync-Version": str(versions["action_logs"])}
+    if fresh:
+        return Response(status_code=304, headers=sync_headers)
+
+    names = queries.parse_fields(fields, queries.LOG_FIELDS)
+    filters = queries.LogFilters(
+        provider=provider,
+        action=action,
+        status=status,
+        resource_id=resource_id,
+        since=since,
+        until=until,
+    )
+    page_size = queries.clamp_limit(limit)
+    result = await db.execute(queries.log_query(filters, cursor, names).limit(page_size + 1))
+    rows = result.all()
+    if len(rows) <= page_size and since is not None:
+        # the table has nothing older in range; entries past the hot window are in the archive
+        archived = await audit.archived_logs(db, filters, cursor, page_size + 1)
+        rows = audit.merge_newest(rows, archived, page_size + 1)
+    rows, next_cursor = queries.split_page(rows, page_size, queries.log_cursor)
+
+    headers = dict(sync_headers)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if names is not None:
+        return JSONResponse([queries.project_row(r, names) for r in rows], headers=headers)
+
+    response.headers.update(headers)
+    return [to_log_entry(l) for l in rows]
+
+
+def to_log_entry(l) -> schemas.LogEntry:
+    """LogEntry from a row selected with queries.LOG_FIELDS labels."""
+    return schemas.LogEntry(
+        id=l.id,
+        timestamp=l.timestamp.isoformat(),
+        user=l.user or "system",
+        action=l.action,
+        resource=l.resource or "",
+        status=l.status,
+        provider=l.provider,
+    )
+
+
+@app.get("/logs:changes", response_model=schemas.LogChanges)
+async def log_changes_since(
+    since: int = Query(..., ge=0, description="X-Sync-Version or the previous response's version"),
+    limit: Optional[int] = Query(None, ge=1, le=queries.MAX_LIMIT),
+    db: AsyncSession = Depends(get_db),
+):
+    """Delta sync for the audit log: entries written after version `since`, and deleted ids."""
+    rows, deleted, version, more = await sync.changes(
+        db,
+        models.ActionLog,
+        since,
+        queries.clamp_limit(limit),
+        columns=[c.label(n) for n, c in queries.LOG_FIELDS.items()],
+        joins=[(models.Resource, models.ActionLog.resource_id == models.Resource.id)],
+    )
+    return schemas.LogChanges(version=version, changed=[to_log_entry(r) for r in rows], deleted=deleted, more=more)
 
 
 @app.get("/users", response_model=list[schemas.UserBase])
-def list_users(db: Session = Depends(get_db)):
-    users = db.query(models.User).all()
+async def list_users(db: AsyncSession = Depends(get_db)):
+    users = (await db.execute(select(models.User))).scalars().all()
 
     # Seed a default admin user if DB is empty
     if not users:
@@ -469,8 +927,8 @@ def list_users(db: Session = Depends(get_db)):
             avatar="https://picsum.photos/80/80",
         )
         db.add(admin)
-        db.commit()
-        db.refresh(admin)
+        await db.commit()
+        await db.refresh(admin)
         users = [admin]
 
     out: list[schemas.UserBase] = []
@@ -0,0 +1,205 @@
+# Versioned schema migrations
+# app/migrations.py
+"""
+Schema changes are applied by an explicit step, not at app startup:
+
+    python -m app.migrations            # upgrade to the latest version
+    python -m app.migrations status     # show applied / pending
+    python -m app.migrations check      # models vs. what the migrations build
+
+Each migration runs in its own transaction and is recorded in
+schema_migrations. The app checks at startup that none are pending
+(MIGRATE_ON_STARTUP=1 applies them instead, for local development).
+
+To change the schema: edit the model, then append a step to MIGRATIONS
+that makes the same change to an existing database. A released step is
+never edited: version 1 is the frozen snapshot in app/schema_v1.py, not
+the current models. `python -m app.migrations check` compares a freshly
+migrated database with the models and lists anything no step creates.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from .database import Base, engine, make_engine
+from . import log, schema_v1
+from . import models  # also registers the tables on Base.metadata
+
+logger = logging.getLogger(__name__)
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "0") == "1"
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class PendingMigrations(RuntimeError):
+    pass
+
+
+# -----------------------------------------------------
+# Helpers for steps
+# -----------------------------------------------------
+def add_column_if_missing(conn: Connection, col: Column) -> None:
+    """ALTER TABLE ADD COLUMN for a column declared on a Table (added nullable, no default)."""
+    table = col.table.name
+    if col.name in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return
+    col_type = col.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{col.name}" {col_type}'))
+
+
+def create_indexes_if_missing(conn: Connection, table: Table) -> None:
+    for index in table.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def _baseline(conn: Connection) -> None:
+    """
+    The schema in app/schema_v1.py. Also adopts databases created by the
+    old create_all-at-startup code: missing tables, columns and indexes
+    are added, and the sync triggers are installed.
+    """
+    schema_v1.metadata.create_all(bind=conn)
+    for table in schema_v1.metadata.sorted_tables:
+        for col in table.columns:
+            add_column_if_missing(conn, col)
+        create_indexes_if_missing(conn, table)
+    for ddl in schema_v1.TRIGGERS:
+        conn.execute(text(ddl))
+
+
+def _audit_segments(conn: Connection) -> None:
+    """Manifest of archived audit log files."""
+    models.AuditSegment.__table__.create(bind=conn, checkfirst=True)
+    create_indexes_if_missing(conn, models.AuditSegment.__table__)
+
+
+def _search_index(conn: Connection) -> None:
+    """Full-text indexes over resources and action_logs, filled from the existing rows."""
+    models.SearchIndexState.__table__.create(bind=conn, checkfirst=True)
+    for ddl in models.SEARCH_DDL:
+        conn.execute(text(ddl))
+    for index in models.SEARCH_INDEXES:
+        for sql in models.search_rebuild_sql(index):
+            conn.execute(text(sql))
+
+
+def _alerts_resolved_fingerprint(conn: Connection) -> None:
+    """Index resolved alerts by fingerprint, to carry occurrence counts over to a re-opened alert."""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_alerts_resolved_fingerprint ON alerts (fingerprint, occurrences)"
+        " WHERE status = 'resolved'"
+    ))
+
+
+# (version, name, step); append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline", _baseline),
+    (2, "audit_segments", _audit_segments),
+    (3, "search_index", _search_index),
+    (4, "alerts_resolved_fingerprint", _alerts_resolved_fingerprint),
+]
+
+HEAD = MIGRATIONS[-1][0]
+
+
+# -----------------------------------------------------
+# Runner
+# -----------------------------------------------------
+def applied_versions(bind: Engine = engine) -> List[int]:
+    with bind.begin() as conn:
+        _meta.create_all(bind=conn)
+        return list(conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version)).scalars())
+
+
+def pending(bind: Engine = engine) -> List[Tuple[int, str, Callable[[Connection], None]]]:
+    done = set(applied_versions(bind))
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def upgrade(bind: Engine = engine, verbose: bool = False) -> int:
+    """Apply pending migrations in order, each in its own transaction. Returns how many ran."""
+    todo = pending(bind)
+    for version, name, step in todo:
+        with bind.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+        if verbose:
+            logger.info("applied migration", extra={"version": version, "migration": name})
+    return len(todo)
+
+
+def ensure_current(bind: Engine = engine) -> None:
+    """Startup check: apply pending migrations if MIGRATE_ON_STARTUP, else refuse to run on an old schema."""
+    if MIGRATE_ON_STARTUP:
+        upgrade(bind, verbose=True)
+        return
+    todo = pending(bind)
+    if todo:
+        names = ", ".join(f"{v:04d} {n}" for v, n, _ in todo)
+        raise PendingMigrations(
+            f"Database schema is out of date (pending: {names}). "
+            "Run `python -m app.migrations` (or set MIGRATE_ON_STARTUP=1)."
+        )
+
+
+def missing_from_migrations() -> List[str]:
+    """Tables, columns and indexes the models declare that no migration creates."""
+    scratch = make_engine("sqlite://")
+    try:
+        upgrade(scratch)
+        insp = inspect(scratch)
+        tables = set(insp.get_table_names())
+        missing = []
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                missing.append(f"table {table.name}")
+                continue
+            columns = {c["name"] for c in insp.get_columns(table.name)}
+            missing += [f"column {table.name}.{c.name}" for c in table.columns if c.name not in columns]
+            indexes = {i["name"] for i in insp.get_indexes(table.name)}
+            missing += [f"index {i.name}" for i in table.indexes if i.name not in indexes]
+        return missing
+    finally:
+        scratch.dispose()
+
+
+def main(argv: List[str]) -> int:
+    log.setup()
+    cmd = argv[0] if argv else "upgrade"
+    if cmd == "status":
+        done = set(applied_versions())
+        for version, name, _ in MIGRATIONS:
+            print(f"{'applied' if version in done else 'pending':>8}  {version:04d} {name}")
+        return 0
+    if cmd == "upgrade":
+        n = upgrade(verbose=True)
+        print(f"[Migrations] {n} applied, schema at {HEAD:04d}")
+        return 0
+    if cmd == "check":
+        missing = missing_from_migrations()
+        for item in missing:
+            print(f"not created by any migration: {item}")
+        if not missing:
+            print(f"[Migrations] models match the schema at {HEAD:04d}")
+        return 1 if missing else 0
+    print("usage: python -m app.migrations [upgrade|status|check]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -8,9 +8,12 @@ from sqlalchemy import (
     Integer,
     String,
     Float,
+    Date,
     DateTime,
     ForeignKey,
     JSON,
+    Index,
+    text,
 )
 from sqlalchemy.orm import relationship
 
@@ -40,10 +43,21 @@ class Resource(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_refreshed_at = Column(DateTime, nullable=True)  # when status was last confirmed with the cloud
+    row_version = Column(Integer, nullable=True)  # table version of the last change (set by trigger)
 
     # relationship to logs
     logs = relationship("ActionLog", back_populates="resource", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # inventory filters (/resources?provider=&type=&status=) and the reconciler
+        Index("ix_resources_provider_type_status", "provider", "type", "status"),
+        Index("ix_resources_status", "status"),
+        Index("ix_resources_region", "region"),
+        # delta sync (/resources:changes?since=)
+        Index("ix_resources_row_version", "row_version"),
+    )
+
 
 class ActionLog(Base):
     __tablename__ = "action_logs"
@@ -59,9 +73,47 @@ class ActionLog(Base):
     provider = Column(String, nullable=True)  # "AWS", "GCP", etc.
 
     details = Column(JSON, nullable=True)
+    row_version = Column(Integer, nullable=True)  # table version of the last change (set by trigger)
 
     resource = relationship("Resource", back_populates="logs")
 
+    __table_args__ = (
+        # /logs pages newest-first on (timestamp, id)
+        Index("ix_action_logs_timestamp_id", timestamp.desc(), id.desc()),
+        # per-resource history and the delete cascade
+        Index("ix_action_logs_resource_id_timestamp", resource_id, timestamp.desc(), id.desc()),
+        Index("ix_action_logs_action_timestamp", action, timestamp.desc(), id.desc()),
+        # delta sync (/logs:changes?since=)
+        Index("ix_action_logs_row_version", "row_version"),
+    )
+
+
+class AuditSegment(Base):
+    """
+    A compressed JSONL file of action_logs rows moved out of the table by
+    the archiver (services/audit.py). One month is one or more parts;
+    range queries pick segments by first_ts / last_ts.
+    """
+
+    __tablename__ = "audit_segments"
+
+    id = Column(Integer, primary_key=True)
+    month = Column(String, nullable=False)       # "YYYY-MM"
+    part = Column(Integer, nullable=False)       # 1, 2, ... within the month
+    path = Column(String, nullable=False)        # file name in AUDIT_ARCHIVE_DIR
+    rows = Column(Integer, nullable=False)
+    bytes = Column(Integer, nullable=False)
+    first_ts = Column(DateTime, nullable=False)
+    last_ts = Column(DateTime, nullable=False)
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ux_audit_segments_month_part", "month", "part", unique=True),
+        Index("ix_audit_segments_last_ts", "last_ts"),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -75,3 +127,293 @@ class User(Base):
     status = Column(String, default="Active")
     avatar = Column(String, nullable=True)
     last_login = Column(DateTime, default=datetime.utcnow)
+
+
+class Job(Base):
+    """Background provisioning job (POST /resources returns its id)."""
+
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)              # uuid4 hex
+    kind = Column(String, nullable=False)              # "create"
+    status = Column(String, nullable=False, default="queued")  # "queued", "running", "succeeded", "failed", "cancelled"
+
+    resource_id = Column(Integer, ForeignKey("resources.id", ondelete="SET NULL"), nullable=True)
+    provider = Column(String, nullable=False)
+    region = Column(String, nullable=False)
+
+    idempotency_key = Column(String, nullable=True, unique=True)  # client-supplied Idempotency-Key
+    attempts = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    resource = relationship("Resource")
+
+    __table_args__ = (
+        # startup recovery looks for unfinished jobs
+        Index("ix_jobs_status", "status"),
+    )
+
+
+class MetricSample(Base):
+    """
+    Stored metric points. One row per (resource, resolution, bucket):
+    resolution 300 holds collected 5-minute points, 3600 / 86400 hold the
+    hourly and daily rollups built from them. `ts` is the bucket start in
+    epoch seconds (UTC).
+    """
+
+    __tablename__ = "metric_samples"
+
+    resource_id = Column(Integer, primary_key=True)
+    resolution = Column(Integer, primary_key=True)   # seconds per bucket: 300, 3600, 86400
+    ts = Column(Integer, primary_key=True)
+
+    cpu = Column(Float, nullable=True)           # average %
+    cpu_max = Column(Float, nullable=True)
+    memory = Column(Float, nullable=True)        # average %
+    network_in = Column(Float, nullable=True)    # bytes in the bucket
+    network_out = Column(Float, nullable=True)
+    samples = Column(Integer, nullable=False, default=1)  # 5-minute points behind this row
+
+    __table_args__ = (
+        # retention deletes by age per resolution
+        Index("ix_metric_samples_resolution_ts", "resolution", "ts"),
+        # rows are clustered on the primary key, so a resource's range is one contiguous read
+        {"sqlite_with_rowid": False},
+    )
+
+
+class CostRollup(Base):
+    """
+    Running monthly cost totals, kept up to date as resources are created,
+    updated and deleted (see services/cost.py). dimension is "total",
+    "provider", "region", "type" or "tag".
+    """
+
+    __tablename__ = "cost_rollups"
+
+    dimension = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    monthly_inr = Column(Float, nullable=False, default=0.0)
+    resources = Column(Integer, nullable=False, default=0)
+
+
+class CostDaily(Base):
+    """
+    Daily cost ledger partitions: spend accrued on one UTC day, per
+    dimension ("total", "provider", "region", "type", "tag") and key.
+    Range queries read these instead of resources.
+    """
+
+    __tablename__ = "cost_daily"
+
+    dimension = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    key = Column(String, primary_key=True)
+    amount_inr = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = ({"sqlite_with_rowid": False},)
+
+
+class CostLedgerState(Base):
+    """Single row: the ledger has accrued every live resource up to accrued_until."""
+
+    __tablename__ = "cost_ledger_state"
+
+    id = Column(Integer, primary_key=True)
+    accrued_until = Column(DateTime, nullable=True)
+
+
+class Alert(Base):
+    """
+    An alert raised by a rule in services/alerts.py. The fingerprint
+    (rule + subject) identifies one condition: while it holds there is a
+    single open row that is re-stamped; when it clears the row is resolved.
+    """
+
+    __tablename__ = "alerts"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String, nullable=False)    # "<rule>:<subject key>"
+    rule = Column(String, nullable=False)
+    resource_id = Column(Integer, nullable=True)    # no FK: history outlives the resource
+    severity = Column(String, nullable=False)       # "Critical", "Warning", "Info"
+    title = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="open")   # "open", "resolved"
+    occurrences = Column(Integer, nullable=False, default=1)   # times the condition has started to hold
+    details = Column(JSON, nullable=True)
+
+    first_seen = Column(DateTime, default=datetime.utcnow)
+    last_seen = Column(DateTime, default=datetime.utcnow)
+    resolved_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Partial indexes: only open alerts are indexed, so they stay as small
+        # as the open set however much resolved history accumulates.
+        # At most one open alert per fingerprint
+        Index("ux_alerts_open_fingerprint", "fingerprint", unique=True, sqlite_where=text("status = 'open'")),
+        # GET /alerts, newest first
+        Index("ix_alerts_open_first_seen", first_seen.desc(), id.desc(), sqlite_where=text("status = 'open'")),
+        # resolving a deleted resource's alerts
+        Index("ix_alerts_open_resource_id", "resource_id", sqlite_where=text("status = 'open'")),
+        # a re-firing condition continues its last alert's occurrence count
+        Index("ix_alerts_resolved_fingerprint", "fingerprint", "occurrences", sqlite_where=text("status = 'resolved'")),
+    )
+
+
+class TableVersion(Base):
+    """
+    Change counter per synced table, bumped by triggers on every insert,
+    update and delete (see SYNCED_TABLES). Deltas older than `floor`
+    are no longer available because their tombstones were pruned.
+    """
+
+    __tablename__ = "table_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    floor = Column(Integer, nullable=False, default=0)
+
+
+class Tombstone(Base):
+    """A deleted row of a synced table, so delta sync can report deletes."""
+
+    __tablename__ = "sync_tombstones"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, primary_key=True)
+    row_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = ({"sqlite_with_rowid": False},)
+
+
+# Tables whose changes are versioned for ETags and delta sync. Triggers
+# catch every write path (ORM, bulk Core statements, cascades), so no
+# handler has to remember to bump a version; they are installed by
+# migration 1 (app/schema_v1.py).
+SYNCED_TABLES = ("resources", "action_logs")
+
+
+# Full-text search (app/search.py). Each index is a contentless FTS5 table
+# keyed by the source row id; it stores only the index and is fed the text
+# below. JSON columns are indexed by their values.
+def _json_values(expr: str) -> str:
+    return (
+        f"(SELECT group_concat(atom, ' ') FROM json_tree(CASE WHEN json_valid({expr}) THEN {expr} END)"
+        " WHERE atom IS NOT NULL)"
+    )
+
+
+# index -> (source table, indexed column -> SQL over the source row "{row}")
+SEARCH_INDEXES = {
+    "resources_fts": ("resources", {
+        "name": "{row}.name",
+        "tags": _json_values("{row}.tags"),
+        "external_id": "{row}.external_id",
+        "region": "{row}.region",
+        "provider": "{row}.provider",
+        "type": "{row}.type",
+    }),
+    "action_logs_fts": ("action_logs", {
+        "user_email": "{row}.user_email",
+        "action": "{row}.action",
+        "status": "{row}.status",
+        "provider": "{row}.provider",
+        "details": _json_values("{row}.details"),
+    }),
+}
+
+# Indexed in batches by search.SearchIndexer instead of on insert, so the
+# audit writer doesn't pay for the index (about a third of its throughput).
+# Rows with row_version <= SearchIndexState.indexed_version are in the index.
+DEFERRED_SEARCH_INDEXES = ("action_logs_fts",)
+
+
+class SearchIndexState(Base):
+    """How far a deferred search index has caught up with its table."""
+
+    __tablename__ = "search_index_state"
+
+    name = Column(String, primary_key=True)
+    indexed_version = Column(Integer, nullable=False, default=0)
+
+
+def search_insert_sql(index: str, where: str = "") -> str:
+    """INSERT ... SELECT adding the source rows matching `where` to the index."""
+    table, columns = SEARCH_INDEXES[index]
+    values = ", ".join(expr.format(row=table) for expr in columns.values())
+    return f"INSERT INTO {index} (rowid, {', '.join(columns)}) SELECT id, {values} FROM {table} {where}"
+
+
+def search_rebuild_sql(index: str) -> list:
+    """Statements that re-index every row of the index's table."""
+    table, _ = SEARCH_INDEXES[index]
+    sql = [f"INSERT INTO {index} ({index}) VALUES ('delete-all')", search_insert_sql(index)]
+    if index in DEFERRED_SEARCH_INDEXES:
+        sql.append(
+            f"UPDATE search_index_state SET indexed_version ="
+            f" (SELECT COALESCE(MAX(version), 0) FROM table_versions WHERE name = '{table}') WHERE name = '{index}'"
+        )
+    return sql
+
+
+def _search_ddl(index: str) -> list:
+    table, columns = SEARCH_INDEXES[index]
+    names = ", ".join(columns)
+
+    def values(row: str) -> str:
+        return ", ".join(expr.format(row=row) for expr in columns.values())
+
+    # A contentless index deletes by being given the exact text it indexed,
+    # which the same expressions over OLD reproduce.
+    remove = f"INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.id, {values('OLD')});"
+    add = f"INSERT INTO {index} (rowid, {names}) VALUES (NEW.id, {values('NEW')});"
+    ddl = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5({names},
+        content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2')""",
+    ]
+    if index not in DEFERRED_SEARCH_INDEXES:
+        return ddl + [
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{index}_insert AFTER INSERT ON {table}
+            BEGIN
+                {add}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{index}_update AFTER UPDATE OF {names} ON {table}
+            BEGIN
+                {remove}
+                {add}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{index}_delete AFTER DELETE ON {table}
+            BEGIN
+                {remove}
+            END""",
+        ]
+    # Deferred: only rows the indexer has reached are removed here. An edit
+    # also gets a new row_version from the sync trigger, so the indexer
+    # adds the row back with its new text. Rows from before row_version
+    # existed (NULL) were indexed by the rebuild.
+    indexed = (
+        f"COALESCE(OLD.row_version, 0) <="
+        f" (SELECT indexed_version FROM search_index_state WHERE name = '{index}')"
+    )
+    return ddl + [
+        f"INSERT OR IGNORE INTO search_index_state (name, indexed_version) VALUES ('{index}', 0)",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{index}_update AFTER UPDATE OF {names} ON {table}
+        WHEN {indexed}
+        BEGIN
+            {remove}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{index}_delete AFTER DELETE ON {table}
+        WHEN {indexed}
+        BEGIN
+            {remove}
+        END""",
+    ]
+
+
+SEARCH_DDL = [ddl for index in SEARCH_INDEXES for ddl in _search_ddl(index)]
@@ -0,0 +1,105 @@
+# Sampling profiler behind GET /debug/profile
+# app/profiler.py
+"""
+Samples the stack of every thread (the event loop, Starlette's
+threadpool, the cloud I/O pool, ...) at a fixed interval and returns them
+in the "folded" format read by flamegraph.pl, speedscope and inferno:
+
+    MainThread;run (base_events.py:600);list_logs (main.py:796) 42
+
+Pure Python (sys._current_frames), so nothing to install and nothing
+runs between profiles. The sampler holds the GIL while it walks the
+stacks; at the default 5 ms interval that costs a few percent of one core
+while a profile runs. It can only sample when the busy thread lets go of
+the GIL, so calls that release it (syscalls, I/O) are over-represented:
+read the graph as where threads are, not as exact CPU shares. Off unless
+PROFILER_ENABLED=1: stacks include file paths and function names.
+"""
+from __future__ import annotations
+
+import linecache
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+# leaf frames of a thread that is waiting for work, not doing it
+_IDLE = {
+    ("/selectors.py", "select"),                   # event loop with nothing to do
+    ("/threading.py", "wait"),
+    ("/threading.py", "_wait_for_tstate_lock"),
+    ("/queue.py", "get"),                          # anyio worker threads
+}
+# worker loops that block in a C-level queue .get(): idle only while on that line
+_IDLE_AT_GET = {
+    ("/concurrent/futures/thread.py", "_worker"),          # executor threads
+    ("/aiosqlite/core.py", "_connection_worker_thread"),   # one per async DB connection
+}
+
+_running = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running."""
+
+
+def _label(code) -> str:
+    path = code.co_filename
+    parts = path.replace("\\", "/").rsplit("/", 2)
+    short = "/".join(parts[-2:]) if parts[-1] == "__init__.py" else parts[-1]
+    return f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _idle(frame) -> bool:
+    code = frame.f_code
+    path = code.co_filename.replace("\\", "/")
+    if any(path.endswith(f) and code.co_name == name for f, name in _IDLE):
+        return True
+    return any(path.endswith(f) and code.co_name == name for f, name in _IDLE_AT_GET) and \
+        ".get(" in linecache.getline(code.co_filename, frame.f_lineno)
+
+
+def sample(seconds: float, interval: float, include_idle: bool = False) -> Dict[Tuple[str, ...], int]:
+    """{stack (root first, thread name on top): samples} over `seconds` (blocking)."""
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        me = threading.get_ident()
+        counts: Counter = Counter()
+        labels: Dict[object, str] = {}     # code object -> label, built once per function
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not include_idle and _idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                counts[tuple(reversed(stack))] += 1
+            time.sleep(interval)
+        return counts
+    finally:
+        _running.release()
+
+
+def folded(counts: Dict[Tuple[str, ...], int]) -> str:
+    """Folded-stack text, heaviest stacks first."""
+    return "".join(f"{';'.join(stack)} {n}\n" for stack, n in sorted(counts.items(), key=lambda kv: -kv[1]))
+
+
+def profile(seconds: float, interval: float = 0.005, include_idle: bool = False) -> str:
+    return folded(sample(min(seconds, MAX_SECONDS), interval, include_idle))
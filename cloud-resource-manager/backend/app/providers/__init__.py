@@ -0,0 +1,186 @@
+# Provider adapter registry
+# app/providers/__init__.py
+"""
+Every cloud call goes through here. Adapters (base.ProviderAdapter) are
+registered per (provider, resource type); routes and services call the
+functions below, which look the adapter up and wrap each call with:
+
+  - a per-provider limit on calls in flight (PROVIDER_MAX_CALLS),
+  - a timeout for the whole operation (PROVIDER_OP_TIMEOUT), on top of the
+    per-SDK-call timeout in app.concurrency,
+  - latency and error metrics per provider / type / operation (the
+    provider_operation_* series at /metrics) and a log line for slow calls.
+
+Below that, every SDK call also passes the per-(service, region) rate
+limiter and circuit breaker in app.resilience. When a metrics call fails
+(breaker open, throttled, outage) metrics() serves the last series it
+got for those resources, shifted onto the requested axis.
+
+describe() and metrics() take any mix of resources, group them by adapter
+and run one describe_many / metrics_many per adapter concurrently, so
+batching is the adapter's business and callers never branch on provider.
+A new provider is an adapter class plus a register() call.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .. import models, telemetry, tracing
+from . import aws, mock
+from .base import Axis, Columns, ProviderAdapter, to_points
+
+__all__ = [
+    "Axis", "Columns", "ProviderAdapter", "to_points",
+    "register", "get", "adapters", "create", "delete", "describe", "metrics",
+]
+
+MAX_CALLS = int(os.getenv("PROVIDER_MAX_CALLS", "32"))         # per provider
+OP_TIMEOUT = float(os.getenv("PROVIDER_OP_TIMEOUT", "60"))     # seconds
+SLOW_CALL = float(os.getenv("PROVIDER_SLOW_CALL", "5"))        # seconds; logged above this
+LAST_KNOWN_MAX = int(os.getenv("PROVIDER_LAST_KNOWN_MAX", "4096"))   # metric series kept for outages
+
+logger = logging.getLogger(__name__)
+
+OP_SECONDS = telemetry.Histogram(
+    "provider_operation_duration_seconds", "Adapter operation latency, all SDK calls included.",
+    ("provider", "type", "operation"), buckets=telemetry.CLOUD_BUCKETS,
+)
+OP_ERRORS = telemetry.Counter(
+    "provider_operation_errors_total", "Adapter operations that raised.", ("provider", "type", "operation"),
+)
+
+
+_adapters: Dict[Tuple[str, str], ProviderAdapter] = {}
+_limits: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(MAX_CALLS))
+# (resource id, period, statistics) -> last (axis, columns) an adapter returned
+_last_known: "OrderedDict[Tuple, Tuple[Axis, Columns]]" = OrderedDict()
+
+
+def register(adapter: ProviderAdapter) -> None:
+    """Route (adapter.provider, adapter.type) to `adapter`, replacing any earlier one."""
+    _adapters[(adapter.provider, adapter.type)] = adapter
+
+
+def get(provider: str, rtype: str) -> ProviderAdapter:
+    try:
+        return _adapters[(provider, rtype)]
+    except KeyError:
+        raise ValueError(f"Unsupported {provider} resource type: {rtype}") from None
+
+
+def adapters() -> List[ProviderAdapter]:
+    return list(_adapters.values())
+
+
+async def _call(adapter: ProviderAdapter, op: str, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    async with _limits[adapter.provider]:
+        t0 = time.perf_counter()
+        try:
+            with tracing.span(f"{adapter.provider}/{adapter.type}.{op}", "provider"):
+                return await asyncio.wait_for(fn(*args), OP_TIMEOUT)
+        except Exception:
+            OP_ERRORS.labels(adapter.provider, adapter.type, op).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            OP_SECONDS.labels(adapter.provider, adapter.type, op).observe(elapsed)
+            if elapsed >= SLOW_CALL:
+                logger.warning("slow provider call", extra={
+                    "provider": adapter.provider, "type": adapter.type, "operation": op,
+                    "duration_ms": round(elapsed * 1000, 1),
+                })
+
+
+def _by_adapter(resources: Iterable[models.Resource]) -> Dict[ProviderAdapter, List[models.Resource]]:
+    groups: Dict[ProviderAdapter, List[models.Resource]] = defaultdict(list)
+    for r in resources:
+        adapter = _adapters.get((r.provider, r.type))
+        if adapter is not None:
+            groups[adapter].append(r)
+    return groups
+
+
+# -----------------------------------------------------
+# Operations
+# -----------------------------------------------------
+async def create(provider: str, rtype: str, name: str, region: str, token: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Create the cloud side of a resource and return (external_id, status).
+    Exceptions (timeouts, missing credentials, ...) propagate to the caller,
+    which decides whether to retry.
+    """
+    adapter = get(provider, rtype)
+    return await _call(adapter, "create", adapter.create, name, region, token)
+
+
+async def delete(provider: str, rtype: str, external_id: Optional[str]) -> None:
+    """Delete the cloud side of a resource. Raises if the provider reports that it failed."""
+    adapter = get(provider, rtype)
+    await _call(adapter, "delete", adapter.delete, external_id or "")
+
+
+async def describe(resources: Iterable[models.Resource]) -> Dict[int, Optional[str] | BaseException]:
+    """
+    Current status per resource id, or the exception that stopped it being
+    checked. Resources whose adapter has nothing to refresh are left out.
+    """
+    groups = _by_adapter(resources)
+    results = await asyncio.gather(
+        *(_call(a, "describe_many", a.describe_many, rs) for a, rs in groups.items()),
+        return_exceptions=True,
+    )
+    out: Dict[int, Optional[str] | BaseException] = {}
+    for (adapter, rs), got in zip(groups.items(), results):
+        if isinstance(got, BaseException):
+            out.update((r.id, got) for r in rs)
+        else:
+            out.update(got)
+    return out
+
+
+async def metrics(
+    resources: Iterable[models.Resource],
+    window: int,
+    period: int,
+    statistics: Optional[Dict[str, str]] = None,
+) -> Tuple[Axis, Dict[int, Tuple[str, Columns]]]:
+    """
+    Series for the last `window` seconds on one shared axis, as
+    {resource id: (source, columns)}. If an adapter call fails, its
+    resources get their last-known series instead, or are left out if
+    there is none; so are resources without metrics.
+    """
+    axis = Axis.last(window, period)
+    stat_key = tuple(sorted((statistics or {}).items()))
+    groups = {a: rs for a, rs in _by_adapter(resources).items() if a.metrics_source}
+    results = await asyncio.gather(
+        *(_call(a, "metrics_many", a.metrics_many, rs, axis, statistics) for a, rs in groups.items()),
+        return_exceptions=True,
+    )
+    out: Dict[int, Tuple[str, Columns]] = {}
+    for (adapter, rs), got in zip(groups.items(), results):
+        if isinstance(got, BaseException):
+            logger.warning("metrics failed, serving last-known", extra={
+                "provider": adapter.provider, "type": adapter.type, "error": repr(got),
+            })
+            for r in rs:
+                last = _last_known.get((r.id, period, stat_key))
+                if last is not None:
+                    out[r.id] = (adapter.metrics_source, axis.realign(last[1], last[0]))
+            continue
+        for rid, cols in got.items():
+            out[rid] = (adapter.metrics_source, cols)
+            _last_known[(rid, period, stat_key)] = (axis, cols)
+            _last_known.move_to_end((rid, period, stat_key))
+    while len(_last_known) > LAST_KNOWN_MAX:
+        _last_known.popitem(last=False)
+    return axis, out
+
+
+for _adapter in (*aws.ADAPTERS, *mock.ADAPTERS):
+    register(_adapter)
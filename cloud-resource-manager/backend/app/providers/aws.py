@@ -0,0 +1,165 @@
+# AWS adapters (EC2, S3, DynamoDB, Lambda)
+# app/providers/aws.py
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .. import models
+from ..aws import aio as aws
+from ..cache import aligned_expiry, metrics_cache
+from ..concurrency import gather_limited
+from .base import Axis, Columns, ProviderAdapter
+
+# Everything AWS is created in Mumbai
+AWS_REGION = "ap-south-1"
+
+# Upper bound on concurrent describe_table calls per refresh
+DESCRIBE_TABLE_WORKERS = int(os.getenv("STATUS_REFRESH_MAX_WORKERS", "16"))
+
+# Map raw EC2 states to our friendly statuses
+EC2_STATE_MAP = {
+    "pending": "Running",       # treat as up for UI
+    "running": "Running",
+    "stopping": "Stopped",
+    "stopped": "Stopped",
+    "shutting-down": "Stopped",
+    "terminated": "Terminated",
+}
+
+# DynamoDB statuses (simplified)
+DYNAMODB_STATE_MAP = {
+    "creating": "Running",
+    "updating": "Running",
+    "active": "Running",
+    "deleting": "Deleted",
+}
+
+
+def _mapped(r: models.Resource, raw: Optional[str], states: Dict[str, str]) -> Optional[str]:
+    return states.get(raw.lower(), r.status or "Unknown") if raw else r.status
+
+
+class AwsAdapter(ProviderAdapter):
+    provider = "AWS"
+
+    def region(self, region: str) -> str:
+        return AWS_REGION
+
+
+class Ec2Adapter(AwsAdapter):
+    type = "VM"
+    sizing = {"cpu": "1 vCPU", "memory": "1 GB"}
+    metrics_source = "cloudwatch"
+
+    async def create(self, name: str, region: str, token: Optional[str] = None) -> Tuple[str, str]:
+        instance_id, raw_status = await aws.create_instance(name, region, client_token=token)
+        # normalise EC2 initial state
+        if raw_status and raw_status.lower() in ("pending", "running"):
+            return instance_id, "Running"
+        return instance_id, raw_status or "Running"
+
+    async def delete(self, external_id: str) -> None:
+        await aws.terminate_instance(external_id)
+
+    async def describe_many(self, resources: Sequence[models.Resource]) -> Dict[int, Optional[str] | BaseException]:
+        # one describe_instances per chunk of ids, per region
+        by_region: Dict[str, List[models.Resource]] = defaultdict(list)
+        for r in resources:
+            by_region[r.region].append(r)
+        regions = list(by_region)
+        results = await asyncio.gather(
+            *(aws.get_instance_states([r.external_id or "" for r in by_region[region]], region) for region in regions),
+            return_exceptions=True,
+        )
+        out: Dict[int, Optional[str] | BaseException] = {}
+        for region, states in zip(regions, results):
+            for r in by_region[region]:
+                if isinstance(states, BaseException):
+                    out[r.id] = states
+                else:
+                    out[r.id] = _mapped(r, states.get(r.external_id or ""), EC2_STATE_MAP)
+        return out
+
+    async def metrics_many(
+        self,
+        resources: Sequence[models.Resource],
+        axis: Axis,
+        statistics: Optional[Dict[str, str]] = None,
+    ) -> Dict[int, Columns]:
+        # all instances in one (paginated) GetMetricData request, cached until the next period
+        ext_ids = sorted({r.external_id for r in resources if r.external_id})
+        if not ext_ids:
+            return {}
+        window = axis.slots * axis.period
+        stat_key = tuple(sorted((statistics or {}).items()))
+        data = await metrics_cache.get_or_load(
+            ("fleet", tuple(ext_ids), window, axis.period, stat_key, axis.end),
+            lambda: aws.get_ec2_fleet_metrics(ext_ids, window, axis.period, statistics, axis.end),
+            lambda: aligned_expiry(axis.period),
+        )
+        return {r.id: data["series"][r.external_id] for r in resources if r.external_id in data["series"]}
+
+
+class S3Adapter(AwsAdapter):
+    type = "Storage"
+    sizing = {"storage": "5 GB"}
+
+    async def create(self, name: str, region: str, token: Optional[str] = None) -> Tuple[str, str]:
+        bucket_name, raw_status = await aws.create_bucket(name, region, token=token)
+        return bucket_name, raw_status or "Running"
+
+    async def delete(self, external_id: str) -> None:
+        if not await aws.delete_bucket(external_id):
+            raise RuntimeError(f"S3 bucket {external_id} was not deleted")
+
+    async def describe_many(self, resources: Sequence[models.Resource]) -> Dict[int, Optional[str] | BaseException]:
+        # if it exists we treat it as Running
+        return {r.id: "Running" for r in resources}
+
+
+class DynamoDbAdapter(AwsAdapter):
+    type = "Database"
+
+    async def create(self, name: str, region: str, token: Optional[str] = None) -> Tuple[str, str]:
+        table_name, raw_status = await aws.create_table(name, region, token=token)
+        # DynamoDB starts as CREATING; treat as Running for UI
+        if raw_status and raw_status.lower() in ("creating", "active", "updating"):
+            return table_name, "Running"
+        return table_name, raw_status or "Running"
+
+    async def delete(self, external_id: str) -> None:
+        if not await aws.delete_table(external_id):
+            raise RuntimeError(f"DynamoDB table {external_id} was not deleted")
+
+    async def describe_many(self, resources: Sequence[models.Resource]) -> Dict[int, Optional[str] | BaseException]:
+        # no batch describe: one call per table, DESCRIBE_TABLE_WORKERS at a time
+        results = await gather_limited(
+            (aws.get_table_status(r.external_id or "", r.region) for r in resources),
+            DESCRIBE_TABLE_WORKERS,
+        )
+        return {
+            r.id: raw if isinstance(raw, BaseException) else _mapped(r, raw, DYNAMODB_STATE_MAP)
+            for r, raw in zip(resources, results)
+        }
+
+
+class LambdaAdapter(AwsAdapter):
+    type = "Serverless"
+
+    async def create(self, name: str, region: str, token: Optional[str] = None) -> Tuple[str, str]:
+        fn_name, raw_status = await aws.create_basic_function(name, region)
+        return fn_name, raw_status or "Running"
+
+
+class LoadBalancerAdapter(AwsAdapter):
+    type = "Load Balancer"
+
+    async def create(self, name: str, region: str, token: Optional[str] = None) -> Tuple[str, str]:
+        # still logical only for demo
+        return f"aws-lb-{name}", "NotSupportedInFreeTier"
+
+
+ADAPTERS = [Ec2Adapter(), S3Adapter(), DynamoDbAdapter(), LambdaAdapter(), LoadBalancerAdapter()]
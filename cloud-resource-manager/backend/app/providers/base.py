@@ -0,0 +1,105 @@
+# Provider adapter interface
+# app/providers/base.py
+from __future__ import annotations
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .. import models
+from ..aws import metrics as aws_metrics
+
+# Column-oriented metric series: one list per column, one slot per axis point
+Columns = Dict[str, List[Optional[float]]]
+COLUMNS = ("cpu", "memory", "networkIn", "networkOut")
+
+
+class Axis(NamedTuple):
+    """Shared, period-aligned time axis for a metrics request."""
+    start: int     # epoch seconds of the first slot
+    period: int    # seconds per slot
+    slots: int
+
+    @classmethod
+    def last(cls, window: int, period: int, end: Optional[int] = None) -> "Axis":
+        start, slots = aws_metrics.time_axis(window, period, end)
+        return cls(start, period, slots)
+
+    @property
+    def end(self) -> int:
+        return self.start + self.slots * self.period
+
+    def timestamps(self) -> List[str]:
+        return [aws_metrics.iso_utc(self.start + i * self.period) for i in range(self.slots)]
+
+    def empty(self) -> Columns:
+        return {col: [None] * self.slots for col in COLUMNS}
+
+    def realign(self, cols: Columns, source: "Axis") -> Columns:
+        """`cols` from `source` (same period) moved onto this axis; slots it didn't cover are None."""
+        offset = (self.start - source.start) // self.period
+        return {
+            col: [values[i + offset] if 0 <= i + offset < len(values) else None for i in range(self.slots)]
+            for col, values in cols.items()
+        }
+
+
+def to_points(axis: Axis, cols: Columns) -> List[Dict]:
+    """MetricPoint dicts for the slots that have data (the per-resource chart format)."""
+    points = []
+    for i, ts in enumerate(axis.timestamps()):
+        if all(cols[col][i] is None for col in COLUMNS):
+            continue
+        points.append({"time": ts, **{col: cols[col][i] or 0.0 for col in COLUMNS}})
+    return points
+
+
+class ProviderAdapter:
+    """
+    Everything the app does against one (provider, resource type).
+
+    Adapters only talk to the cloud; the functions in app.providers add the
+    per-provider concurrency limit, timeout and call metrics around them, so
+    routes and services never call an SDK helper directly. The defaults
+    describe a logical-only resource: nothing to delete, nothing to refresh,
+    no metrics.
+    """
+
+    provider: str = ""
+    type: str = ""
+    # cpu / memory / storage shown in the UI for what create() provisions
+    sizing: Dict[str, Optional[str]] = {}
+    # MetricSeries.source for metrics_many(); None if the type has no metrics
+    metrics_source: Optional[str] = None
+
+    def region(self, region: str) -> str:
+        """Region the resource will actually be created in."""
+        return region
+
+    async def create(self, name: str, region: str, token: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Create the cloud side and return (external_id, status). `token` is an
+        idempotency token: retrying with the same one must not create twice.
+        """
+        raise NotImplementedError
+
+    async def delete(self, external_id: str) -> None:
+        """Delete the cloud side; raise if the provider says it failed."""
+
+    async def describe_many(self, resources: Sequence[models.Resource]) -> Dict[int, Optional[str] | BaseException]:
+        """
+        Current status per resource id (None: unknown, keep the stored one),
+        or the exception that stopped that resource being checked.
+        Resources left out have nothing to refresh.
+        """
+        return {}
+
+    async def metrics_many(
+        self,
+        resources: Sequence[models.Resource],
+        axis: Axis,
+        statistics: Optional[Dict[str, str]] = None,
+    ) -> Dict[int, Columns]:
+        """Series on `axis` per resource id; resources left out have no metrics."""
+        return {}
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.provider}/{self.type}>"
@@ -0,0 +1,48 @@
+# GCP / Azure adapters over the in-process mocks
+# app/providers/mock.py
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple, get_args
+
+from .. import models, schemas
+from ..cloud import aio as mock_cloud
+from .base import COLUMNS, Axis, Columns, ProviderAdapter
+
+
+def _place(points: List[Dict], axis: Axis) -> Columns:
+    """Drop per-point dicts (mock series) into the columns of the shared axis."""
+    cols = axis.empty()
+    for p in points:
+        # mock times are naive UTC
+        epoch = int(datetime.fromisoformat(p["time"]).replace(tzinfo=timezone.utc).timestamp())
+        slot = (epoch - axis.start) // axis.period
+        if 0 <= slot < axis.slots:
+            for col in COLUMNS:
+                cols[col][slot] = p[col]
+    return cols
+
+
+class MockAdapter(ProviderAdapter):
+    """Every resource type of a mocked provider. Logical only; VMs get generated metrics."""
+
+    def __init__(self, provider: str, rtype: str):
+        self.provider = provider
+        self.type = rtype
+        self.metrics_source = "mock" if rtype == "VM" else None
+
+    async def create(self, name: str, region: str, token: Optional[str] = None) -> Tuple[str, str]:
+        return await mock_cloud.create_resource(self.provider, name, self.type, region)
+
+    async def metrics_many(
+        self,
+        resources: Sequence[models.Resource],
+        axis: Axis,
+        statistics: Optional[Dict[str, str]] = None,
+    ) -> Dict[int, Columns]:
+        if self.metrics_source is None:
+            return {}
+        return {r.id: _place(await mock_cloud.generate_metrics(self.provider), axis) for r in resources}
+
+
+ADAPTERS = [MockAdapter(p, t) for p in ("GCP", "Azure") for t in get_args(schemas.ResourceType)]
@@ -0,0 +1,217 @@
+# Paged list queries for /resources and /logs
+# app/queries.py
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, select, tuple_
+
+from . import models
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Public (API) field name -> column. Order here is the order fields come back in.
+RESOURCE_FIELDS = {
+    "id": models.Resource.id,
+    "name": models.Resource.name,
+    "type": models.Resource.type,
+    "provider": models.Resource.provider,
+    "region": models.Resource.region,
+    "status": models.Resource.status,
+    "cpu": models.Resource.cpu,
+    "memory": models.Resource.memory,
+    "storage": models.Resource.storage,
+    "costPerMonth": models.Resource.cost_per_month_inr,
+    "uptime": models.Resource.uptime,
+    "tags": models.Resource.tags,
+    "lastRefreshedAt": models.Resource.last_refreshed_at,
+}
+
+LOG_FIELDS = {
+    "id": models.ActionLog.id,
+    "timestamp": models.ActionLog.timestamp,
+    "user": models.ActionLog.user_email,
+    "action": models.ActionLog.action,
+    "resource": models.Resource.name,
+    "status": models.ActionLog.status,
+    "provider": models.ActionLog.provider,
+}
+
+# Defaults applied when a nullable column is empty, matching the full responses
+_EMPTY_DEFAULTS = {"tags": [], "user": "system", "resource": ""}
+
+
+# -----------------------------------------------------
+# Cursors & projections
+# -----------------------------------------------------
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, dict):
+            raise ValueError("cursor is not an object")
+        return values
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], allowed: Dict[str, Any]) -> Optional[List[str]]:
+    """Turn "id,name" into a list of known field names (None means all fields)."""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def project_row(row: Any, names: List[str]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for name in names:
+        value = getattr(row, name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif value is None and name in _EMPTY_DEFAULTS:
+            value = _EMPTY_DEFAULTS[name]
+        out[name] = value
+    return out
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def split_page(rows: List[Any], limit: int, cursor_of: Callable[[Any], str]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Queries fetch limit + 1 rows; the extra row only tells us there is a
+    next page. Returns (page, next cursor or None).
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, cursor_of(rows[-1])
+
+
+# -----------------------------------------------------
+# Resources: keyset on id ASC
+# -----------------------------------------------------
+@dataclass
+class ResourceFilters:
+    provider: Optional[str] = None
+    type: Optional[str] = None
+    status: Optional[str] = None
+    region: Optional[str] = None
+
+
+def resource_query(
+    filters: ResourceFilters,
+    cursor: Optional[str] = None,
+    names: Optional[List[str]] = None,
+) -> Select:
+    """
+    Build the /resources query. With `names` only those columns (plus id,
+    which the cursor needs) are selected; otherwise full Resource rows.
+    """
+    if names is None:
+        q = select(models.Resource)
+    else:
+        wanted = ["id"] + [n for n in names if n != "id"]
+        q = select(*(RESOURCE_FIELDS[n].label(n) for n in wanted))
+
+    for attr in ("provider", "type", "status", "region"):
+        value = getattr(filters, attr)
+        if value is not None:
+            q = q.where(getattr(models.Resource, attr) == value)
+
+    if cursor:
+        after = decode_cursor(cursor)
+        try:
+            last_id = int(after["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        q = q.where(models.Resource.id > last_id)
+
+    return q.order_by(models.Resource.id.asc())
+
+
+def resource_cursor(row: Any) -> str:
+    return encode_cursor({"id": row.id})
+
+
+# -----------------------------------------------------
+# Logs: keyset on (timestamp DESC, id DESC)
+# -----------------------------------------------------
+@dataclass
+class LogFilters:
+    provider: Optional[str] = None
+    action: Optional[str] = None
+    status: Optional[str] = None
+    resource_id: Optional[int] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
+def log_query(
+    filters: LogFilters,
+    cursor: Optional[str] = None,
+    names: Optional[List[str]] = None,
+) -> Select:
+    """
+    Build the /logs query. Always a column select with the resource name
+    joined in, so there is no per-row lazy load of ActionLog.resource.
+    """
+    wanted = names or list(LOG_FIELDS)
+    # the cursor needs timestamp and id even if they weren't asked for
+    for key in ("timestamp", "id"):
+        if key not in wanted:
+            wanted = wanted + [key]
+    log = models.ActionLog
+    q = select(*(LOG_FIELDS[n].label(n) for n in wanted)).select_from(log)
+    if "resource" in wanted:
+        q = q.outerjoin(models.Resource, log.resource_id == models.Resource.id)
+
+    if filters.provider is not None:
+        q = q.where(log.provider == filters.provider)
+    if filters.action is not None:
+        q = q.where(log.action == filters.action)
+    if filters.status is not None:
+        q = q.where(log.status == filters.status)
+    if filters.resource_id is not None:
+        q = q.where(log.resource_id == filters.resource_id)
+    if filters.since is not None:
+        q = q.where(log.timestamp >= filters.since)
+    if filters.until is not None:
+        q = q.where(log.timestamp < filters.until)
+
+    if cursor:
+        ts, last_id = log_cursor_key(cursor)
+        q = q.where(tuple_(log.timestamp, log.id) < tuple_(ts, last_id))
+
+    return q.order_by(log.timestamp.desc(), log.id.desc())
+
+
+def log_cursor(row: Any) -> str:
+    return encode_cursor({"ts": row.timestamp.isoformat(), "id": row.id})
+
+
+def log_cursor_key(cursor: str) -> Tuple[datetime, int]:
+    """(timestamp, id) of the last entry on the previous page."""
+    after = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(after["ts"]), int(after["id"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,283 @@
+# Rate limiting and circuit breaking for cloud provider calls
+# app/resilience.py
+"""
+One Guard per (provider, service, region) sits in front of every SDK call
+(app/aws/clients.py wraps each client with one). It combines:
+
+  - a token bucket (CLOUD_RATE_LIMIT calls/s, CLOUD_RATE_BURST deep) that
+    halves its rate when the provider reports throttling and creeps back
+    up on success. A call that would wait longer than CLOUD_RATE_MAX_WAIT
+    raises RateLimited instead of queueing.
+  - a circuit breaker that opens after BREAKER_FAILURE_THRESHOLD failures
+    in a row (outages, 5xx, bad credentials; not "no such bucket"). While
+    it's open, calls raise CircuitOpen at once. After the cooldown one
+    probe call is let through; success closes the breaker, failure opens
+    it again with the cooldown doubled (up to BREAKER_MAX_COOLDOWN).
+
+Both raise DependencyUnavailable subclasses, which callers treat as "keep
+the last-known state" rather than as a failed resource. Guards run on
+the cloud I/O threads, so they use threading locks and time.sleep.
+
+Every call is also timed into the cloud_call_* metrics in app.telemetry.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from . import telemetry, tracing
+
+logger = logging.getLogger(__name__)
+
+RATE = float(os.getenv("CLOUD_RATE_LIMIT", "50"))          # calls/s per guard; 0 disables the limiter
+BURST = float(os.getenv("CLOUD_RATE_BURST", "100"))
+MIN_RATE = float(os.getenv("CLOUD_RATE_MIN", "1"))
+MAX_WAIT = float(os.getenv("CLOUD_RATE_MAX_WAIT", "5"))    # seconds
+FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))      # seconds
+MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN", "300"))
+
+# Outcome of a call, as judged by a provider's classify()
+OK, THROTTLED, FAILURE = "ok", "throttled", "failure"
+
+Key = Tuple[str, str, str]   # (provider, service, region)
+
+
+class DependencyUnavailable(RuntimeError):
+    """The call was not made; the dependency is unhealthy or we're over its rate."""
+
+    def __init__(self, key: Key, message: str, retry_in: float = 0.0):
+        super().__init__(f"{'/'.join(key)}: {message}")
+        self.key = key
+        self.retry_in = retry_in
+
+
+class CircuitOpen(DependencyUnavailable):
+    pass
+
+
+class RateLimited(DependencyUnavailable):
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket with multiplicative decrease on throttling."""
+
+    def __init__(self, rate: float = RATE, burst: float = BURST, min_rate: float = MIN_RATE):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.min_rate = min(min_rate, rate) if rate > 0 else 0.0
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._decreased_at = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> float | None:
+        """
+        Take a token and return how long to sleep before using it, or None
+        if that would be longer than max_wait (nothing is taken then).
+        """
+        if self.max_rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            # tokens may go negative: each waiter reserves its place in line
+            wait = (1.0 - self._tokens) / self.rate if self._tokens < 1.0 else 0.0
+            if wait > max_wait:
+                return None
+            self._tokens -= 1.0
+            return wait
+
+    def throttled(self) -> None:
+        # calls already in flight get throttled together: one decrease per second at most
+        with self._lock:
+            now = time.monotonic()
+            if now - self._decreased_at >= 1.0:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._decreased_at = now
+
+    def succeeded(self) -> None:
+        # +max_rate/20 per second of successful calls at the current rate
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20 / self.rate)
+
+
+class CircuitBreaker:
+    """Closed -> open after FAILURE_THRESHOLD failures in a row -> half-open after the cooldown."""
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN, max_cooldown: float = MAX_COOLDOWN):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = "closed"
+        self.failures = 0              # consecutive
+        self.cooldown = cooldown
+        self.opened_at = 0.0           # monotonic
+        self.last_error: str | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        """True if a call may go out now (at most one probe while half-open)."""
+        with self._lock:
+            if self.state == "open" and self.retry_in() <= 0:
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probing:
+                    return False
+                self._probing = True
+            return self.state != "open"
+
+    def release(self) -> None:
+        """The probe let through by allow() was not made after all."""
+        with self._lock:
+            self._probing = False
+
+    def success(self) -> bool:
+        """Record a success; True if this one closed the breaker."""
+        with self._lock:
+            was_open = self.state != "closed"
+            self.state, self.failures, self.cooldown, self._probing = "closed", 0, self.base_cooldown, False
+            return was_open
+
+    def failure(self, error: BaseException) -> bool:
+        """Record a failure; True if this one opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            self.last_error = repr(error)
+            if self.state == "half_open":
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self.state == "open" or self.failures < self.threshold:
+                return False
+            self.state, self.opened_at, self._probing = "open", time.monotonic(), False
+            return True
+
+
+CALL_SECONDS = telemetry.Histogram(
+    "cloud_call_duration_seconds", "Cloud SDK call latency.", ("provider", "service", "operation"),
+    buckets=telemetry.CLOUD_BUCKETS,
+)
+CALL_ERRORS = telemetry.Counter(
+    "cloud_call_errors_total", "Cloud SDK calls that raised, by outcome (throttled, failure, error).",
+    ("provider", "service", "operation", "kind"),
+)
+CALLS_REJECTED = telemetry.Counter(
+    "cloud_calls_rejected_total", "Cloud SDK calls not made (circuit_open, rate_limited).",
+    ("provider", "service", "operation", "reason"),
+)
+_STATE_VALUE = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class Guard:
+    def __init__(self, key: Key, classify: Callable[[BaseException], str]):
+        self.key = key
+        self.classify = classify
+        self.bucket = TokenBucket()
+        self.breaker = CircuitBreaker()
+        self.calls = 0
+        self.rejected = 0
+
+    def run(self, operation: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call fn (the SDK's `operation`) through the breaker and the rate limiter (blocking)."""
+        provider, service, _ = self.key
+        if not self.breaker.allow():
+            self.rejected += 1
+            CALLS_REJECTED.labels(provider, service, operation, "circuit_open").inc()
+            raise CircuitOpen(self.key, "circuit open", self.breaker.retry_in())
+        wait = self.bucket.reserve(MAX_WAIT)
+        if wait is None:
+            self.rejected += 1
+            self.breaker.release()
+            CALLS_REJECTED.labels(provider, service, operation, "rate_limited").inc()
+            raise RateLimited(self.key, f"over {self.bucket.rate:.1f} calls/s", 1.0 / max(self.bucket.rate, 1e-9))
+        if wait:
+            time.sleep(wait)
+        self.calls += 1
+        t0 = time.perf_counter()
+        try:
+            with tracing.span(f"{service}.{operation}", "cloud", region=self.key[2]):
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            CALL_SECONDS.labels(provider, service, operation).observe(time.perf_counter() - t0)
+            outcome = self.classify(e)
+            CALL_ERRORS.labels(provider, service, operation, "error" if outcome == OK else outcome).inc()
+            if outcome == FAILURE:
+                if self.breaker.failure(e):
+                    logger.warning("breaker opened", extra={
+                        "guard": "/".join(self.key), "cooldown_s": self.breaker.cooldown, "error": repr(e),
+                    })
+            else:
+                # throttling or a per-resource error: the dependency itself answered
+                if outcome == THROTTLED:
+                    self.bucket.throttled()
+                self._closed()
+            raise
+        CALL_SECONDS.labels(provider, service, operation).observe(time.perf_counter() - t0)
+        self.bucket.succeeded()
+        self._closed()
+        return result
+
+    def _closed(self) -> None:
+        if self.breaker.success():
+            logger.info("breaker closed", extra={"guard": "/".join(self.key)})
+
+    def snapshot(self) -> Dict[str, Any]:
+        b = self.breaker
+        return {
+            "provider": self.key[0],
+            "service": self.key[1],
+            "region": self.key[2],
+            "state": b.state,
+            "consecutiveFailures": b.failures,
+            "retryIn": round(b.retry_in(), 1) if b.state == "open" else 0.0,
+            "lastError": b.last_error,
+            "rate": round(self.bucket.rate, 2) if self.bucket.max_rate > 0 else None,
+            "calls": self.calls,
+            "rejected": self.rejected,
+        }
+
+
+_guards: Dict[Key, Guard] = {}
+_lock = threading.Lock()
+
+
+def guard(provider: str, service: str, region: str, classify: Callable[[BaseException], str]) -> Guard:
+    """The shared Guard for (provider, service, region), created on first use."""
+    key = (provider, service, region)
+    g = _guards.get(key)
+    if g is None:
+        with _lock:
+            g = _guards.setdefault(key, Guard(key, classify))
+    return g
+
+
+def snapshot() -> List[Dict[str, Any]]:
+    return [g.snapshot() for g in list(_guards.values())]
+
+
+telemetry.Gauge(
+    "cloud_breaker_state", "Circuit breaker per guard: 0 closed, 1 half open, 2 open.",
+    ("provider", "service", "region"),
+    collect=lambda: {k: _STATE_VALUE[g.breaker.state] for k, g in list(_guards.items())},
+)
+telemetry.Gauge(
+    "cloud_rate_limit", "Current calls/s allowed per guard (absent when the limiter is off).",
+    ("provider", "service", "region"),
+    collect=lambda: {k: g.bucket.rate for k, g in list(_guards.items()) if g.bucket.max_rate > 0},
+)
+
+
+def reset() -> None:
+    """Forget every guard (tests, benchmarks, new credentials)."""
+    with _lock:
+        _guards.clear()
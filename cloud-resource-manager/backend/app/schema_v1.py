@@ -0,0 +1,197 @@
+# Frozen schema of migration 1 (baseline)
+# app/schema_v1.py
+"""
+The schema as it was when migrations were introduced, written out as
+Core tables so it never follows later edits to models.py. Migration 1
+builds exactly this; every later model change is its own numbered step
+in app/migrations.py. Do not edit: a database stamped version 1 must
+mean the same schema whichever build stamped it.
+"""
+from sqlalchemy import JSON, Column, Date, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, text
+
+metadata = MetaData()
+
+resources = Table(
+    "resources",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("provider", String, nullable=False),
+    Column("type", String, nullable=False),
+    Column("region", String, nullable=False),
+    Column("status", String),
+    Column("external_id", String),
+    Column("cpu", String),
+    Column("memory", String),
+    Column("storage", String),
+    Column("cost_per_month_inr", Float),
+    Column("uptime", Float),
+    Column("tags", JSON),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("last_refreshed_at", DateTime),
+    Column("row_version", Integer),
+    Index("ix_resources_provider_type_status", "provider", "type", "status"),
+    Index("ix_resources_status", "status"),
+    Index("ix_resources_region", "region"),
+    Index("ix_resources_row_version", "row_version"),
+)
+
+action_logs = Table(
+    "action_logs",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("timestamp", DateTime),
+    Column("resource_id", Integer, ForeignKey("resources.id")),
+    Column("user_email", String),
+    Column("action", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("provider", String),
+    Column("details", JSON),
+    Column("row_version", Integer),
+)
+Index("ix_action_logs_timestamp_id", action_logs.c.timestamp.desc(), action_logs.c.id.desc())
+Index("ix_action_logs_resource_id_timestamp", action_logs.c.resource_id, action_logs.c.timestamp.desc(),
+      action_logs.c.id.desc())
+Index("ix_action_logs_action_timestamp", action_logs.c.action, action_logs.c.timestamp.desc(), action_logs.c.id.desc())
+Index("ix_action_logs_row_version", action_logs.c.row_version)
+
+users = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, nullable=False),
+    Column("name", String, nullable=False),
+    Column("password_hash", String),
+    Column("role", String),
+    Column("status", String),
+    Column("avatar", String),
+    Column("last_login", DateTime),
+)
+
+jobs = Table(
+    "jobs",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("kind", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("resource_id", Integer, ForeignKey("resources.id", ondelete="SET NULL")),
+    Column("provider", String, nullable=False),
+    Column("region", String, nullable=False),
+    Column("idempotency_key", String, unique=True),
+    Column("attempts", Integer),
+    Column("error", String),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("finished_at", DateTime),
+    Index("ix_jobs_status", "status"),
+)
+
+metric_samples = Table(
+    "metric_samples",
+    metadata,
+    Column("resource_id", Integer, primary_key=True),
+    Column("resolution", Integer, primary_key=True),
+    Column("ts", Integer, primary_key=True),
+    Column("cpu", Float),
+    Column("cpu_max", Float),
+    Column("memory", Float),
+    Column("network_in", Float),
+    Column("network_out", Float),
+    Column("samples", Integer, nullable=False),
+    Index("ix_metric_samples_resolution_ts", "resolution", "ts"),
+    sqlite_with_rowid=False,
+)
+
+cost_rollups = Table(
+    "cost_rollups",
+    metadata,
+    Column("dimension", String, primary_key=True),
+    Column("key", String, primary_key=True),
+    Column("monthly_inr", Float, nullable=False),
+    Column("resources", Integer, nullable=False),
+)
+
+cost_daily = Table(
+    "cost_daily",
+    metadata,
+    Column("dimension", String, primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("key", String, primary_key=True),
+    Column("amount_inr", Float, nullable=False),
+    sqlite_with_rowid=False,
+)
+
+cost_ledger_state = Table(
+    "cost_ledger_state",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("accrued_until", DateTime),
+)
+
+alerts = Table(
+    "alerts",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String, nullable=False),
+    Column("rule", String, nullable=False),
+    Column("resource_id", Integer),
+    Column("severity", String, nullable=False),
+    Column("title", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("occurrences", Integer, nullable=False),
+    Column("details", JSON),
+    Column("first_seen", DateTime),
+    Column("last_seen", DateTime),
+    Column("resolved_at", DateTime),
+)
+Index("ux_alerts_open_fingerprint", alerts.c.fingerprint, unique=True, sqlite_where=text("status = 'open'"))
+Index("ix_alerts_open_first_seen", alerts.c.first_seen.desc(), alerts.c.id.desc(), sqlite_where=text("status = 'open'"))
+Index("ix_alerts_open_resource_id", alerts.c.resource_id, sqlite_where=text("status = 'open'"))
+
+table_versions = Table(
+    "table_versions",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("floor", Integer, nullable=False),
+)
+
+sync_tombstones = Table(
+    "sync_tombstones",
+    metadata,
+    Column("table_name", String, primary_key=True),
+    Column("version", Integer, primary_key=True),
+    Column("row_id", Integer, nullable=False),
+    Column("deleted_at", DateTime),
+    sqlite_with_rowid=False,
+)
+
+
+def _sync_triggers(table: str) -> list:
+    bump = f"UPDATE table_versions SET version = version + 1 WHERE name = '{table}';"
+    current = f"(SELECT version FROM table_versions WHERE name = '{table}')"
+    return [
+        f"INSERT OR IGNORE INTO table_versions (name, version, floor) VALUES ('{table}', 0, 0)",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_insert AFTER INSERT ON {table}
+        BEGIN
+            {bump}
+            UPDATE {table} SET row_version = {current} WHERE id = NEW.id;
+        END""",
+        # the insert trigger's own row_version write must not count as a second change
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_update AFTER UPDATE ON {table}
+        WHEN NEW.row_version IS OLD.row_version
+        BEGIN
+            {bump}
+            UPDATE {table} SET row_version = {current} WHERE id = NEW.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_delete AFTER DELETE ON {table}
+        BEGIN
+            {bump}
+            INSERT INTO sync_tombstones (table_name, version, row_id, deleted_at)
+            VALUES ('{table}', {current}, OLD.id, CURRENT_TIMESTAMP);
+        END""",
+    ]
+
+
+TRIGGERS = _sync_triggers("resources") + _sync_triggers("action_logs")
@@ -1,5 +1,6 @@
 # app/schemas.py
-from typing import List, Optional, Literal
+from datetime import date, datetime
+from typing import Dict, List, Optional, Literal
 from pydantic import BaseModel
 
 # ---- Common literal types ----
@@ -38,6 +39,7 @@ class ResourceBase(BaseModel):
     costPerMonth: float
     uptime: float
     tags: List[str]
+    lastRefreshedAt: Optional[str] = None   # last time status was confirmed with the cloud
 
     class Config:
         from_attributes = True
@@ -56,6 +58,14 @@ class ResourceCreate(BaseModel):
     config: dict = {}              # extra options; not used yet
 
 
+class ResourceAccepted(ResourceBase):
+    """
+    202 response for POST /resources: the row as written (status "Creating")
+    plus the provisioning job to poll at /jobs/{jobId}.
+    """
+    jobId: str
+
+
 class ResourceUpdate(BaseModel):
     """
     For PUT /resources/{id} – everything optional.
@@ -66,6 +76,40 @@ class ResourceUpdate(BaseModel):
     tags: Optional[List[str]] = None
 
 
+class ResourceBatchUpdate(ResourceUpdate):
+    """One item of PUT /resources:batch."""
+    id: int
+
+
+class BatchItemResult(BaseModel):
+    """
+    Per-item outcome of a /resources:batch call, in request order.
+    On a successful delete `error` may still carry a cloud-side warning
+    (the row is removed either way, as with DELETE /resources/{id}).
+    """
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+    resource: Optional[ResourceBase] = None
+    jobId: Optional[str] = None
+
+
+# ---- Jobs ----
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    resourceId: Optional[int] = None
+    attempts: int
+    error: Optional[str] = None
+    createdAt: str
+    updatedAt: str
+    finishedAt: Optional[str] = None
+    resource: Optional[ResourceBase] = None
+
+
 # ---- Logs ----
 
 class LogEntry(BaseModel):
@@ -81,6 +125,29 @@ class LogEntry(BaseModel):
         from_attributes = True
 
 
+# ---- Delta sync ----
+
+class ResourceChanges(BaseModel):
+    version: int                     # pass as ?since= next time
+    changed: List[ResourceBase]
+    deleted: List[int]
+    more: bool                       # another page of changes is waiting
+
+
+class LogChanges(BaseModel):
+    version: int
+    changed: List[LogEntry]
+    deleted: List[int]
+    more: bool
+
+
+# ---- Search ----
+
+class SearchResults(BaseModel):
+    resources: List[ResourceBase]    # best match first
+    logs: List[LogEntry]             # newest first
+
+
 # ---- Metrics ----
 
 class MetricPoint(BaseModel):
@@ -91,10 +158,95 @@ class MetricPoint(BaseModel):
     networkOut: float
 
 
+class FleetSeries(BaseModel):
+    """One resource's columns; index i lines up with FleetMetrics.timestamps[i]."""
+    source: Literal["cloudwatch", "mock"]
+    cpu: List[Optional[float]]
+    memory: List[Optional[float]]
+    networkIn: List[Optional[float]]
+    networkOut: List[Optional[float]]
+
+
+class FleetMetrics(BaseModel):
+    period: int
+    start: int                       # epoch seconds of timestamps[0]
+    timestamps: List[str]
+    series: Dict[int, FleetSeries]   # keyed by resource id
+    missing: List[int] = []          # ids with no metrics (non-VM types, CloudWatch errors)
+
+
+class MetricHistory(BaseModel):
+    """Stored points for one resource, as columns (index i = timestamps[i])."""
+    resolution: int                  # seconds per point: 300, 3600 or 86400
+    timestamps: List[str]
+    cpu: List[Optional[float]]
+    cpuMax: List[Optional[float]]
+    memory: List[Optional[float]]
+    networkIn: List[Optional[float]]
+    networkOut: List[Optional[float]]
+
+
+class AggregateGroup(BaseModel):
+    """Per-bucket stats for one group; lists line up with MetricAggregate.buckets."""
+    resources: int
+    points: List[int]
+    avg: Optional[List[Optional[float]]] = None
+    max: Optional[List[Optional[float]]] = None
+    p95: Optional[List[Optional[float]]] = None
+    p99: Optional[List[Optional[float]]] = None
+
+
+class MetricAggregate(BaseModel):
+    metric: str
+    groupBy: Optional[str] = None
+    resolution: int
+    bucket: int                      # seconds per bucket
+    buckets: List[str]               # bucket start times
+    groups: Dict[str, AggregateGroup]
+
+
+# ---- Costs ----
+
+class CostBucket(BaseModel):
+    monthly: float
+    resources: int
+
+
+class CostSummary(BaseModel):
+    currency: str = "INR"
+    totalMonthly: float
+    resources: int
+    byProvider: Dict[str, CostBucket]
+    byRegion: Dict[str, CostBucket]
+    byType: Dict[str, CostBucket]
+    byTag: Dict[str, CostBucket]
+
+
+class CostLedgerGroup(BaseModel):
+    total: float
+    series: List[float]              # one value per entry in periods
+
+
+class CostLedger(BaseModel):
+    currency: str = "INR"
+    since: date
+    until: date
+    groupBy: Optional[str] = None
+    granularity: str
+    accruedUntil: Optional[datetime] = None
+    total: float
+    periods: List[str]               # days (YYYY-MM-DD) or months (YYYY-MM)
+    groups: Dict[str, CostLedgerGroup]
+
+
 # ---- Alerts ----
 
 class Alert(BaseModel):
     id: str
     title: str
     severity: Literal["Critical", "Warning", "Info"]
-    time: str
+    time: str                        # first seen
+    rule: Optional[str] = None
+    resourceId: Optional[int] = None
+    lastSeen: Optional[str] = None
+    occurrences: int = 1
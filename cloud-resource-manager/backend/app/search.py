@@ -0,0 +1,216 @@
+# Full-text search over resources and the audit log
+# app/search.py
+"""
+/search reads the FTS5 indexes defined in models.SEARCH_INDEXES. Queries
+never scan resources or action_logs: the index returns row ids and only
+those rows are loaded. The resource index is kept current by triggers;
+audit entries are added by `indexer` in batches every
+SEARCH_INDEX_INTERVAL seconds, so they show up in search that much later
+and inserting them stays cheap.
+
+Every word of `q` must match, as a prefix when it has at least
+MIN_PREFIX characters ("web-se" finds "web-server-01"). "field:value"
+limits a word to one field, e.g. "tag:prod region:ap-south". Resources
+come back best match first (bm25, name and external id weighted highest);
+log entries newest first, which stays a bounded index walk however many
+rows match. Archived log entries (services/audit.py) are not indexed.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Float, Integer, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, queries
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "200"))
+MAX_TERMS = 16
+MIN_PREFIX = 2   # shorter words only match whole tokens
+
+INDEXER_ENABLED = os.getenv("SEARCH_INDEXER_ENABLED", "1") == "1"
+INDEX_INTERVAL = float(os.getenv("SEARCH_INDEX_INTERVAL", "1"))   # seconds
+INDEX_BATCH = int(os.getenv("SEARCH_INDEX_BATCH", "20000"))       # rows per transaction
+
+# "field:" names accepted in q -> indexed column
+RESOURCE_FIELDS = {
+    "name": "name",
+    "tag": "tags",
+    "tags": "tags",
+    "id": "external_id",
+    "external_id": "external_id",
+    "region": "region",
+    "provider": "provider",
+    "type": "type",
+}
+LOG_FIELDS = {
+    "user": "user_email",
+    "action": "action",
+    "status": "status",
+    "provider": "provider",
+    "details": "details",
+}
+
+# bm25 weight per resources_fts column, in index column order
+RESOURCE_WEIGHTS = {"name": 10.0, "tags": 5.0, "external_id": 8.0, "region": 2.0, "provider": 1.0, "type": 1.0}
+
+_WORD = re.compile(r"\w+")
+
+
+def match_expression(q: str, fields: Dict[str, str]) -> Optional[str]:
+    """
+    FTS5 MATCH expression for user input, or None if it has no words.
+    Words are re-quoted, so input can't inject FTS5 syntax.
+    """
+    parts: List[str] = []
+    for term in q.split()[:MAX_TERMS]:
+        column = None
+        field, sep, rest = term.partition(":")
+        if sep and rest and field.lower() in fields:
+            column, term = fields[field.lower()], rest
+        words = _WORD.findall(term)
+        if not words:
+            continue
+        # "web-server" is the phrase "web server"; the last word may be a prefix
+        phrase = '"' + " ".join(words) + '"'
+        if len(words[-1]) >= MIN_PREFIX:
+            phrase += " *"
+        parts.append(f"{column} : {phrase}" if column else phrase)
+    return " AND ".join(parts) or None
+
+
+def parse(q: str, fields: Dict[str, str]) -> str:
+    match = match_expression(q, fields)
+    if match is None:
+        raise HTTPException(status_code=400, detail="Search query has no words to match")
+    return match
+
+
+async def search_resources(db: AsyncSession, q: str, limit: int = DEFAULT_LIMIT) -> List[models.Resource]:
+    """Resources matching q, best match first."""
+    weights = ", ".join(str(w) for w in RESOURCE_WEIGHTS.values())
+    hits = (
+        text(
+            f"SELECT rowid AS id, bm25(resources_fts, {weights}) AS score FROM resources_fts"
+            " WHERE resources_fts MATCH :match ORDER BY score LIMIT :limit"
+        )
+        .bindparams(match=parse(q, RESOURCE_FIELDS), limit=limit)
+        .columns(id=Integer, score=Float)
+        .subquery()
+    )
+    result = await db.execute(
+        select(models.Resource)
+        .join(hits, hits.c.id == models.Resource.id)
+        .order_by(hits.c.score, models.Resource.id)
+    )
+    return list(result.scalars())
+
+
+async def search_logs(db: AsyncSession, q: str, limit: int = DEFAULT_LIMIT) -> List:
+    """Audit log entries matching q, newest first, as queries.LOG_FIELDS rows."""
+    hits = (
+        text(
+            "SELECT rowid AS id FROM action_logs_fts"
+            " WHERE action_logs_fts MATCH :match ORDER BY rowid DESC LIMIT :limit"
+        )
+        .bindparams(match=parse(q, LOG_FIELDS), limit=limit)
+        .columns(id=Integer)
+        .subquery()
+    )
+    log = models.ActionLog
+    result = await db.execute(
+        select(*(c.label(n) for n, c in queries.LOG_FIELDS.items()))
+        .select_from(log)
+        .join(hits, hits.c.id == log.id)
+        .outerjoin(models.Resource, log.resource_id == models.Resource.id)
+        .order_by(log.id.desc())
+    )
+    return result.all()
+
+
+# -----------------------------------------------------
+# Deferred indexing
+# -----------------------------------------------------
+async def index_pending(db: AsyncSession, index: str, batch: int = INDEX_BATCH) -> int:
+    """
+    Add up to `batch` rows written since the last pass to a deferred index,
+    oldest change first, and move its watermark past them. Caller commits.
+    """
+    table, _ = models.SEARCH_INDEXES[index]
+    state = models.SearchIndexState
+    # Write first: the transaction then holds SQLite's write lock, so no
+    # version can commit between reading the watermark and moving it.
+    await db.execute(
+        update(state).where(state.name == index).values(indexed_version=state.indexed_version)
+    )
+    since = (await db.execute(select(state.indexed_version).where(state.name == index))).scalar() or 0
+    upto = (await db.execute(
+        text(
+            f"SELECT MAX(row_version) FROM (SELECT row_version FROM {table}"
+            " WHERE row_version > :since ORDER BY row_version LIMIT :batch)"
+        ),
+        {"since": since, "batch": batch},
+    )).scalar()
+    if upto is None:
+        return 0
+    added = await db.execute(
+        text(models.search_insert_sql(index, "WHERE row_version > :since AND row_version <= :upto")),
+        {"since": since, "upto": upto},
+    )
+    await db.execute(update(state).where(state.name == index).values(indexed_version=upto))
+    return added.rowcount
+
+
+class SearchIndexer:
+    """Every INDEX_INTERVAL seconds, bring the deferred indexes up to date."""
+
+    def __init__(self, interval: float = INDEX_INTERVAL):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="search-indexer")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def catch_up(self) -> int:
+        """Index everything pending, one batch per transaction. Returns rows added."""
+        total = 0
+        for index in models.DEFERRED_SEARCH_INDEXES:
+            while True:
+                async with AsyncSessionLocal() as db:
+                    n = await index_pending(db, index)
+                    await db.commit()
+                total += n
+                if n < INDEX_BATCH:
+                    break
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.catch_up()
+            except Exception:
+                logger.exception("indexing failed")
+            await asyncio.sleep(self.interval)
+
+
+indexer = SearchIndexer()
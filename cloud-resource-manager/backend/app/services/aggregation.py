@@ -0,0 +1,183 @@
+# fleet-wide metric rollups over aligned NumPy arrays
+# app/services/aggregation.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+
+# API metric name -> metric_samples column
+METRIC_COLUMNS = {
+    "cpu": models.MetricSample.cpu,
+    "cpuMax": models.MetricSample.cpu_max,
+    "memory": models.MetricSample.memory,
+    "networkIn": models.MetricSample.network_in,
+    "networkOut": models.MetricSample.network_out,
+}
+GROUP_BY = ("provider", "region", "type", "tag")
+STATS = ("avg", "max", "p95", "p99")
+
+
+@dataclass
+class SeriesMatrix:
+    """
+    One metric for many resources on a shared axis: values[i, j] is
+    resource i at start + j * period, NaN where there is no point.
+    Row labels (provider/region/type/tags) line up with the rows.
+    """
+    start: int
+    period: int
+    values: np.ndarray                       # shape (resources, slots), float64
+    resource_ids: np.ndarray                 # shape (resources,)
+    labels: Dict[str, np.ndarray] = field(default_factory=dict)  # provider/region/type -> object array
+    tags: List[List[str]] = field(default_factory=list)
+
+    @property
+    def slots(self) -> int:
+        return self.values.shape[1]
+
+
+def build_matrix(
+    resources: Sequence[Any],
+    rows: Sequence[tuple] | np.ndarray,
+    start: int,
+    end: int,
+    period: int,
+) -> SeriesMatrix:
+    """
+    Scatter (resource_id, ts, value) rows into a SeriesMatrix without a
+    per-point Python loop. `resources` need id/provider/region/type/tags;
+    `rows` should be an array or plain tuples, not SQLAlchemy Rows, which
+    NumPy converts far more slowly.
+    """
+    ids = np.array(sorted(r.id for r in resources), dtype=np.int64)
+    by_id = {r.id: r for r in resources}
+    slots = max(0, (end - start) // period)
+    values = np.full((len(ids), slots), np.nan)
+
+    if len(rows):
+        data = np.asarray(rows, dtype=np.float64)
+        row_idx = np.searchsorted(ids, data[:, 0].astype(np.int64))
+        col_idx = ((data[:, 1] - start) // period).astype(np.int64)
+        ok = (row_idx < len(ids)) & (col_idx >= 0) & (col_idx < slots)
+        ok[ok] = ids[row_idx[ok]] == data[ok, 0]   # drop rows for ids we weren't given
+        values[row_idx[ok], col_idx[ok]] = data[ok, 2]
+
+    ordered = [by_id[i] for i in ids.tolist()]
+    return SeriesMatrix(
+        start=start,
+        period=period,
+        values=values,
+        resource_ids=ids,
+        labels={
+            attr: np.array([getattr(r, attr) for r in ordered], dtype=object)
+            for attr in ("provider", "region", "type")
+        },
+        tags=[list(r.tags or []) for r in ordered],
+    )
+
+
+async def load_matrix(
+    db: AsyncSession,
+    metric: str,
+    start: int,
+    end: int,
+    resolution: int,
+    where: Sequence[Any] = (),
+) -> SeriesMatrix:
+    """
+    Read one metric from metric_samples into a SeriesMatrix for every
+    resource matching `where` (conditions on models.Resource).
+    """
+    r, m = models.Resource, models.MetricSample
+    # only the label columns, not whole ORM objects
+    resources = (await db.execute(select(r.id, r.provider, r.region, r.type, r.tags).where(*where))).all()
+    column = METRIC_COLUMNS[metric]
+    # a subquery rather than an IN list of every id; SQLite then seeks the
+    # primary key per resource instead of walking the (resolution, ts) index
+    result = await db.execute(
+        select(m.resource_id, m.ts, column).where(
+            m.resource_id.in_(select(r.id).where(*where)),
+            m.resolution == resolution,
+            m.ts >= start,
+            m.ts < end,
+            column.is_not(None),
+        )
+    )
+    # straight into one float array: NumPy converts a list of Rows ~75x slower than this
+    rows = np.fromiter(chain.from_iterable(result), dtype=np.float64).reshape(-1, 3)
+    return build_matrix(resources, rows, start, end, resolution)
+
+
+def _group_masks(matrix: SeriesMatrix, group_by: Optional[str]) -> Dict[str, np.ndarray]:
+    n = len(matrix.resource_ids)
+    if group_by is None:
+        return {"all": np.ones(n, dtype=bool)}
+    if group_by == "tag":
+        # a resource counts towards every tag it has
+        masks: Dict[str, np.ndarray] = {}
+        for i, tags in enumerate(matrix.tags):
+            for tag in tags:
+                masks.setdefault(tag, np.zeros(n, dtype=bool))[i] = True
+        return masks
+    column = matrix.labels[group_by]
+    return {str(key): column == key for key in np.unique(column)}
+
+
+def aggregate(
+    matrix: SeriesMatrix,
+    group_by: Optional[str] = None,
+    bucket: Optional[int] = None,
+    stats: Sequence[str] = STATS,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    avg / max / p95 / p99 over every point of every resource in a group,
+    per time bucket (`bucket` seconds, a multiple of the matrix period;
+    None = the whole range as one bucket).
+
+    Returns {group: {"resources": n, "points": [...], stat: [...]}} with
+    one value per bucket; None where a group had no data in a bucket.
+    """
+    per = matrix.slots if not bucket else max(1, bucket // matrix.period)
+    n_buckets = -(-matrix.slots // per) if matrix.slots else 0
+    # pad the time axis to whole buckets so it can be reshaped
+    padded = np.full((matrix.values.shape[0], n_buckets * per), np.nan)
+    padded[:, :matrix.slots] = matrix.values
+
+    quantiles = [q for q in (95, 99) if f"p{q}" in stats]
+    out: Dict[str, Dict[str, Any]] = {}
+    for key, mask in _group_masks(matrix, group_by).items():
+        # (resources, buckets, per) -> (buckets, resources * per): one row per bucket
+        block = padded[mask].reshape(int(mask.sum()), n_buckets, per).transpose(1, 0, 2).reshape(n_buckets, -1)
+        counts = np.count_nonzero(~np.isnan(block), axis=1)
+        empty = counts == 0
+        # all-NaN rows would warn in the nan* reductions; give them a dummy value and mask after
+        safe = np.where(empty[:, None], 0.0, block)
+
+        result: Dict[str, np.ndarray] = {}
+        if block.shape[1] == 0:
+            # no resources in the group: every bucket is empty
+            safe = np.zeros((n_buckets, 1))
+        if "avg" in stats:
+            result["avg"] = np.nanmean(safe, axis=1)
+        if "max" in stats:
+            result["max"] = np.nanmax(safe, axis=1)
+        if quantiles:
+            qs = np.nanpercentile(safe, quantiles, axis=1)
+            for q, row in zip(quantiles, qs):
+                result[f"p{q}"] = row
+
+        group: Dict[str, Any] = {
+            "resources": int(mask.sum()),
+            "points": counts.tolist(),
+        }
+        for name, arr in result.items():
+            group[name] = [None if e else round(float(v), 4) for v, e in zip(arr, empty)]
+        out[key] = group
+    return out
@@ -1 +1,208 @@
 # alerts and notifications
+# app/services/alerts.py
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from . import events
+
+# Statuses that don't raise a status alert. "Creating" is tracked by its job.
+HEALTHY_STATUSES = ("Running", "Stopped", "Creating")
+
+CPU_THRESHOLD = float(os.getenv("ALERT_CPU_THRESHOLD", "90"))              # percent
+MONTHLY_BUDGET_INR = float(os.getenv("ALERT_MONTHLY_BUDGET_INR", "0"))     # 0 = no budget alert
+
+OPEN_LIMIT = int(os.getenv("ALERTS_OPEN_LIMIT", "500"))
+# fingerprints per IN (...) lookup, well under SQLite's bound-variable limit
+FINGERPRINT_BATCH = 5000
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    A condition checked when `event` happens. `check` gets the event's
+    subject dict; `title` is formatted with it. A rule fires once per
+    subject key, so its fingerprint is "<name>:<key>".
+    """
+    name: str
+    event: str                          # "status", "metrics", "cost"
+    severity: str
+    check: Callable[[Dict[str, Any]], bool]
+    title: str
+
+
+RULES: Tuple[Rule, ...] = (
+    Rule(
+        "resource_failed", "status", "Critical",
+        lambda s: s["status"] == "Failed",
+        "{name} is in Failed state",
+    ),
+    Rule(
+        "resource_unhealthy", "status", "Warning",
+        lambda s: s["status"] not in HEALTHY_STATUSES and s["status"] != "Failed",
+        "{name} is in {status} state",
+    ),
+    Rule(
+        "high_cpu", "metrics", "Warning",
+        lambda s: s["cpu"] is not None and s["cpu"] >= CPU_THRESHOLD,
+        "{name} CPU at {cpu:.0f}%",
+    ),
+    Rule(
+        "monthly_budget", "cost", "Critical",
+        lambda s: MONTHLY_BUDGET_INR > 0 and s["monthly"] > MONTHLY_BUDGET_INR,
+        "Projected monthly cost ₹{monthly:,.0f} is over the ₹{budget:,.0f} budget",
+    ),
+)
+
+# (subject key, resource id or None, subject)
+Subject = Tuple[str, Optional[int], Dict[str, Any]]
+
+
+def _resource_subject(res: models.Resource, **extra: Any) -> Subject:
+    return (
+        str(res.id),
+        res.id,
+        {"name": res.name, "status": res.status, "provider": res.provider,
+         "type": res.type, "region": res.region, **extra},
+    )
+
+
+# -----------------------------------------------------
+# Evaluation
+# -----------------------------------------------------
+async def evaluate(db: AsyncSession, event: str, subjects: Iterable[Subject]) -> int:
+    """
+    Run the rules for `event` over `subjects` in the caller's transaction:
+    open (or re-stamp) an alert per firing fingerprint and resolve open
+    alerts whose condition no longer holds. Only the alerts of the checked
+    fingerprints are read, through the partial indexes. Returns the number
+    of newly opened alerts.
+    """
+    rules = [r for r in RULES if r.event == event]
+    if not rules:
+        return 0
+
+    checked: set = set()
+    firing: Dict[str, Tuple[Rule, Optional[int], Dict[str, Any]]] = {}
+    for key, resource_id, subject in subjects:
+        for rule in rules:
+            fp = f"{rule.name}:{key}"
+            checked.add(fp)
+            if rule.check(subject):
+                firing[fp] = (rule, resource_id, subject)
+    if not checked:
+        return 0
+
+    A = models.Alert
+    open_alerts: Dict[str, models.Alert] = {}
+    for chunk in _chunks(checked):
+        result = await db.execute(select(A).where(A.status == "open", A.fingerprint.in_(chunk)))
+        open_alerts.update((a.fingerprint, a) for a in result.scalars())
+    # a condition that held before, cleared and holds again continues its count
+    previous: Dict[str, int] = {}
+    for chunk in _chunks(fp for fp in firing if fp not in open_alerts):
+        result = await db.execute(
+            select(A.fingerprint, func.max(A.occurrences))
+            .where(A.status == "resolved", A.fingerprint.in_(chunk))
+            .group_by(A.fingerprint)
+        )
+        previous.update(result.tuples().all())
+
+    now = datetime.utcnow()
+    new: List[models.Alert] = []
+    for fp, (rule, resource_id, subject) in firing.items():
+        title = rule.title.format(budget=MONTHLY_BUDGET_INR, **subject)
+        alert = open_alerts.get(fp)
+        if alert is None:
+            new.append(A(
+                fingerprint=fp, rule=rule.name, resource_id=resource_id, severity=rule.severity,
+                title=title, status="open", occurrences=previous.get(fp, 0) + 1, details=subject,
+                first_seen=now, last_seen=now,
+            ))
+        else:
+            # still holding: the same occurrence, re-stamped
+            alert.title = title
+            alert.details = subject
+            alert.last_seen = now
+
+    _resolve(db, [a for fp, a in open_alerts.items() if fp in checked and fp not in firing], now)
+    db.add_all(new)
+    await db.flush()
+    for alert in new:
+        events.emit(db, "alert.opened", as_dict(alert))
+    return len(new)
+
+
+def _chunks(fingerprints: Iterable[str]) -> Iterable[List[str]]:
+    items = list(fingerprints)
+    for i in range(0, len(items), FINGERPRINT_BATCH):
+        yield items[i:i + FINGERPRINT_BATCH]
+
+
+def _resolve(db: AsyncSession, resolved: Iterable[models.Alert], now: datetime) -> None:
+    for alert in resolved:
+        alert.status = "resolved"
+        alert.resolved_at = now
+        events.emit(db, "alert.resolved", {"id": f"alert-{alert.id}", "resourceId": alert.resource_id})
+
+
+async def on_status(db: AsyncSession, resources: Iterable[models.Resource]) -> int:
+    """Resource statuses were written (provisioning, refresh, edits)."""
+    return await evaluate(db, "status", [_resource_subject(r) for r in resources])
+
+
+async def on_metrics(db: AsyncSession, resources: Iterable[models.Resource], cpu: Dict[int, Optional[float]]) -> int:
+    """New metric points were stored; `cpu` is the latest CPU % per resource id."""
+    return await evaluate(
+        db, "metrics", [_resource_subject(r, cpu=cpu[r.id]) for r in resources if r.id in cpu]
+    )
+
+
+async def on_cost(db: AsyncSession) -> int:
+    """Cost rollups moved; checks the projected monthly total."""
+    total = await db.get(models.CostRollup, ("total", ""))
+    monthly = total.monthly_inr if total else 0.0
+    return await evaluate(db, "cost", [("total", None, {"monthly": round(monthly, 2)})])
+
+
+async def forget(db: AsyncSession, resource_ids: List[int]) -> None:
+    """Resolve the open alerts of deleted resources."""
+    A = models.Alert
+    result = await db.execute(select(A).where(A.status == "open", A.resource_id.in_(resource_ids)))
+    _resolve(db, result.scalars().all(), datetime.utcnow())
+    await db.flush()
+
+
+# -----------------------------------------------------
+# Reads
+# -----------------------------------------------------
+def as_dict(a: models.Alert) -> Dict[str, Any]:
+    """schemas.Alert fields for a stored alert."""
+    return {
+        "id": f"alert-{a.id}",
+        "title": a.title,
+        "severity": a.severity,
+        "time": a.first_seen.isoformat(),
+        "rule": a.rule,
+        "resourceId": a.resource_id,
+        "lastSeen": a.last_seen.isoformat(),
+        "occurrences": a.occurrences,
+    }
+
+
+def open_alerts_query(limit: int = OPEN_LIMIT) -> Select:
+    """Open alerts, newest first; served by the partial index on open rows."""
+    A = models.Alert
+    return (
+        select(A)
+        .where(A.status == "open")
+        .order_by(A.first_seen.desc(), A.id.desc())
+        .limit(limit)
+    )
@@ -0,0 +1,461 @@
+# audit log: batched writer, archive segments and range reads
+# app/services/audit.py
+"""
+Audit entries (action_logs rows) go through `writer` instead of each
+request's own transaction. record() queues entries and a single task
+inserts whatever has queued up, up to AUDIT_BATCH_SIZE rows per
+transaction, with one prepared INSERT run over the whole batch
+(executemany; about 3x the rows/s of a multi-row VALUES statement, which
+SQLAlchemy compiles afresh for every batch size).
+
+AUDIT_DURABILITY:
+  commit (default)  record() returns once the entry's batch is committed,
+                    so a response is only sent after its audit entry is
+                    on disk. Concurrent requests share one commit (entries
+                    queued while a batch is being written form the next).
+  async             record() returns at once; the writer waits up to
+                    AUDIT_FLUSH_INTERVAL_MS to fill a batch. A crash loses
+                    at most the entries still queued.
+Either way, stop() writes everything queued before returning, and a
+failed batch is retried until the database takes it.
+
+The archiver moves whole months older than AUDIT_HOT_DAYS out of the
+table into compressed JSONL segment files in AUDIT_ARCHIVE_DIR (zstd when
+the zstandard package is installed, gzip otherwise), listed in
+audit_segments. /logs only reads the table unless a request's `since`
+reaches back before the newest archived entry.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import io
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, queries, telemetry
+from ..database import AsyncSessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:   # optional; segments are written with gzip instead
+    zstandard = None
+
+BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200")) / 1000
+QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))   # record() waits when this many are queued
+DURABILITY = os.getenv("AUDIT_DURABILITY", "commit")    # "commit" or "async"
+RETRY_MAX_DELAY = 5.0   # seconds between attempts at a failing batch
+
+ARCHIVE_ENABLED = os.getenv("AUDIT_ARCHIVE_ENABLED", "1") == "1"
+ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "./audit-archive")
+ARCHIVE_INTERVAL = float(os.getenv("AUDIT_ARCHIVE_INTERVAL", "3600"))   # seconds
+HOT_DAYS = int(os.getenv("AUDIT_HOT_DAYS", "90"))
+SEGMENT_ROWS = int(os.getenv("AUDIT_SEGMENT_ROWS", "50000"))   # rows per file (and per delete transaction)
+ZSTD_LEVEL = int(os.getenv("AUDIT_ZSTD_LEVEL", "10"))
+SEGMENT_CACHE = int(os.getenv("AUDIT_SEGMENT_CACHE", "4"))     # decoded segments kept in memory
+
+# Parameters one statement may bind
+SQLITE_MAX_VARIABLES = 32766
+
+
+def entry(
+    action: str,
+    resource: Any,
+    details: Optional[Dict[str, Any]] = None,
+    status: str = "Success",
+    user: str = "system",
+    at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """An action_logs row about `resource` (anything with .id and .provider), stamped now."""
+    return {
+        "timestamp": at or datetime.utcnow(),
+        "resource_id": resource.id,
+        "user_email": user,
+        "action": action,
+        "status": status,
+        "provider": resource.provider,
+        "details": details or {},
+    }
+
+
+async def write(rows: Sequence[Dict[str, Any]]) -> None:
+    """Insert entries now, in one transaction of their own."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(models.ActionLog), list(rows))
+        await db.commit()
+
+
+# -----------------------------------------------------
+# Writer
+# -----------------------------------------------------
+class AuditWriter:
+    """Queues audit entries and writes them in batches from one task."""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._queue = asyncio.Queue(maxsize=QUEUE_MAX)
+        self._task = asyncio.get_running_loop().create_task(self._run(self._queue), name="audit-writer")
+
+    async def stop(self) -> None:
+        """Write everything queued, then stop. Later entries are written directly."""
+        if self._task is None:
+            return
+        queue, self._queue = self._queue, None
+        await queue.put(None)
+        await self._task
+        self._task = None
+        leftover = []
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                leftover.append(item)
+        if leftover:
+            await self._flush(leftover)
+
+    async def record(self, *rows: Dict[str, Any]) -> None:
+        """Queue entries (see entry()); with commit durability, wait until they are committed."""
+        if not rows:
+            return
+        queue = self._queue
+        if queue is None:
+            # not started (scripts, benchmarks) or shutting down
+            await write(rows)
+            return
+        wait = DURABILITY == "commit"
+        loop = asyncio.get_running_loop()
+        futures = []
+        for row in rows:
+            future = loop.create_future() if wait else None
+            await queue.put((row, future))
+            futures.append(future)
+        if wait:
+            await asyncio.gather(*futures)
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        # callers waiting on a commit shouldn't also wait for a timer
+        linger = FLUSH_INTERVAL if DURABILITY == "async" else 0.0
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + linger
+            while len(batch) < BATCH_SIZE:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], Optional[asyncio.Future]]]) -> None:
+        rows = [row for row, _ in batch]
+        delay = 0.05
+        while True:
+            try:
+                await write(rows)
+                break
+            except OperationalError as e:
+                # locked or unavailable database: keep the batch and try again
+                logger.warning("writing audit batch failed, retrying", extra={"entries": len(rows), "retry_in_s": round(delay, 2), "error": str(e)})
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+            except Exception:
+                # a bad entry: write the rest one at a time so only it fails
+                await self._flush_each(batch)
+                return
+        self.batches += 1
+        self.written += len(rows)
+        for _, future in batch:
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    async def _flush_each(self, batch: List[Tuple[Dict[str, Any], Optional[asyncio.Future]]]) -> None:
+        for row, future in batch:
+            try:
+                await write([row])
+                self.written += 1
+            except Exception as e:
+                logger.error("dropped audit entry", extra={"entry": row, "error": repr(e)})
+                if future is not None and not future.done():
+                    future.set_exception(e)
+                continue
+            if future is not None and not future.done():
+                future.set_result(None)
+
+
+writer = AuditWriter()
+telemetry.queue_depth("audit_writer", lambda: writer._queue.qsize() if writer._queue is not None else 0)
+
+
+# -----------------------------------------------------
+# Archive segments
+# -----------------------------------------------------
+class ArchivedLog(NamedTuple):
+    """An archived entry; has the queries.LOG_FIELDS names, like a /logs row."""
+    id: int
+    timestamp: datetime
+    user: Optional[str]
+    action: str
+    resource: Optional[str]
+    status: str
+    provider: Optional[str]
+    resource_id: Optional[int]
+    details: Any
+
+
+def _month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1)
+
+
+def _next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _write_segment(path: str, rows: Sequence[Row]) -> int:
+    """Write rows as compressed JSONL, durably: temp file, fsync, rename. Returns the size."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as raw:
+        if path.endswith(".zst"):
+            out = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+        else:
+            out = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0)
+        with out:
+            for r in rows:
+                line = {
+                    "id": r.id,
+                    "timestamp": r.timestamp.isoformat(),
+                    "user": r.user,
+                    "action": r.action,
+                    "resource": r.resource,
+                    "status": r.status,
+                    "provider": r.provider,
+                    "resource_id": r.resource_id,
+                    "details": r.details,
+                }
+                out.write(json.dumps(line, separators=(",", ":")).encode() + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def _read_segment(path: str) -> List[ArchivedLog]:
+    """Rows of a segment file, oldest first."""
+    with open(os.path.join(ARCHIVE_DIR, path), "rb") as raw:
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"Reading {path} needs the zstandard package")
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        rows = []
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            d = json.loads(line)
+            d["timestamp"] = datetime.fromisoformat(d["timestamp"])
+            rows.append(ArchivedLog(**d))
+        return rows
+
+
+def _archive_part(bind: Engine, cutoff: datetime) -> int:
+    """
+    Archive up to SEGMENT_ROWS of the oldest entries before `cutoff`, all
+    from one month, as the month's next part. Returns how many.
+    """
+    log, seg = models.ActionLog, models.AuditSegment
+    with bind.connect() as conn:
+        oldest = conn.execute(select(func.min(log.timestamp))).scalar()
+        if oldest is None or oldest >= cutoff:
+            return 0
+        month = _month_start(oldest)
+        key = month.strftime("%Y-%m")
+        rows = conn.execute(
+            select(
+                log.id, log.timestamp, log.user_email.label("user"), log.action,
+                models.Resource.name.label("resource"), log.status, log.provider,
+                log.resource_id, log.details,
+            )
+            .outerjoin(models.Resource, log.resource_id == models.Resource.id)
+            .where(log.timestamp >= month, log.timestamp < min(_next_month(month), cutoff))
+            .order_by(log.timestamp, log.id)
+            .limit(SEGMENT_ROWS)
+        ).all()
+        part = conn.execute(select(func.coalesce(func.max(seg.part), 0)).where(seg.month == key)).scalar() + 1
+
+    # The file is complete before the rows leave the table; a crash in
+    # between leaves a file no segment row points at, overwritten next run.
+    path = f"action_logs-{key}-{part:03d}.jsonl" + (".zst" if zstandard else ".gz")
+    size = _write_segment(os.path.join(ARCHIVE_DIR, path), rows)
+
+    ids = [r.id for r in rows]
+    t = models.Tombstone
+    with bind.begin() as conn:
+        removed = 0
+        for i in range(0, len(ids), SQLITE_MAX_VARIABLES):
+            removed += conn.execute(delete(log).where(log.id.in_(ids[i:i + SQLITE_MAX_VARIABLES]))).rowcount
+        # Archived entries are still readable, so delta sync shouldn't see them
+        # as deleted: drop the tombstones the delete trigger just wrote (the
+        # last `removed` versions; we hold the write lock).
+        version = conn.execute(
+            select(models.TableVersion.version).where(models.TableVersion.name == "action_logs")
+        ).scalar() or 0
+        conn.execute(delete(t).where(t.table_name == "action_logs", t.version > version - removed))
+        conn.execute(insert(seg).values(
+            month=key, part=part, path=path, rows=len(rows), bytes=size,
+            first_ts=rows[0].timestamp, last_ts=rows[-1].timestamp,
+            first_id=min(ids), last_id=max(ids), created_at=datetime.utcnow(),
+        ))
+    logger.info("archived audit entries", extra={"entries": len(rows), "path": path, "bytes": size})
+    return len(rows)
+
+
+def archive(now: Optional[datetime] = None, bind: Engine = engine) -> int:
+    """
+    Move every entry from before the month that is AUDIT_HOT_DAYS ago into
+    segment files (blocking; the archiver runs it in a thread). Returns
+    how many entries moved.
+    """
+    cutoff = _month_start((now or datetime.utcnow()) - timedelta(days=HOT_DAYS))
+    total = 0
+    while True:
+        n = _archive_part(bind, cutoff)
+        if n == 0:
+            return total
+        total += n
+
+
+class AuditArchiver:
+    """Every ARCHIVE_INTERVAL seconds, archive months that left the hot window."""
+
+    def __init__(self, interval: float = ARCHIVE_INTERVAL):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="audit-archiver")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(archive)
+            except Exception:
+                logger.exception("archive pass failed")
+            await asyncio.sleep(self.interval)
+
+
+archiver = AuditArchiver()
+
+
+# -----------------------------------------------------
+# Reads
+# -----------------------------------------------------
+_segment_cache: "OrderedDict[str, List[ArchivedLog]]" = OrderedDict()
+
+
+async def _segment(path: str) -> List[ArchivedLog]:
+    rows = _segment_cache.get(path)
+    if rows is None:
+        rows = await asyncio.to_thread(_read_segment, path)
+        _segment_cache[path] = rows
+        while len(_segment_cache) > SEGMENT_CACHE:
+            _segment_cache.popitem(last=False)
+    _segment_cache.move_to_end(path)
+    return rows
+
+
+def _naive_utc(ts: Optional[datetime]) -> Optional[datetime]:
+    if ts is not None and ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _matches(r: ArchivedLog, f: queries.LogFilters, after: Optional[Tuple[datetime, int]]) -> bool:
+    return (
+        (f.provider is None or r.provider == f.provider)
+        and (f.action is None or r.action == f.action)
+        and (f.status is None or r.status == f.status)
+        and (f.resource_id is None or r.resource_id == f.resource_id)
+        and (f.since is None or r.timestamp >= f.since)
+        and (f.until is None or r.timestamp < f.until)
+        and (after is None or (r.timestamp, r.id) < after)
+    )
+
+
+async def archived_logs(
+    db: AsyncSession,
+    filters: queries.LogFilters,
+    cursor: Optional[str],
+    limit: int,
+) -> List[ArchivedLog]:
+    """
+    Archived entries matching `filters` past `cursor`, newest first, at
+    most `limit`. Needs filters.since; only segments overlapping the range
+    are read, newest first, stopping once the rest are all older.
+    """
+    f = queries.LogFilters(**{**vars(filters), "since": _naive_utc(filters.since), "until": _naive_utc(filters.until)})
+    seg = models.AuditSegment
+    q = select(seg.path, seg.last_ts).where(seg.last_ts >= f.since)
+    if f.until is not None:
+        q = q.where(seg.first_ts < f.until)
+    after = queries.log_cursor_key(cursor) if cursor else None
+    if after is not None:
+        q = q.where(seg.first_ts <= after[0])
+    segments = (await db.execute(q.order_by(seg.last_ts.desc()))).all()
+
+    found: List[ArchivedLog] = []
+    for s in segments:
+        if len(found) >= limit and s.last_ts < found[limit - 1].timestamp:
+            break
+        found.extend(r for r in await _segment(s.path) if _matches(r, f, after))
+        found.sort(key=lambda r: (r.timestamp, r.id), reverse=True)
+        del found[limit:]
+    return found
+
+
+def merge_newest(rows: Sequence[Any], archived: Sequence[ArchivedLog], limit: int) -> List[Any]:
+    """Table rows and archived entries as one newest-first list of at most `limit`."""
+    both = list(rows) + list(archived)
+    both.sort(key=lambda r: (r.timestamp, r.id), reverse=True)
+    return both[:limit]
@@ -1 +1,235 @@
 # cost estimation helpers
+# app/services/cost.py
+from __future__ import annotations
+
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..aws.ec2 import INSTANCE_TYPE as AWS_INSTANCE_TYPE
+
+ANY = "*"
+
+# Monthly prices in INR. Omitted keys match anything ("*"). monthly is the
+# flat price for one unit; perGbMonth / perMillionRequests are added on top
+# for the storage / request volume given at create time.
+DEFAULT_CATALOG: List[Dict[str, Any]] = [
+    {"provider": "AWS", "type": "VM", "instanceType": "t3.micro", "monthly": 800.0},
+    {"provider": "AWS", "type": "VM", "instanceType": "t3.small", "monthly": 1600.0},
+    {"provider": "AWS", "type": "VM", "instanceType": "t3.medium", "monthly": 3200.0},
+    {"provider": "AWS", "type": "VM", "monthly": 800.0},
+    {"provider": "AWS", "type": "Storage", "monthly": 50.0, "perGbMonth": 1.9},
+    {"provider": "AWS", "type": "Database", "monthly": 300.0, "perGbMonth": 21.0, "perMillionRequests": 105.0},
+    {"provider": "AWS", "type": "Serverless", "monthly": 50.0, "perMillionRequests": 17.0},
+    {"provider": "AWS", "type": "Load Balancer", "monthly": 200.0},
+    {"provider": "GCP", "monthly": 900.0},
+    {"provider": "Azure", "monthly": 900.0},
+]
+
+# Rollup dimensions kept in cost_rollups; "total" has the single key ""
+DIMENSIONS = ("provider", "region", "type", "tag")
+
+
+@dataclass(frozen=True)
+class Price:
+    monthly: float = 0.0
+    per_gb_month: float = 0.0
+    per_million_requests: float = 0.0
+
+
+class PriceCatalog:
+    """
+    Price lookup indexed by (provider, type, region, instance type).
+    A lookup probes from the most to the least specific key, so it is a
+    handful of dict hits whatever the catalog size.
+    """
+
+    def __init__(self, entries: Iterable[Dict[str, Any]]):
+        self._prices: Dict[Tuple[str, str, str, str], Price] = {}
+        for e in entries:
+            key = (
+                e.get("provider", ANY),
+                e.get("type", ANY),
+                e.get("region", ANY),
+                e.get("instanceType", ANY),
+            )
+            self._prices[key] = Price(
+                monthly=float(e.get("monthly", 0.0)),
+                per_gb_month=float(e.get("perGbMonth", 0.0)),
+                per_million_requests=float(e.get("perMillionRequests", 0.0)),
+            )
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "PriceCatalog":
+        """Catalog from a JSON list of entries (same shape as DEFAULT_CATALOG), or the defaults."""
+        if not path:
+            return cls(DEFAULT_CATALOG)
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def lookup(self, provider: str, rtype: str, region: str, instance_type: Optional[str] = None) -> Price:
+        it = instance_type or ANY
+        for key in (
+            (provider, rtype, region, it),
+            (provider, rtype, region, ANY),
+            (provider, rtype, ANY, it),
+            (provider, rtype, ANY, ANY),
+            (provider, ANY, region, ANY),
+            (provider, ANY, ANY, ANY),
+            (ANY, ANY, ANY, ANY),
+        ):
+            price = self._prices.get(key)
+            if price is not None:
+                return price
+        return Price()
+
+    def estimate(
+        self,
+        provider: str,
+        rtype: str,
+        region: str,
+        instance_type: Optional[str] = None,
+        storage_gb: float = 0.0,
+        requests_per_month: float = 0.0,
+    ) -> float:
+        p = self.lookup(provider, rtype, region, instance_type)
+        total = p.monthly + storage_gb * p.per_gb_month + requests_per_month / 1e6 * p.per_million_requests
+        return round(total, 2)
+
+
+catalog = PriceCatalog.load(os.getenv("COST_CATALOG_PATH"))
+
+
+def estimate_monthly_cost(provider: str, rtype: str, region: str, config: Optional[Dict[str, Any]] = None) -> float:
+    """
+    Monthly INR estimate for a new resource. `config` is ResourceCreate.config;
+    instanceType, storageGb and requestsPerMonth are used when present.
+    """
+    config = config or {}
+    instance_type = config.get("instanceType")
+    if instance_type is None and provider == "AWS" and rtype == "VM":
+        instance_type = AWS_INSTANCE_TYPE
+    return catalog.estimate(
+        provider,
+        rtype,
+        region,
+        instance_type=instance_type,
+        storage_gb=float(config.get("storageGb") or 0),
+        requests_per_month=float(config.get("requestsPerMonth") or 0),
+    )
+
+
+# -----------------------------------------------------
+# Rollups (cost_rollups table)
+# -----------------------------------------------------
+class CostShare(NamedTuple):
+    """What one resource contributes to the rollups."""
+    provider: str
+    type: str
+    region: str
+    tags: Tuple[str, ...]
+    monthly: float
+
+
+def share(res: models.Resource) -> CostShare:
+    tags = res.tags if isinstance(res.tags, list) else []
+    return CostShare(
+        provider=res.provider,
+        type=res.type,
+        region=res.region,
+        tags=tuple(sorted({str(t) for t in tags})),
+        monthly=float(res.cost_per_month_inr or 0.0),
+    )
+
+
+def share_keys(s: CostShare) -> List[Tuple[str, str]]:
+    keys = [("total", ""), ("provider", s.provider), ("region", s.region), ("type", s.type)]
+    keys += [("tag", t) for t in s.tags]
+    return keys
+
+
+async def apply(db: AsyncSession, removed: Iterable[CostShare] = (), added: Iterable[CostShare] = ()) -> None:
+    """
+    Move rollup totals in the caller's transaction: subtract `removed`,
+    add `added`. An update is apply(db, [before], [after]).
+    """
+    delta: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0.0, 0])
+    for sign, shares in ((-1, removed), (1, added)):
+        for s in shares:
+            for key in share_keys(s):
+                delta[key][0] += sign * s.monthly
+                delta[key][1] += sign
+    delta = {k: v for k, v in delta.items() if v[0] or v[1]}
+    if not delta:
+        return
+
+    t = models.CostRollup
+    stmt = sqlite_insert(t)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["dimension", "key"],
+        set_={
+            "monthly_inr": t.monthly_inr + stmt.excluded.monthly_inr,
+            "resources": t.resources + stmt.excluded.resources,
+        },
+    )
+    await db.execute(
+        stmt,
+        [{"dimension": d, "key": k, "monthly_inr": m, "resources": n} for (d, k), (m, n) in delta.items()],
+    )
+    await db.execute(text("DELETE FROM cost_rollups WHERE resources <= 0 AND dimension != 'total'"))
+
+
+_REBUILD_SQL = (
+    "DELETE FROM cost_rollups",
+    """
+    INSERT INTO cost_rollups (dimension, key, monthly_inr, resources)
+    SELECT 'total', '', COALESCE(SUM(cost_per_month_inr), 0), COUNT(*) FROM resources
+    UNION ALL
+    SELECT 'provider', provider, COALESCE(SUM(cost_per_month_inr), 0), COUNT(*) FROM resources GROUP BY provider
+    UNION ALL
+    SELECT 'region', region, COALESCE(SUM(cost_per_month_inr), 0), COUNT(*) FROM resources GROUP BY region
+    UNION ALL
+    SELECT 'type', type, COALESCE(SUM(cost_per_month_inr), 0), COUNT(*) FROM resources GROUP BY type
+    UNION ALL
+    SELECT 'tag', tag, COALESCE(SUM(cost), 0), COUNT(*) FROM (
+        SELECT DISTINCT r.id, r.cost_per_month_inr AS cost, CAST(j.value AS TEXT) AS tag
+        FROM resources r, json_each(r.tags) j
+        WHERE json_type(r.tags) = 'array'
+    ) GROUP BY tag
+    """,
+)
+
+
+async def rebuild(db: AsyncSession) -> None:
+    """Recompute every rollup from the resources table (startup, or after manual edits)."""
+    for sql in _REBUILD_SQL:
+        await db.execute(text(sql))
+
+
+async def summary(db: AsyncSession) -> Dict[str, Any]:
+    """
+    Totals per provider/region/type/tag. Reads only cost_rollups, whose
+    size depends on the number of distinct keys, not on the inventory.
+    """
+    rows = (await db.execute(select(models.CostRollup))).scalars().all()
+    out: Dict[str, Any] = {
+        "currency": "INR",
+        "totalMonthly": 0.0,
+        "resources": 0,
+        **{f"by{d.capitalize()}": {} for d in DIMENSIONS},
+    }
+    for r in rows:
+        bucket = {"monthly": round(r.monthly_inr, 2), "resources": r.resources}
+        if r.dimension == "total":
+            out["totalMonthly"] = bucket["monthly"]
+            out["resources"] = r.resources
+        else:
+            out[f"by{r.dimension.capitalize()}"][r.key] = bucket
+    return out
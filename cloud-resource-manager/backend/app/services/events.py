@@ -0,0 +1,175 @@
+# in-process pub/sub for server-push (GET /events)
+# app/services/events.py
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import os
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Iterable, List, Optional, Set
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+# Events kept for clients that reconnect with Last-Event-ID
+REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", "1000"))
+# Undelivered events a client may fall behind by before it is cut off
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", "15"))
+
+# event types are "<topic>.<what>", e.g. "resource.updated"
+TOPICS = ("resource", "alert", "metrics")
+
+
+@dataclass(frozen=True)
+class Event:
+    seq: int
+    type: str
+    data: Any
+    epoch: str
+
+    @property
+    def id(self) -> str:
+        """The SSE id: "<epoch>-<seq>", so ids from an earlier process never look current."""
+        return f"{self.epoch}-{self.seq}"
+
+    @property
+    def topic(self) -> str:
+        return self.type.split(".", 1)[0]
+
+    def encode(self) -> str:
+        """One Server-Sent Events message."""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class Subscriber:
+    def __init__(self, topics: Set[str]):
+        self.topics = topics
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+        self.resync: Optional[str] = None    # why a resumed stream starts with "reset"
+
+    def offer(self, ev: Event) -> None:
+        if self.overflowed or ev.topic not in self.topics:
+            return
+        try:
+            self.queue.put_nowait(ev)
+        except asyncio.QueueFull:
+            # too slow to keep up: it will get a "reset" and must refetch
+            self.overflowed = True
+
+
+class EventBus:
+    """
+    Fan-out of committed changes to every open stream. publish() never
+    blocks: each subscriber has a bounded queue, and one that falls
+    behind is dropped instead of slowing the writers down.
+    """
+
+    def __init__(self, replay_size: int = REPLAY_SIZE):
+        self.epoch = uuid.uuid4().hex[:8]    # new per process: sequence numbers restart at 1
+        self._ids = itertools.count(1)
+        self._last = 0
+        self._recent: Deque[Event] = deque(maxlen=replay_size)
+        self._subscribers: Set[Subscriber] = set()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, type: str, data: Any) -> Event:
+        ev = Event(next(self._ids), type, data, self.epoch)
+        self._last = ev.seq
+        self._recent.append(ev)
+        for sub in self._subscribers:
+            sub.offer(ev)
+        return ev
+
+    def subscribe(self, topics: Iterable[str], last_event_id: Optional[str] = None) -> Subscriber:
+        """
+        A new subscriber. With `last_event_id`, buffered events after it are
+        replayed; if the events in between can't be replayed (the id is from
+        another process, older than the buffer, or newer than anything
+        issued), sub.resync says why and the client has to refetch.
+        """
+        sub = Subscriber(set(topics))
+        if last_event_id is not None:
+            sub.resync = self._missed(last_event_id)
+            if sub.resync is None:
+                seq = int(last_event_id.rpartition("-")[2])
+                for ev in self._recent:
+                    if ev.seq > seq:
+                        sub.offer(ev)
+        self._subscribers.add(sub)
+        return sub
+
+    def _missed(self, last_event_id: str) -> Optional[str]:
+        epoch, _, seq = last_event_id.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return "unknown event id (the server restarted)"
+        oldest = self._recent[0].seq if self._recent else self._last + 1
+        if int(seq) < oldest - 1:
+            return "events since this id are no longer buffered"
+        if int(seq) > self._last:
+            return "event id is newer than any event sent"
+        return None
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._subscribers.discard(sub)
+
+    async def stream(
+        self,
+        topics: Iterable[str],
+        last_event_id: Optional[str] = None,
+        keepalive: float = KEEPALIVE,
+    ) -> AsyncIterator[str]:
+        """SSE text for one client, until it disconnects or falls behind."""
+        sub = self.subscribe(topics, last_event_id)
+        # a resynced client resumes from here; every later event is already queued for it
+        current = f"{self.epoch}-{self._last}"
+        try:
+            yield "retry: 3000\n: connected\n\n"
+            if sub.resync is not None:
+                yield f"id: {current}\nevent: reset\ndata: {json.dumps({'reason': sub.resync})}\n\n"
+            while True:
+                try:
+                    ev = await asyncio.wait_for(sub.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield ev.encode()
+                if sub.overflowed and sub.queue.empty():
+                    yield f"event: reset\ndata: {json.dumps({'reason': 'fell behind'})}\n\n"
+                    return
+        finally:
+            self.unsubscribe(sub)
+
+
+bus = EventBus()
+
+
+# -----------------------------------------------------
+# Transactional staging
+# -----------------------------------------------------
+# Writers stage events on their session; they are published only if the
+# transaction commits, so clients never see a change that was rolled back.
+def emit(db, type: str, data: Any) -> None:
+    """Stage an event on a Session or AsyncSession."""
+    session = getattr(db, "sync_session", db)
+    session.info.setdefault("events", []).append((type, data))
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_staged(session: Session) -> None:
+    staged: List[tuple] = session.info.pop("events", None) or []
+    for type, data in staged:
+        bus.publish(type, data)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _drop_staged(session: Session) -> None:
+    session.info.pop("events", None)
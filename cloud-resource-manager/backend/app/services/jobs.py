@@ -0,0 +1,208 @@
+# background provisioning jobs
+# app/services/jobs.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, providers, telemetry
+from ..database import MAX_OVERFLOW, POOL_SIZE, AsyncSessionLocal
+from . import alerts, audit, events
+
+logger = logging.getLogger(__name__)
+
+# Workers only hold a connection between cloud calls, but a burst of them must
+# still leave most of the pool to the request handlers.
+WORKERS = int(os.getenv("PROVISION_WORKERS", str(max(1, min(16, (POOL_SIZE + MAX_OVERFLOW) // 2)))))
+# In-flight provider calls per (provider, region), to stay under API rate limits
+PER_REGION_LIMIT = int(os.getenv("PROVISION_CONCURRENCY_PER_REGION", "4"))
+MAX_ATTEMPTS = int(os.getenv("PROVISION_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("PROVISION_RETRY_BASE_DELAY", "1.0"))  # seconds, doubled per attempt
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+class JobQueue:
+    """
+    In-process worker pool for provisioning jobs.
+
+    Jobs live in the `jobs` table; the queue only carries their ids, so
+    anything unfinished when the process stops is picked up again by
+    start(). Each job's id doubles as the provider idempotency token, so
+    a retry (or a resumed job) doesn't create a second cloud resource.
+    """
+
+    def __init__(self, workers: int = WORKERS, per_region_limit: int = PER_REGION_LIMIT):
+        self.workers = workers
+        self.per_region_limit = per_region_limit
+        self._queue: asyncio.Queue[str] | None = None
+        self._tasks: List[asyncio.Task] = []
+        self._limits: Dict[Tuple[str, str], asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_region_limit)
+        )
+
+    # ---- lifecycle ----
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"provision-worker-{i}") for i in range(self.workers)
+        ]
+        # resume whatever was queued or running when the last process stopped
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(models.Job).where(models.Job.status == "running").values(status="queued"))
+            await db.commit()
+            result = await db.execute(
+                select(models.Job.id).where(models.Job.status == "queued").order_by(models.Job.created_at)
+            )
+            for job_id in result.scalars():
+                self._queue.put_nowait(job_id)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, job_id: str) -> None:
+        """Queue a committed job. Without running workers it waits in the DB for start()."""
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+
+    # ---- work ----
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self.run_job(job_id)
+            except Exception:
+                # bookkeeping failed (DB error etc.); the job stays unfinished
+                # in the table and is retried on the next start()
+                logger.exception("worker error", extra={"job_id": job_id})
+            finally:
+                self._queue.task_done()
+
+    def _retry_later(self, job_id: str, attempt: int, not_before: float = 0.0) -> None:
+        delay = max(not_before, RETRY_BASE_DELAY * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2))
+        asyncio.get_running_loop().call_later(delay, self.submit, job_id)
+
+    async def run_job(self, job_id: str) -> None:
+        # Sessions are only open for the short steps before and after the
+        # cloud call, never across it or the wait for a region slot: a burst
+        # of slow creates must not hold every pooled connection.
+        async with AsyncSessionLocal() as db:
+            # claim the job; if it was submitted twice only one worker wins
+            claimed = await db.execute(
+                update(models.Job)
+                .where(models.Job.id == job_id, models.Job.status == "queued")
+                .values(status="running", attempts=models.Job.attempts + 1, updated_at=datetime.utcnow())
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return
+            job = await db.get(models.Job, job_id)
+
+            res = await db.get(models.Resource, job.resource_id) if job.resource_id else None
+            if res is None:
+                job.status = "failed"
+                job.error = "Resource was deleted before it was provisioned"
+                job.finished_at = datetime.utcnow()
+                await db.commit()
+                return
+            # detached, both keep their loaded state once the session is gone
+            db.expunge_all()
+
+        error = None
+        try:
+            async with self._limits[(job.provider, job.region)]:
+                external_id, status = await providers.create(
+                    res.provider, res.type, res.name, res.region, token=job.id
+                )
+        except Exception as e:
+            logger.warning("provisioning attempt failed", extra={"job_id": job.id, "attempt": job.attempts, "error": repr(e)})
+            error = repr(e)
+            if job.attempts < MAX_ATTEMPTS:
+                await _set_job(job.id, status="queued", error=error, updated_at=datetime.utcnow())
+                # an open breaker says when it is worth asking again
+                self._retry_later(job.id, job.attempts, getattr(e, "retry_in", 0.0))
+                return
+            external_id, status = "", "Failed"
+
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            # the row may have been deleted while the cloud call ran; only write it back if it still exists
+            written = await db.execute(
+                update(models.Resource)
+                .where(models.Resource.id == res.id)
+                .values(external_id=external_id, status=status, updated_at=now, last_refreshed_at=now)
+            )
+            if written.rowcount == 1:
+                await db.execute(
+                    update(models.Job)
+                    .where(models.Job.id == job.id)
+                    .values(status="failed" if status == "Failed" else "succeeded", error=error,
+                            finished_at=now, updated_at=now)
+                )
+                await alerts.on_status(db, [await db.get(models.Resource, res.id)])
+                events.emit(db, "resource.updated", {"id": res.id, "status": status, "lastRefreshedAt": now.isoformat()})
+                await db.commit()
+        if written.rowcount != 1:
+            await self._orphaned(job, res, external_id, now)
+            return
+        await audit.writer.record(audit.entry(
+            "create", res, {"external_id": external_id, "job_id": job.id},
+            status="Success" if status != "Failed" else "Failure", at=now,
+        ))
+
+    async def _orphaned(self, job: models.Job, res: models.Resource, external_id: str, now: datetime) -> None:
+        """The resource was deleted mid-provisioning: remove what the cloud created and fail the job."""
+        error = "Resource was deleted while it was being provisioned"
+        if external_id:
+            try:
+                await providers.delete(res.provider, res.type, external_id)
+                error += f"; removed {external_id} from the cloud"
+            except Exception as e:
+                logger.warning("cloud cleanup of deleted resource failed",
+                               extra={"job_id": job.id, "external_id": external_id, "error": repr(e)})
+                error += f"; removing {external_id} from the cloud failed: {e!r}"
+        await _set_job(job.id, status="failed", error=error, finished_at=now, updated_at=now)
+        await audit.writer.record(audit.entry(
+            "create", res, {"external_id": external_id, "job_id": job.id, "error": error},
+            status="Failure", at=now,
+        ))
+
+
+async def _set_job(job_id: str, **values) -> None:
+    """Update one job in a short transaction of its own."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.Job).where(models.Job.id == job_id).values(**values))
+        await db.commit()
+
+
+async def cancel_pending(db: AsyncSession, resource_ids: Iterable[int]) -> None:
+    """Cancel queued jobs for resources about to be deleted (flushed with the caller's commit)."""
+    await db.execute(
+        update(models.Job)
+        .where(models.Job.resource_id.in_(list(resource_ids)), models.Job.status == "queued")
+        .values(status="cancelled", error="Resource was deleted before it was provisioned",
+                finished_at=datetime.utcnow(), updated_at=datetime.utcnow())
+    )
+
+
+queue = JobQueue()
+telemetry.queue_depth("provision_jobs", lambda: queue._queue.qsize() if queue._queue is not None else 0)
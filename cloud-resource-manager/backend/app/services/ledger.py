@@ -0,0 +1,287 @@
+# historical cost ledger: daily accrual and range queries
+# app/services/ledger.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..database import AsyncSessionLocal
+from . import cost
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("COST_LEDGER_ENABLED", "1") == "1"
+ACCRUE_INTERVAL = float(os.getenv("COST_LEDGER_INTERVAL", "900"))  # seconds
+# A first run accrues at most this far back from now
+BACKFILL_DAYS = int(os.getenv("COST_LEDGER_BACKFILL_DAYS", "365"))
+
+DAY = 86400
+EPOCH = date(1970, 1, 1)
+# Monthly list price -> INR per second (a month is 365/12 days)
+PER_SECOND = 12 / 365 / DAY
+
+# Statuses that do not bill. Status is sampled at each accrual pass, so a
+# resource stopped between two passes bills up to the first one after.
+NOT_BILLED = ("Failed", "Stopped", "Terminated", "Deleted", "NotCreatedInAWS", "NotSupportedInFreeTier")
+
+GROUP_BY = ("provider", "region", "type", "tag")
+GRANULARITY = ("day", "month", "total")
+
+# Per dimension/key, billable resources created before :until bucketed by
+# creation day (-1 = created before :since), with SUM(rate) and
+# SUM(rate * created) so a day's spend is closed-form per bucket.
+_ACCRUAL_SQL = text(
+    """
+    WITH live AS (
+        SELECT id, provider, region, type, tags,
+               cost_per_month_inr * :per_second AS rate,
+               CAST(strftime('%s', created_at) AS INTEGER) AS created
+        FROM resources
+        WHERE status NOT IN :not_billed AND created_at IS NOT NULL AND cost_per_month_inr > 0
+    ),
+    b AS (
+        SELECT *, CASE WHEN created < :since THEN -1 ELSE created / 86400 END AS cday
+        FROM live WHERE created < :until
+    )
+    SELECT 'total' AS dimension, '' AS key, cday, SUM(rate), SUM(rate * created) FROM b GROUP BY cday
+    UNION ALL
+    SELECT 'provider', provider, cday, SUM(rate), SUM(rate * created) FROM b GROUP BY provider, cday
+    UNION ALL
+    SELECT 'region', region, cday, SUM(rate), SUM(rate * created) FROM b GROUP BY region, cday
+    UNION ALL
+    SELECT 'type', type, cday, SUM(rate), SUM(rate * created) FROM b GROUP BY type, cday
+    UNION ALL
+    SELECT 'tag', tag, cday, SUM(rate), SUM(rate * created) FROM (
+        SELECT DISTINCT b.id, b.rate, b.created, b.cday, CAST(j.value AS TEXT) AS tag
+        FROM b, json_each(b.tags) j
+        WHERE json_type(b.tags) = 'array'
+    ) GROUP BY tag, cday
+    """
+).bindparams(bindparam("not_billed", expanding=True))
+
+
+def _epoch(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _naive(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+
+def _day(day_index: int) -> date:
+    return EPOCH + timedelta(days=day_index)
+
+
+def _spans(start: int, end: int):
+    """(day index, seconds) for each UTC day overlapping [start, end)."""
+    t = start
+    while t < end:
+        d = t // DAY
+        nxt = min(end, (d + 1) * DAY)
+        yield d, nxt - t
+        t = nxt
+
+
+async def _write(db: AsyncSession, amounts: Dict[Tuple[str, int, str], float]) -> None:
+    """Add amounts to cost_daily rows keyed (dimension, day index, key)."""
+    rows = [
+        {"dimension": dim, "day": _day(d), "key": key, "amount_inr": amount}
+        for (dim, d, key), amount in amounts.items()
+        if amount > 0
+    ]
+    if not rows:
+        return
+    t = models.CostDaily
+    stmt = sqlite_insert(t)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["dimension", "day", "key"],
+        set_={"amount_inr": t.amount_inr + stmt.excluded.amount_inr},
+    )
+    await db.execute(stmt, rows)
+
+
+async def _state(db: AsyncSession) -> models.CostLedgerState:
+    state = await db.get(models.CostLedgerState, 1)
+    if state is None:
+        state = models.CostLedgerState(id=1, accrued_until=None)
+        db.add(state)
+    return state
+
+
+# -----------------------------------------------------
+# Accrual
+# -----------------------------------------------------
+async def accrue(db: AsyncSession, until: Optional[datetime] = None) -> int:
+    """
+    Accrue every billable resource from the last pass (or its creation)
+    up to `until` into the daily partitions, in the caller's transaction.
+    One grouped query per pass; the per-day split runs over the grouped
+    rows, never per resource. Returns the number of partitions touched.
+    """
+    state = await _state(db)
+    end = _epoch(until or datetime.utcnow())
+    if state.accrued_until is not None:
+        start = _epoch(state.accrued_until)
+    else:
+        first = (await db.execute(select(models.Resource.created_at).order_by(models.Resource.created_at).limit(1))).scalar()
+        start = max(_epoch(first) if first else end, end - BACKFILL_DAYS * DAY)
+    if end <= start:
+        return 0
+
+    result = await db.execute(
+        _ACCRUAL_SQL,
+        {"per_second": PER_SECOND, "since": start, "until": end, "not_billed": list(NOT_BILLED)},
+    )
+    # (dimension, key) -> {creation day: (sum rate, sum rate * created)}
+    buckets: Dict[Tuple[str, str], Dict[int, Tuple[float, float]]] = defaultdict(dict)
+    for dim, key, cday, rate, weighted in result.all():
+        buckets[(dim, str(key))][cday] = (rate or 0.0, weighted or 0.0)
+
+    amounts: Dict[Tuple[str, int, str], float] = {}
+    for (dim, key), by_day in buckets.items():
+        running, _ = by_day.get(-1, (0.0, 0.0))   # created before the window: bill the whole span
+        for d, seconds in _spans(start, end):
+            amount = running * seconds
+            if d in by_day:
+                # created during day d: each bills from its creation to the span end
+                rate, weighted = by_day[d]
+                span_end = min(end, (d + 1) * DAY)
+                amount += rate * span_end - weighted
+                running += rate
+            if amount:
+                amounts[(dim, d, key)] = amount
+
+    await _write(db, amounts)
+    state.accrued_until = _naive(end)
+    return len(amounts)
+
+
+async def accrue_removed(db: AsyncSession, resources: Iterable[models.Resource], until: Optional[datetime] = None) -> None:
+    """
+    Bill resources about to be deleted for the time since the last pass,
+    which the next pass can no longer see. Call before the delete commits.
+    """
+    state = await db.get(models.CostLedgerState, 1)
+    last = _epoch(state.accrued_until) if state and state.accrued_until else None
+    end = _epoch(until or datetime.utcnow())
+    amounts: Dict[Tuple[str, int, str], float] = defaultdict(float)
+    for res in resources:
+        if res.status in NOT_BILLED or not res.created_at or not res.cost_per_month_inr:
+            continue
+        created = _epoch(res.created_at)
+        start = max(created, last) if last is not None else max(created, end - BACKFILL_DAYS * DAY)
+        rate = res.cost_per_month_inr * PER_SECOND
+        keys = cost.share_keys(cost.share(res))
+        for d, seconds in _spans(start, end):
+            for dim, key in keys:
+                amounts[(dim, d, key)] += rate * seconds
+    await _write(db, amounts)
+
+
+# -----------------------------------------------------
+# Reads
+# -----------------------------------------------------
+def _period(day: date, granularity: str) -> str:
+    if granularity == "month":
+        return day.strftime("%Y-%m")
+    return day.isoformat()
+
+
+async def spend(
+    db: AsyncSession,
+    since: date,
+    until: date,
+    group_by: Optional[str] = None,
+    granularity: str = "day",
+) -> Dict[str, Any]:
+    """
+    Accrued spend for days in [since, until), per group_by key (or one
+    "all" group). Reads a primary-key range of cost_daily only.
+    """
+    t = models.CostDaily
+    dimension = group_by or "total"
+    result = await db.execute(
+        select(t.day, t.key, t.amount_inr)
+        .where(t.dimension == dimension, t.day >= since, t.day < until)
+        .order_by(t.day)
+    )
+    periods: List[str] = []
+    groups: Dict[str, Dict[str, Any]] = {}
+    for day, key, amount in result.all():
+        label = key if group_by else "all"
+        group = groups.setdefault(label, {"total": 0.0, "series": {}})
+        group["total"] += amount
+        if granularity != "total":
+            p = _period(day, granularity)
+            if not periods or periods[-1] != p:   # rows come in day order
+                periods.append(p)
+            group["series"][p] = group["series"].get(p, 0.0) + amount
+
+    state = await db.get(models.CostLedgerState, 1)
+    return {
+        "currency": "INR",
+        "since": since,
+        "until": until,
+        "groupBy": group_by,
+        "granularity": granularity,
+        "accruedUntil": state.accrued_until if state else None,
+        "total": round(sum(g["total"] for g in groups.values()), 2),
+        "periods": periods,
+        "groups": {
+            label: {
+                "total": round(g["total"], 2),
+                "series": [round(g["series"].get(p, 0.0), 2) for p in periods],
+            }
+            for label, g in sorted(groups.items())
+        },
+    }
+
+
+# -----------------------------------------------------
+# Background accrual
+# -----------------------------------------------------
+class CostLedger:
+    """Every ACCRUE_INTERVAL seconds, accrue spend since the previous pass."""
+
+    def __init__(self, interval: float = ACCRUE_INTERVAL):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="cost-ledger")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    n = await accrue(db)
+                    await db.commit()
+                logger.info("accrued daily partitions", extra={"partitions": n})
+            except Exception:
+                logger.exception("accrual failed")
+            await asyncio.sleep(self.interval)
+
+
+ledger = CostLedger()
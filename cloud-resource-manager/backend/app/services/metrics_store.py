@@ -0,0 +1,242 @@
+# stored metric history: collection, rollups, retention, range queries
+# app/services/metrics_store.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..database import AsyncSessionLocal
+from . import alerts, events, monitoring
+from .reconciler import FINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("METRICS_COLLECTOR_ENABLED", "1") == "1"
+COLLECT_INTERVAL = float(os.getenv("METRICS_COLLECT_INTERVAL", "300"))  # seconds
+# Each pass re-reads this much history, so a missed pass or a late
+# CloudWatch point is filled in by the next one
+COLLECT_WINDOW = int(os.getenv("METRICS_COLLECT_WINDOW", "7200"))       # seconds
+
+RAW = 300        # collected points
+HOURLY = 3600
+DAILY = 86400
+RESOLUTIONS = (RAW, HOURLY, DAILY)
+
+DAY = 86400
+# How long each resolution is kept
+RETENTION: Dict[int, int] = {
+    RAW: int(os.getenv("METRICS_RETENTION_5M_DAYS", "7")) * DAY,
+    HOURLY: int(os.getenv("METRICS_RETENTION_1H_DAYS", "90")) * DAY,
+    DAILY: int(os.getenv("METRICS_RETENTION_1D_DAYS", "730")) * DAY,
+}
+
+# Range queries pick the finest resolution that answers in at most this many points
+MAX_POINTS = int(os.getenv("METRICS_HISTORY_MAX_POINTS", "1000"))
+
+_ROLLUP_SQL = text(
+    """
+    INSERT INTO metric_samples (resource_id, resolution, ts, cpu, cpu_max, memory, network_in, network_out, samples)
+    SELECT resource_id, :dst, (ts / :dst) * :dst AS bucket,
+           SUM(cpu * samples) / SUM(CASE WHEN cpu IS NOT NULL THEN samples END),
+           MAX(cpu_max),
+           SUM(memory * samples) / SUM(CASE WHEN memory IS NOT NULL THEN samples END),
+           SUM(network_in),
+           SUM(network_out),
+           SUM(samples)
+    FROM metric_samples
+    WHERE resolution = :src AND ts >= :since
+    GROUP BY resource_id, bucket
+    ON CONFLICT (resource_id, resolution, ts) DO UPDATE SET
+        cpu = excluded.cpu,
+        cpu_max = excluded.cpu_max,
+        memory = excluded.memory,
+        network_in = excluded.network_in,
+        network_out = excluded.network_out,
+        samples = excluded.samples
+    """
+)
+
+
+# -----------------------------------------------------
+# Writes
+# -----------------------------------------------------
+async def write_raw(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Upsert 5-minute points: dicts with resource_id, ts and the metric columns."""
+    if not rows:
+        return
+    stmt = sqlite_insert(models.MetricSample)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["resource_id", "resolution", "ts"],
+        set_={c: stmt.excluded[c] for c in ("cpu", "cpu_max", "memory", "network_in", "network_out")},
+    )
+    await db.execute(stmt, [{"resolution": RAW, "samples": 1, **r} for r in rows])
+
+
+async def rollup(db: AsyncSession, since: int) -> None:
+    """
+    Rebuild the hourly buckets from 5-minute points at or after `since`,
+    then the daily buckets from those hours. Buckets are recomputed whole,
+    so running this again over the same range is harmless.
+    """
+    await db.execute(_ROLLUP_SQL, {"src": RAW, "dst": HOURLY, "since": since // HOURLY * HOURLY})
+    await db.execute(_ROLLUP_SQL, {"src": HOURLY, "dst": DAILY, "since": since // DAILY * DAILY})
+
+
+async def apply_retention(db: AsyncSession, now: Optional[int] = None) -> None:
+    now = int(time.time()) if now is None else now
+    for resolution, keep in RETENTION.items():
+        await db.execute(
+            delete(models.MetricSample).where(
+                models.MetricSample.resolution == resolution,
+                models.MetricSample.ts < now - keep,
+            )
+        )
+
+
+async def forget(db: AsyncSession, resource_ids: List[int]) -> None:
+    """Drop the history of deleted resources (ids can be reused)."""
+    await db.execute(delete(models.MetricSample).where(models.MetricSample.resource_id.in_(resource_ids)))
+
+
+# -----------------------------------------------------
+# Reads
+# -----------------------------------------------------
+def pick_resolution(start: int, end: int, now: Optional[int] = None) -> int:
+    """Finest resolution still retained at `start` that fits in MAX_POINTS."""
+    now = int(time.time()) if now is None else now
+    for resolution in RESOLUTIONS:
+        if start >= now - RETENTION[resolution] and (end - start) // resolution <= MAX_POINTS:
+            return resolution
+    return DAILY
+
+
+async def query_range(
+    db: AsyncSession,
+    resource_id: int,
+    start: int,
+    end: int,
+    resolution: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Stored points for one resource in [start, end), as columns.
+    Only touches the primary key range; no provider calls.
+    """
+    if resolution is None:
+        resolution = pick_resolution(start, end)
+    m = models.MetricSample
+    result = await db.execute(
+        select(m.ts, m.cpu, m.cpu_max, m.memory, m.network_in, m.network_out)
+        .where(m.resource_id == resource_id, m.resolution == resolution, m.ts >= start, m.ts < end)
+        .order_by(m.ts)
+    )
+    rows = result.all()
+    return {
+        "resolution": resolution,
+        "ts": [r.ts for r in rows],
+        "cpu": [r.cpu for r in rows],
+        "cpuMax": [r.cpu_max for r in rows],
+        "memory": [r.memory for r in rows],
+        "networkIn": [r.network_in for r in rows],
+        "networkOut": [r.network_out for r in rows],
+    }
+
+
+# -----------------------------------------------------
+# Collection
+# -----------------------------------------------------
+class MetricsCollector:
+    """
+    Every COLLECT_INTERVAL seconds: fetch the last COLLECT_WINDOW of
+    5-minute points for every VM (one fleet request), upsert them, roll
+    them up into hourly/daily buckets and apply retention.
+    """
+
+    def __init__(self, interval: float = COLLECT_INTERVAL, window: int = COLLECT_WINDOW):
+        self.interval = interval
+        self.window = window
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="metrics-collector")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                n = await self.collect_once()
+                logger.info("stored metric points", extra={"points": n})
+            except Exception:
+                logger.exception("collection failed")
+            await asyncio.sleep(self.interval)
+
+    async def collect_once(self) -> int:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.Resource).where(
+                    models.Resource.type == "VM",
+                    models.Resource.status.notin_(FINAL_STATUSES),
+                )
+            )
+            resources = result.scalars().all()
+            if not resources:
+                return 0
+
+            data = await monitoring.fleet_metrics(resources, self.window, RAW)
+            rows = []
+            latest_cpu: Dict[int, Optional[float]] = {}
+            epochs = [data["start"] + i * data["period"] for i in range(len(data["timestamps"]))]
+            for rid, cols in data["series"].items():
+                for i, ts in enumerate(epochs):
+                    cpu, net_in, net_out = cols["cpu"][i], cols["networkIn"][i], cols["networkOut"][i]
+                    if cpu is None and net_in is None and net_out is None:
+                        continue
+                    if cpu is not None:
+                        latest_cpu[rid] = cpu
+                    rows.append({
+                        "resource_id": rid,
+                        "ts": ts,
+                        "cpu": cpu,
+                        "cpu_max": cpu,
+                        "memory": cols["memory"][i],
+                        "network_in": net_in,
+                        "network_out": net_out,
+                    })
+
+            await write_raw(db, rows)
+            await rollup(db, data["start"])
+            await apply_retention(db)
+            await alerts.on_metrics(db, resources, latest_cpu)
+            if rows:
+                # newest point per resource; rows are in time order
+                latest = {r["resource_id"]: r for r in rows}
+                events.emit(db, "metrics.points", {
+                    "period": RAW,
+                    "points": {
+                        rid: {"ts": r["ts"], "cpu": r["cpu"], "memory": r["memory"],
+                              "networkIn": r["network_in"], "networkOut": r["network_out"]}
+                        for rid, r in latest.items()
+                    },
+                })
+            await db.commit()
+            return len(rows)
+
+
+collector = MetricsCollector()
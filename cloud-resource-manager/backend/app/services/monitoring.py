@@ -0,0 +1,31 @@
+# fleet-wide metrics for the Monitoring view
+# app/services/monitoring.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from .. import models, providers
+from ..aws import metrics as aws_metrics
+
+
+async def fleet_metrics(
+    resources: List[models.Resource],
+    window: int = aws_metrics.DEFAULT_WINDOW,
+    period: int = aws_metrics.DEFAULT_PERIOD,
+    statistics: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Column-oriented metrics for many resources on one time axis, one
+    metrics_many call per provider adapter (all AWS VMs share a single
+    paginated GetMetricData request; GCP / Azure VMs come from the mocks).
+    Resources without metrics, and those whose fetch failed, are listed
+    under "missing".
+    """
+    axis, found = await providers.metrics(resources, window, period, statistics)
+    return {
+        "period": period,
+        "start": axis.start,
+        "timestamps": axis.timestamps(),
+        "series": {rid: {"source": source, **cols} for rid, (source, cols) in found.items()},
+        "missing": [r.id for r in resources if r.id not in found],
+    }
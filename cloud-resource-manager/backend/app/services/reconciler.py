@@ -0,0 +1,137 @@
+# background cloud status reconciler
+# app/services/reconciler.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import select
+
+from .. import models
+from ..database import AsyncSessionLocal
+from . import alerts, events, refresh
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("RECONCILER_ENABLED", "1") == "1"
+
+# Seconds between refreshes per (provider, type). Only kinds with a real
+# cloud status are listed; GCP/Azure are mocks and never change on their own.
+# Override any of them with e.g. RECONCILE_INTERVAL_AWS_VM=30.
+DEFAULT_INTERVALS: Dict[Tuple[str, str], float] = {
+    ("AWS", "VM"): 60.0,
+    ("AWS", "Database"): 120.0,
+    ("AWS", "Storage"): 600.0,
+}
+
+JITTER = float(os.getenv("RECONCILE_JITTER", "0.1"))             # +/- fraction of the interval
+MAX_BACKOFF = float(os.getenv("RECONCILE_MAX_BACKOFF", "1800"))  # seconds
+
+# Rows in these states are never going to change again
+FINAL_STATUSES = ("Terminated", "Deleted")
+
+
+def _interval_from_env(provider: str, rtype: str, default: float) -> float:
+    key = f"RECONCILE_INTERVAL_{provider}_{rtype}".upper().replace(" ", "_")
+    return float(os.getenv(key, default))
+
+
+class StatusReconciler:
+    """
+    Periodically refreshes Resource.status from the cloud so that request
+    handlers can serve straight from the DB.
+
+    Each (provider, type) group has its own schedule. The next run is the
+    group's interval with +/- jitter so groups don't line up; a run that
+    hits errors doubles the wait (capped at MAX_BACKOFF) until one succeeds.
+    """
+
+    def __init__(self, intervals: Dict[Tuple[str, str], float] | None = None):
+        if intervals is None:
+            intervals = {k: _interval_from_env(*k, v) for k, v in DEFAULT_INTERVALS.items()}
+        self.intervals = intervals
+        self._failures: Dict[Tuple[str, str], int] = {k: 0 for k in intervals}
+        # first pass runs straight away so a fresh process has current data
+        self._next_due: Dict[Tuple[str, str], float] = {k: 0.0 for k in intervals}
+        self._task: asyncio.Task | None = None
+
+    # ---- lifecycle (runs as a task on the app's event loop) ----
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="status-reconciler")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---- scheduling ----
+
+    def _delay(self, key: Tuple[str, str]) -> float:
+        base = self.intervals[key]
+        failures = self._failures[key]
+        if failures:
+            base = min(base * (2 ** failures), MAX_BACKOFF)
+        return base * (1 + random.uniform(-JITTER, JITTER))
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            for key, due in self._next_due.items():
+                if due > now:
+                    continue
+                try:
+                    ok = await self.reconcile(*key)
+                except Exception:
+                    logger.exception("reconcile failed", extra={"key": "/".join(map(str, key))})
+                    ok = False
+                self._failures[key] = 0 if ok else self._failures[key] + 1
+                self._next_due[key] = time.monotonic() + self._delay(key)
+
+            wait = min(self._next_due.values()) - time.monotonic()
+            await asyncio.sleep(max(wait, 0.5))
+
+    # ---- work ----
+
+    async def reconcile(self, provider: str, rtype: str) -> bool:
+        """
+        Refresh every live resource of one kind and stamp last_refreshed_at
+        on the ones that were actually checked. Returns False if any lookup failed.
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.Resource).where(
+                    models.Resource.provider == provider,
+                    models.Resource.type == rtype,
+                    models.Resource.status.notin_(FINAL_STATUSES),
+                )
+            )
+            resources = result.scalars().all()
+            if not resources:
+                return True
+
+            before = {r.id: r.status for r in resources}
+            stats = await refresh.refresh_statuses(resources)
+            now = datetime.utcnow()
+            for r in resources:
+                if r.id not in stats.failed_ids:
+                    r.last_refreshed_at = now
+                if r.status != before[r.id]:
+                    events.emit(db, "resource.updated", {"id": r.id, "status": r.status})
+            await alerts.on_status(db, resources)
+            await db.commit()
+            return not stats.failed_ids
+
+
+reconciler = StatusReconciler()
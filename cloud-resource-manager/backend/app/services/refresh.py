@@ -0,0 +1,62 @@
+# cloud status refresh engine
+# app/services/refresh.py
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, Set
+
+from .. import models, providers, resilience
+
+logger = logging.getLogger(__name__)
+
+# Statuses we keep even when the cloud can't be reached
+STABLE_STATUSES = ("Running", "Stopped", "Terminated", "Deleted")
+
+
+@dataclass
+class RefreshStats:
+    changed: int = 0
+    failed_ids: Set[int] = field(default_factory=set)
+
+
+def _set_status(r: models.Resource, status: str | None) -> bool:
+    if status and status != r.status:
+        r.status = status
+        r.updated_at = datetime.utcnow()
+        return True
+    return False
+
+
+def _mark_failed(r: models.Resource, error: BaseException, stats: RefreshStats) -> None:
+    stats.failed_ids.add(r.id)
+    if isinstance(error, resilience.DependencyUnavailable):
+        # breaker open / over the rate limit: nothing was asked, keep the last-known status
+        return
+    # If AWS is unreachable / credentials issue etc
+    logger.warning("status refresh failed", extra={"resource_id": r.id, "external_id": r.external_id, "error": str(error)})
+    if r.status not in STABLE_STATUSES:
+        stats.changed += _set_status(r, "Failed")
+
+
+async def refresh_statuses(resources: Iterable[models.Resource]) -> RefreshStats:
+    """
+    Refresh cloud statuses for the given resources in place.
+    Returns how many changed and which ones could not be checked.
+    Each provider adapter describes its resources in one describe_many call
+    (EC2 batches ids per region; DynamoDB has no batch describe, so it
+    fans out with a cap). The caller owns the DB commit.
+    """
+    resources = list(resources)
+    stats = RefreshStats()
+    results = await providers.describe(resources)
+    for r in resources:
+        if r.id not in results:
+            continue
+        got = results[r.id]
+        if isinstance(got, BaseException):
+            _mark_failed(r, got, stats)
+        else:
+            stats.changed += _set_status(r, got)
+    return stats
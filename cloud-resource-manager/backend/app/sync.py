@@ -0,0 +1,161 @@
+# ETags and delta sync for /resources and /logs
+# app/sync.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Deletes are reported to delta clients for this long
+TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "7"))
+# Seconds between prunes of expired tombstones
+PRUNE_INTERVAL = float(os.getenv("SYNC_TOMBSTONE_PRUNE_INTERVAL", "3600"))
+
+_TV = models.TableVersion.__table__
+
+
+async def table_versions(db: AsyncSession, tables: Sequence[str]) -> Dict[str, int]:
+    """Current change counters; one Core primary-key read, no ORM objects."""
+    result = await db.execute(select(_TV.c.name, _TV.c.version).where(_TV.c.name.in_(tables)))
+    versions = dict(result.all())
+    return {t: versions.get(t, 0) for t in tables}
+
+
+def make_etag(versions: Dict[str, int], query: str) -> str:
+    """
+    Strong ETag for a list response: the versions of the tables it reads
+    plus a digest of the query string (filters, cursor, limit, fields).
+    """
+    digest = hashlib.sha1(query.encode()).hexdigest()[:12]
+    return '"' + ".".join(str(v) for v in versions.values()) + "-" + digest + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # If-None-Match uses weak comparison
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+async def conditional(
+    db: AsyncSession,
+    tables: Sequence[str],
+    query: str,
+    if_none_match: Optional[str],
+) -> Tuple[str, Dict[str, int], bool]:
+    """(etag, versions, not modified?) for a list request."""
+    versions = await table_versions(db, tables)
+    etag = make_etag(versions, query)
+    return etag, versions, etag_matches(if_none_match, etag)
+
+
+# -----------------------------------------------------
+# Delta sync
+# -----------------------------------------------------
+async def changes(
+    db: AsyncSession,
+    model,
+    since: int,
+    limit: int,
+    columns: Optional[List] = None,
+    joins: Sequence[Tuple] = (),
+):
+    """
+    Rows of `model` changed after version `since` (oldest change first, at
+    most `limit`) and the ids deleted in the same span.
+
+    Returns (rows, deleted ids, version, more): a client that applies them
+    is in sync up to `version` and passes it as the next `since`.
+    """
+    table = model.__tablename__
+    tv = (await db.execute(select(_TV.c.version, _TV.c.floor).where(_TV.c.name == table))).one_or_none()
+    current, floor = tv if tv else (0, 0)
+    if since < floor:
+        raise HTTPException(
+            status_code=410,
+            detail=f"Changes before version {floor} are no longer kept; reload the full list",
+        )
+
+    q = select(*columns, model.row_version.label("row_version")) if columns else select(model)
+    q = q.select_from(model)
+    for target, on in joins:
+        q = q.outerjoin(target, on)
+    q = q.where(model.row_version > since).order_by(model.row_version).limit(limit + 1)
+    result = await db.execute(q)
+    rows = result.all() if columns else result.scalars().all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    version = rows[-1].row_version if more else current
+
+    t = models.Tombstone
+    deleted = (await db.execute(
+        select(t.row_id)
+        .where(t.table_name == table, t.version > since, t.version <= version)
+        .order_by(t.version)
+    )).scalars().all()
+    # an id that exists again (SQLite can reuse the highest id) is live, not deleted
+    live = {r.id for r in rows}
+    return rows, [i for i in deleted if i not in live], version, more
+
+
+async def prune_tombstones(db: AsyncSession, now: Optional[datetime] = None) -> None:
+    """Drop tombstones older than TOMBSTONE_DAYS and raise each table's floor past them."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=TOMBSTONE_DAYS)
+    t = models.Tombstone
+    for table in models.SYNCED_TABLES:
+        last = (await db.execute(
+            select(func.max(t.version)).where(t.table_name == table, t.deleted_at < cutoff)
+        )).scalar()
+        if last is None:
+            continue
+        await db.execute(delete(t).where(t.table_name == table, t.version <= last))
+        await db.execute(update(_TV).where(_TV.c.name == table).values(floor=last))
+
+
+class TombstonePruner:
+    """Every PRUNE_INTERVAL seconds (and once at start), drop expired tombstones."""
+
+    def __init__(self, interval: float = PRUNE_INTERVAL):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="tombstone-pruner")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await prune_tombstones(db)
+                    await db.commit()
+            except Exception:
+                logger.exception("pruning tombstones failed")
+            await asyncio.sleep(self.interval)
+
+
+pruner = TombstonePruner()
@@ -0,0 +1,387 @@
+# Prometheus metrics for the API, the database and cloud calls
+# app/telemetry.py
+"""
+A small in-process metrics registry rendered in the Prometheus text
+format at GET /metrics.
+
+Hot-path cost is one dict lookup per labelled child plus a locked
+increment (observations also come from the cloud I/O threads).
+Gauges and counters that describe state kept elsewhere (cache
+counters, pool sizes, breaker states) take a `collect` callback that is
+only run when /metrics is scraped.
+
+What feeds it:
+  - TelemetryMiddleware: request latency per method / route template /
+    status, plus database queries and time per request. It also sets the
+    request id used in logs and echoes it as X-Request-ID.
+  - instrument_engine(): every SQL statement on an engine.
+  - resilience.Guard: every SDK call (provider / service / operation).
+  - providers._call: every adapter operation, mocks included.
+  - collectors registered next to the state they read (cache, concurrency,
+    database pools, job queue, audit writer, breakers).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import log, tracing
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Seconds; a request slower than this is also logged
+SLOW_REQUEST = float(os.getenv("SLOW_REQUEST_SECONDS", "1"))
+ACCESS_LOG = os.getenv("ACCESS_LOG", "1") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CLOUD_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[str, ...]
+
+
+# -----------------------------------------------------
+# Metric types
+# -----------------------------------------------------
+class _Child:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot: above the largest bound
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Labels, float]]] = None,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.collect = collect
+        self._children: Dict[Labels, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _new(self):
+        return _Child()
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new())
+        return child
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        values = self.collect() if self.collect else {k: c.value for k, c in list(self._children.items())}
+        for labels, value in values.items():
+            yield self.name, labels, value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def _new(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        for labels, child in list(self._children.items()):
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            running = 0
+            for bound, n in zip(self.buckets, counts):
+                running += n
+                yield f"{self.name}_bucket", labels + (_fmt(bound),), running
+            running += counts[-1]
+            yield f"{self.name}_bucket", labels + ("+Inf",), running
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, running
+
+
+REGISTRY: List[Metric] = []
+
+
+# -----------------------------------------------------
+# Exposition
+# -----------------------------------------------------
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_ESCAPE = re.compile(r'[\\"\n]')
+_ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n"}
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def _label_str(names: Sequence[str], values: Labels) -> str:
+    if not names:
+        return ""
+    pairs = (f'{n}="{_ESCAPE.sub(lambda m: _ESCAPES[m.group()], str(v))}"' for n, v in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        try:
+            samples = list(metric.samples())
+        except Exception:
+            logger.exception("metric collector failed", extra={"metric": metric.name})
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        names = metric.labelnames + (("le",) if metric.kind == "histogram" else ())
+        for name, labels, value in samples:
+            label_names = names if name.endswith("_bucket") else metric.labelnames
+            lines.append(f"{name}{_label_str(label_names, labels)} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------------------------------
+# Requests
+# -----------------------------------------------------
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements run per HTTP request.", ("route",), buckets=COUNT_BUCKETS
+)
+HTTP_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request.", ("route",)
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQL statement latency by verb.", ("verb",)
+)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def _route(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class TelemetryMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                rid = value.decode("latin-1")
+                break
+        if not rid or not _REQUEST_ID.match(rid):
+            rid = uuid.uuid4().hex[:16]
+        rid_token = log.request_id.set(rid)
+        stats = RequestStats()
+        stats_token = _request.set(stats)
+        status = 500
+        headers = scope.get("headers", ())
+        trace = trace_token = None
+        if tracing.wanted(headers):
+            trace, trace_token = tracing.begin(f"{scope['method']} {scope['path']}", request_id=rid)
+        send_trace = trace is not None and any(name == tracing.HEADER.encode() for name, _ in headers)
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                extra = [(b"x-request-id", rid.encode())]
+                if send_trace:
+                    # the handler is done by now; a streamed body is still to come
+                    extra.append((tracing.HEADER.encode(), trace.header_value().encode()))
+                message["headers"] = [*message.get("headers", ()), *extra]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - t0
+            route = _route(scope)
+            HTTP_LATENCY.labels(scope["method"], route, str(status)).observe(elapsed)
+            HTTP_DB_QUERIES.labels(route).observe(stats.queries)
+            HTTP_DB_SECONDS.labels(route).observe(stats.db_seconds)
+            slow = elapsed >= SLOW_REQUEST
+            if trace is not None:
+                tracing.end(trace, trace_token, route=route, status=status)
+            if ACCESS_LOG or slow:
+                fields = {
+                    "method": scope["method"], "path": scope["path"], "route": route, "status": status,
+                    "duration_ms": round(elapsed * 1000, 2), "db_queries": stats.queries,
+                    "db_ms": round(stats.db_seconds * 1000, 2),
+                }
+                if slow and trace is not None:
+                    fields["trace"] = trace.to_dict()
+                    tracing.write_slow(trace)
+                logger.log(logging.WARNING if slow else logging.INFO, "slow request" if slow else "request", extra=fields)
+            _request.reset(stats_token)
+            log.request_id.reset(rid_token)
+
+
+# -----------------------------------------------------
+# Database
+# -----------------------------------------------------
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    span = None
+    if tracing.current.get() is not None:
+        span = tracing.start("sql", "sql", statement=tracing.statement(statement))
+        if span is not None and executemany:
+            span.attrs["executemany"] = len(parameters)
+    conn.info.setdefault("telemetry_t0", []).append((time.perf_counter(), span))
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    t0, span = conn.info["telemetry_t0"].pop()
+    elapsed = time.perf_counter() - t0
+    if span is not None:
+        span.finish()
+    DB_QUERY_SECONDS.labels(statement.split(None, 1)[0].upper()).observe(elapsed)
+    stats = _request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def _failed_execute(ctx):
+    # a failed statement never reaches after_cursor_execute; drop its start time
+    starts = ctx.connection.info.get("telemetry_t0") if ctx.connection is not None else None
+    if starts:
+        _, span = starts.pop()
+        if span is not None:
+            span.finish(error=repr(ctx.original_exception))
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time every statement on `engine` (for async engines, pass .sync_engine)."""
+    if not ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+    event.listen(engine, "handle_error", _failed_execute)
+
+
+# -----------------------------------------------------
+# Threadpools
+# -----------------------------------------------------
+def _anyio_threads() -> Dict[Labels, float]:
+    # Starlette runs sync routes and dependencies on anyio's default limiter
+    from anyio import to_thread
+    limiter = to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    return {
+        ("anyio", "max"): limiter.total_tokens,
+        ("anyio", "busy"): stats.borrowed_tokens,
+        ("anyio", "queued"): stats.tasks_waiting,
+    }
+
+
+THREADPOOL = Gauge(
+    "threadpool_threads", "Worker threads per pool: max, busy, and calls queued for a thread.",
+    ("pool", "state"), collect=lambda: {**_anyio_threads(), **{k: v for c in _THREADPOOLS for k, v in c().items()}},
+)
+_THREADPOOLS: List[Callable[[], Dict[Labels, float]]] = []
+
+
+def threadpool(collect: Callable[[], Dict[Labels, float]]) -> None:
+    """Add a pool to threadpool_threads; `collect` returns {(pool, state): value}."""
+    _THREADPOOLS.append(collect)
+
+
+# -----------------------------------------------------
+# Background queues
+# -----------------------------------------------------
+_QUEUES: Dict[str, Callable[[], float]] = {}
+
+QUEUE_DEPTH = Gauge(
+    "background_queue_depth", "Items waiting in in-process background queues.", ("queue",),
+    collect=lambda: {(name,): depth() for name, depth in list(_QUEUES.items())},
+)
+
+
+def queue_depth(name: str, depth: Callable[[], float]) -> None:
+    """Export `depth()` as background_queue_depth{queue=name}."""
+    _QUEUES[name] = depth
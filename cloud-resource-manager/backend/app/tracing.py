@@ -0,0 +1,261 @@
+# Per-request span trees for finding where a slow request spent its time
+# app/tracing.py
+"""
+Opt-in tracing. A traced request records a tree of spans:
+
+    request                      TelemetryMiddleware
+      route                      TracedRoute: the FastAPI handler
+        dependencies             body parsing, validation, get_db, ...
+        endpoint                 the route function
+          sql                    every statement (telemetry.instrument_engine)
+          provider               every adapter operation (providers._call)
+            cloud                every SDK call (resilience.Guard)
+        serialize                response validation, encoding and rendering
+
+TRACE_MODE:
+  off (default)  nothing is recorded
+  header         requests sent with `X-Debug-Trace: 1` are traced, and get
+                 the tree back in the X-Debug-Trace response header
+  all            every request is traced (the header still returns it)
+
+A traced request slower than SLOW_REQUEST_SECONDS has its tree added to
+the "slow request" log line, and also appended as JSON to TRACE_SLOW_LOG
+if that is set. Untraced requests pay one ContextVar lookup per hook.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+MODE = os.getenv("TRACE_MODE", "off")          # "off" | "header" | "all"
+HEADER = "x-debug-trace"
+HEADER_MAX = int(os.getenv("TRACE_HEADER_MAX", "8192"))    # bytes; larger trees are summarised
+MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "2000"))      # per request; later spans are counted, not kept
+SLOW_LOG = os.getenv("TRACE_SLOW_LOG", "")                 # JSONL file for slow traced requests
+STATEMENT_MAX = 300    # characters of SQL kept per span
+
+
+class Span:
+    __slots__ = ("name", "kind", "start", "end", "attrs", "children", "trace")
+
+    def __init__(self, name: str, kind: str, trace: "Trace", start: Optional[float] = None, **attrs: Any):
+        self.name = name
+        self.kind = kind
+        self.start = time.perf_counter() if start is None else start
+        self.end: Optional[float] = None
+        self.attrs = attrs
+        self.children: List[Span] = []
+        self.trace = trace
+
+    def child(self, name: str, kind: str, start: Optional[float] = None, **attrs: Any) -> Optional["Span"]:
+        """A new span under this one, or None once the trace is full."""
+        if not self.trace.reserve():
+            return None
+        span = Span(name, kind, self.trace, start, **attrs)
+        self.children.append(span)    # may run on a cloud I/O thread; list.append is atomic
+        return span
+
+    def finish(self, end: Optional[float] = None, **attrs: Any) -> None:
+        self.end = time.perf_counter() if end is None else end
+        if attrs:
+            self.attrs.update(attrs)
+
+    def to_dict(self, t0: float) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        out: Dict[str, Any] = {
+            "name": self.name,
+            "kind": self.kind,
+            "at_ms": round((self.start - t0) * 1000, 3),
+            "ms": round((end - self.start) * 1000, 3),
+        }
+        if self.end is None:
+            out["unfinished"] = True
+        out.update(self.attrs)
+        if self.children:
+            out["children"] = [c.to_dict(t0) for c in list(self.children)]
+        return out
+
+
+class Trace:
+    __slots__ = ("root", "spans", "dropped", "_lock")
+
+    def __init__(self, name: str, **attrs: Any):
+        self.spans = 1
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self.root = Span(name, "request", self, **attrs)
+
+    def reserve(self) -> bool:
+        with self._lock:
+            if self.spans >= MAX_SPANS:
+                self.dropped += 1
+                return False
+            self.spans += 1
+            return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = self.root.to_dict(self.root.start)
+        out.pop("unfinished", None)    # the header is built before the body is sent
+        if self.dropped:
+            out["dropped_spans"] = self.dropped
+        return out
+
+    def summary(self) -> Dict[str, Any]:
+        """Count and total time per span kind, for trees too big to send whole."""
+        kinds: Dict[str, Dict[str, float]] = {}
+        stack = list(self.root.children)
+        while stack:
+            span = stack.pop()
+            stack.extend(span.children)
+            k = kinds.setdefault(span.kind, {"count": 0, "ms": 0.0})
+            k["count"] += 1
+            k["ms"] = round(k["ms"] + ((span.end or time.perf_counter()) - span.start) * 1000, 3)
+        return {
+            "name": self.root.name,
+            "ms": round(((self.root.end or time.perf_counter()) - self.root.start) * 1000, 3),
+            "summary": kinds,
+            "truncated": True,
+        }
+
+    def header_value(self) -> str:
+        full = json.dumps(self.to_dict(), separators=(",", ":"), default=str)
+        if len(full) <= HEADER_MAX:
+            return full
+        return json.dumps(self.summary(), separators=(",", ":"))
+
+
+current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+# -----------------------------------------------------
+# Recording
+# -----------------------------------------------------
+def wanted(headers) -> bool:
+    """Whether a request with these (raw ASGI) headers should be traced."""
+    if MODE == "all":
+        return True
+    if MODE != "header":
+        return False
+    return any(name == HEADER.encode() and value.strip() in (b"1", b"true") for name, value in headers)
+
+
+def begin(name: str, **attrs: Any):
+    """Start a trace and make its root current; returns (trace, token) for end()."""
+    trace = Trace(name, **attrs)
+    return trace, current.set(trace.root)
+
+
+def end(trace: Trace, token, **attrs: Any) -> None:
+    trace.root.finish(**attrs)
+    current.reset(token)
+
+
+@contextmanager
+def span(name: str, kind: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """Record the block as a child of the current span (no-op outside a trace)."""
+    parent = current.get()
+    s = parent.child(name, kind, **attrs) if parent is not None else None
+    if s is None:
+        yield None
+        return
+    token = current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = repr(e)
+        raise
+    finally:
+        s.finish()
+        current.reset(token)
+
+
+def start(name: str, kind: str, **attrs: Any) -> Optional[Span]:
+    """A leaf span under the current one, finished by the caller (event hooks); None if untraced."""
+    parent = current.get()
+    return parent.child(name, kind, **attrs) if parent is not None else None
+
+
+def statement(sql: str) -> str:
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= STATEMENT_MAX else sql[:STATEMENT_MAX] + "..."
+
+
+def write_slow(trace: Trace) -> None:
+    """Append a slow request's tree to TRACE_SLOW_LOG, if configured."""
+    if not SLOW_LOG:
+        return
+    try:
+        with open(SLOW_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": time.time(), **trace.to_dict()}, default=str) + "\n")
+    except OSError:
+        logger.exception("writing slow request trace failed", extra={"path": SLOW_LOG})
+
+
+# -----------------------------------------------------
+# FastAPI handler phases
+# -----------------------------------------------------
+def _traced_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # functools.wraps keeps the signature FastAPI builds dependencies from
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def traced(*args: Any, **kwargs: Any) -> Any:
+            if current.get() is None:
+                return await endpoint(*args, **kwargs)
+            with span("endpoint", "endpoint", function=endpoint.__name__):
+                return await endpoint(*args, **kwargs)
+        return traced
+
+    @functools.wraps(endpoint)
+    def traced_sync(*args: Any, **kwargs: Any) -> Any:
+        if current.get() is None:
+            return endpoint(*args, **kwargs)
+        with span("endpoint", "endpoint", function=endpoint.__name__):
+            return endpoint(*args, **kwargs)
+    return traced_sync
+
+
+class TracedRoute(APIRoute):
+    """
+    APIRoute that splits a traced request's handler time into
+    dependencies / endpoint / serialize. Set as the router's route_class
+    before routes are declared.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, _traced_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def traced_handler(request):
+            with span("route", "route", path=self.path) as route:
+                if route is None:
+                    return await handler(request)
+                response = await handler(request)
+                endpoint = next((c for c in route.children if c.kind == "endpoint"), None)
+                if endpoint is not None and endpoint.end is not None:
+                    # before the endpoint ran: request parsing and dependencies;
+                    # after it returned: response model validation, encoding, rendering
+                    route.children.insert(0, _phase(route, "dependencies", route.start, endpoint.start))
+                    route.children.append(_phase(route, "serialize", endpoint.end, time.perf_counter()))
+                return response
+
+        return traced_handler
+
+
+def _phase(parent: Span, name: str, start: float, end: float) -> Span:
+    s = Span(name, name, parent.trace, start)
+    s.finish(end)
+    return s
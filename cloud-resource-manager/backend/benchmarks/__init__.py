@@ -0,0 +1 @@
+# local benchmarks (run from backend/: python -m benchmarks.<name>)
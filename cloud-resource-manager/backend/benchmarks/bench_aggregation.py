@@ -0,0 +1,121 @@
+# benchmarks/bench_aggregation.py
+"""
+Fleet rollups on the NumPy aggregation layer, from the database up.
+
+Seeds a scratch SQLite file with a synthetic fleet (--resources x
+--points 5-minute points, a few percent missing), times load_matrix()
+(the metric_samples fetch and the scatter into a SeriesMatrix, as
+/metrics/aggregate runs it) and then aggregate() for every group-by,
+both over the whole range and per hour. Exits non-zero if the load takes
+longer than --load-budget or any rollup longer than --budget seconds.
+The load reads every point through the driver, so it grows with
+resources x points and dominates the endpoint at fleet scale.
+
+    python -m benchmarks.bench_aggregation [--resources 10000] [--points 288] [--budget 1.0] [--load-budget 8.0]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import migrations
+from app.services import aggregation
+
+PROVIDERS = np.array(["AWS", "GCP", "Azure"], dtype=object)
+REGIONS = np.array(["ap-south-1", "us-east-1", "eu-west-1", "us-central1", "westeurope"], dtype=object)
+TYPES = np.array(["VM", "Database", "Storage"], dtype=object)
+TAGS = ["web", "db", "batch", "prod", "staging"]
+PERIOD = 300
+
+
+def seed(engine, n: int, points: int, start: int, rng: np.random.Generator) -> int:
+    """`n` resources with `points` cpu samples each from `start`, ~3% missing; returns the sample count."""
+    providers = rng.choice(PROVIDERS, n)
+    regions = rng.choice(REGIONS, n)
+    types = rng.choice(TYPES, n)
+    tags = [json.dumps(list(rng.choice(TAGS, rng.integers(0, 3), replace=False))) for _ in range(n)]
+
+    ids = np.repeat(np.arange(1, n + 1), points)
+    ts = np.tile(start + np.arange(points) * PERIOD, n)
+    values = np.clip(rng.normal(40, 15, ids.size), 0, 100)
+    keep = rng.random(ids.size) > 0.03
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO resources (id, name, provider, type, region, status, tags) VALUES (?, ?, ?, ?, ?, 'Running', ?)",
+            ((i + 1, f"bench-{i:06d}", providers[i], types[i], regions[i], tags[i]) for i in range(n)),
+        )
+        cur.executemany(
+            "INSERT INTO metric_samples (resource_id, resolution, ts, cpu, samples) VALUES (?, ?, ?, ?, 1)",
+            zip(ids[keep].tolist(), [PERIOD] * int(keep.sum()), ts[keep].tolist(), values[keep].tolist()),
+        )
+        raw.commit()
+    finally:
+        raw.close()
+    return int(keep.sum())
+
+
+async def run(path: str, args, start: int) -> int:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    end = start + args.points * PERIOD
+    failures = 0
+    async with AsyncSession(engine) as db:
+        t0 = time.perf_counter()
+        matrix = await aggregation.load_matrix(db, "cpu", start, end, PERIOD)
+        elapsed = time.perf_counter() - t0
+    await engine.dispose()
+    over = elapsed > args.load_budget
+    failures += over
+    print(f"[{'FAIL' if over else 'ok':>4}] {'load_matrix':<32} {elapsed * 1000:8.1f} ms  "
+          f"({matrix.values.shape[0]} x {matrix.slots}, {int(np.count_nonzero(~np.isnan(matrix.values)))} points)")
+
+    for group_by in (None,) + aggregation.GROUP_BY:
+        for bucket in (None, 3600):
+            t0 = time.perf_counter()
+            out = aggregation.aggregate(matrix, group_by, bucket)
+            elapsed = time.perf_counter() - t0
+            over = elapsed > args.budget
+            failures += over
+            label = f"group_by={group_by or '-'} bucket={bucket or 'all'}"
+            print(f"[{'FAIL' if over else 'ok':>4}] {label:<32} {elapsed * 1000:8.1f} ms  ({len(out)} groups)")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resources", type=int, default=10_000)
+    parser.add_argument("--points", type=int, default=288)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds allowed per rollup")
+    parser.add_argument("--load-budget", type=float, default=8.0, help="seconds allowed for load_matrix")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench-aggregation-")
+    path = os.path.join(scratch, "aggregation.db")
+    try:
+        engine = create_engine(f"sqlite:///{path}")
+        migrations.upgrade(engine)
+        start = (int(time.time()) // PERIOD - args.points) * PERIOD
+        t0 = time.perf_counter()
+        rows = seed(engine, args.resources, args.points, start, np.random.default_rng(3))
+        engine.dispose()
+        print(f"seeded {args.resources} resources / {rows} 5-minute points in {time.perf_counter() - t0:.1f}s")
+        failures = asyncio.run(run(path, args, start))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# benchmarks/bench_audit_log.py
+"""
+Audit log write throughput, archival and range reads.
+
+Writes: --producers concurrent tasks record --entries audit entries in
+total, as before (one transaction and commit per entry) and through
+audit.writer with commit and async durability. Reports entries/s,
+per-record latency and how many batches the writer used.
+
+Archive: seeds --archived entries spread over the six months before the
+hot window, times audit.archive(), and reports files, bytes per entry
+and the rows left in the table. Then times a first /logs page (table
+only) against a 30-day range inside the archive, cold and cached.
+
+    python -m benchmarks.bench_audit_log [--producers 64] [--entries 20000] [--archived 200000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Scratch database and archive directory; read when app.database is imported
+SCRATCH = tempfile.mkdtemp(prefix="bench-audit-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'audit.db')}"
+os.environ["AUDIT_ARCHIVE_DIR"] = os.path.join(SCRATCH, "archive")
+
+from sqlalchemy import func, select, text  # noqa: E402
+
+from app import migrations, models, queries  # noqa: E402
+from app.database import AsyncSessionLocal, async_engine, engine  # noqa: E402
+from app.services import audit  # noqa: E402
+
+ACTIONS = ["create", "update", "update", "update", "delete"]
+PROVIDERS = ["AWS", "GCP", "Azure"]
+
+
+def make_entry(rnd: random.Random) -> dict:
+    res = SimpleNamespace(id=rnd.randint(1, 5000), provider=rnd.choice(PROVIDERS))
+    return audit.entry(rnd.choice(ACTIONS), res, {"updated_fields": {"name": f"res-{rnd.randint(1, 10**6)}"}})
+
+
+def ms(samples, q: int) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1] * 1000
+
+
+# -----------------------------------------------------
+# Writes
+# -----------------------------------------------------
+async def write_mode(mode: str, producers: int, entries: int) -> None:
+    per_producer = entries // producers
+    latencies = []
+
+    async def producer(i: int, record) -> None:
+        rnd = random.Random(i)
+        for _ in range(per_producer):
+            t0 = time.perf_counter()
+            await record(make_entry(rnd))
+            latencies.append(time.perf_counter() - t0)
+
+    if mode == "per-entry":
+        record = lambda row: audit.write([row])   # noqa: E731  (the old path: a commit per entry)
+    else:
+        audit.DURABILITY = mode.split()[-1]
+        audit.writer = audit.AuditWriter()
+        audit.writer.start()
+        record = audit.writer.record
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(producer(i, record) for i in range(producers)))
+    if mode != "per-entry":
+        await audit.writer.stop()   # async mode: count the drain too
+    elapsed = time.perf_counter() - t0
+
+    n = per_producer * producers
+    batches = f"{audit.writer.batches:>6} batches" if mode != "per-entry" else f"{n:>6} commits"
+    print(f"{mode:<16}{n / elapsed:>10.0f}/s  record p50 {ms(latencies, 50):7.2f} ms  "
+          f"p99 {ms(latencies, 99):7.2f} ms  {batches}")
+
+
+# -----------------------------------------------------
+# Archive
+# -----------------------------------------------------
+def seed_old(n: int, now: datetime) -> None:
+    """n entries spread over the six months before the hot window."""
+    rnd = random.Random(7)
+    newest = now - timedelta(days=audit.HOT_DAYS + 31)
+    rows = []
+    for i in range(n):
+        e = make_entry(rnd)
+        e["timestamp"] = newest - timedelta(seconds=rnd.uniform(0, 182 * 86400))
+        rows.append(e)
+    with engine.begin() as conn:
+        conn.execute(models.ActionLog.__table__.insert(), rows)
+
+
+async def timed(fn, reps: int) -> float:
+    timings = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000
+
+
+async def reads(now: datetime, reps: int) -> None:
+    page = queries.DEFAULT_LIMIT + 1
+    async with AsyncSessionLocal() as db:
+        async def hot():
+            (await db.execute(queries.log_query(queries.LogFilters()).limit(page))).all()
+
+        mid = now - timedelta(days=audit.HOT_DAYS + 90)
+        rng = queries.LogFilters(since=mid - timedelta(days=30), until=mid)
+
+        async def archived():
+            return await audit.archived_logs(db, rng, None, page)
+
+        print(f"/logs first page (table):        p50 {await timed(hot, reps):8.2f} ms")
+        audit._segment_cache.clear()
+        t0 = time.perf_counter()
+        got = await archived()
+        print(f"30-day archived range, cold:     {(time.perf_counter() - t0) * 1000:12.2f} ms  ({len(got)} rows)")
+        print(f"30-day archived range, cached:   p50 {await timed(archived, reps):8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--producers", type=int, default=64)
+    parser.add_argument("--entries", type=int, default=20_000)
+    parser.add_argument("--archived", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    migrations.upgrade(engine)
+    print(f"{args.producers} producers, {args.entries} entries")
+
+    async def writes():
+        for mode in ("per-entry", "writer commit", "writer async"):
+            await write_mode(mode, args.producers, args.entries)
+        await async_engine.dispose()
+    asyncio.run(writes())
+
+    now = datetime.utcnow()
+    t0 = time.perf_counter()
+    seed_old(args.archived, now)
+    print(f"\nseeded {args.archived} old entries in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    moved = audit.archive(now)
+    elapsed = time.perf_counter() - t0
+    with engine.connect() as conn:
+        files, size = conn.execute(select(func.count(), func.sum(models.AuditSegment.bytes))).one()
+        left = conn.execute(text("SELECT COUNT(*) FROM action_logs")).scalar()
+    codec = "zstd" if audit.zstandard else "gzip"
+    print(f"archived {moved} entries in {elapsed:.1f}s ({moved / elapsed:.0f}/s): {files} {codec} files, "
+          f"{size / 1e6:.1f} MB, {size / max(moved, 1):.0f} bytes/entry; {left} rows left in the table")
+
+    async def read_side():
+        await reads(now, args.queries)
+        await async_engine.dispose()
+    asyncio.run(read_side())
+
+    engine.dispose()
+    shutil.rmtree(SCRATCH)
+
+
+if __name__ == "__main__":
+    main()
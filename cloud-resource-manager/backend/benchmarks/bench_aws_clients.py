@@ -0,0 +1,72 @@
+# benchmarks/bench_aws_clients.py
+"""
+Per-call overhead of building a boto3 client for every operation (cold)
+versus reusing the shared client from app.aws.clients (warm).
+Calls are answered by botocore's Stubber, so no network is involved.
+
+    python -m benchmarks.bench_aws_clients [--calls 200]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+from typing import List
+
+# measure client reuse, not the rate limiter (read when app.resilience is imported)
+os.environ.setdefault("CLOUD_RATE_LIMIT", "0")
+
+import boto3  # noqa: E402
+from botocore.stub import Stubber  # noqa: E402
+
+from app.aws import clients  # noqa: E402
+
+REGION = "ap-south-1"
+RESPONSE = {"Reservations": []}
+
+
+def cold_call() -> None:
+    client = boto3.client("ec2", region_name=REGION)
+    with Stubber(client) as stub:
+        stub.add_response("describe_instances", RESPONSE)
+        client.describe_instances(InstanceIds=["i-0123456789abcdef0"])
+
+
+def make_warm_call():
+    clients.clear_clients()
+    client = clients.get_client("ec2", REGION)
+    stub = Stubber(client)
+    stub.activate()
+
+    def warm_call() -> None:
+        stub.add_response("describe_instances", RESPONSE)
+        clients.get_client("ec2", REGION).describe_instances(InstanceIds=["i-0123456789abcdef0"])
+
+    return warm_call
+
+
+def measure(fn, calls: int) -> List[float]:
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6}{'calls':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for label, fn in (("cold", cold_call), ("warm", make_warm_call())):
+        samples = measure(fn, args.calls)
+        q = statistics.quantiles(samples, n=100, method="inclusive")
+        print(f"{label:<6}{args.calls:>7}{statistics.fmean(samples) * 1000:>10.3f}"
+              f"{q[49] * 1000:>10.3f}{q[94] * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/bench_breaker.py
+"""
+What the circuit breaker and adaptive rate limiter in app.resilience buy
+against misbehaving EC2 stubs (no network involved).
+
+Outage: describe_instances takes --latency seconds and then fails as if
+the endpoint were unreachable. --refreshes status refreshes run one after
+another, with the breaker disabled and enabled. Reports the time per
+refresh and how many calls actually went out.
+
+Throttling: a stub that allows --server-rate calls/s and answers the rest
+with ThrottlingException. --calls lookups are fired at once, with the
+limiter off and on. Reports how many calls were throttled, how long the
+batch took, and the rate the limiter settled on.
+
+    python -m benchmarks.bench_breaker [--refreshes 50] [--latency 0.2] [--calls 400] [--server-rate 40]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, List
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from app import models, resilience
+from app.aws import aio as aws, clients
+from app.services import refresh
+
+from .stubs import FailingEC2
+
+REGION = "ap-south-1"
+_report: List[str] = []
+
+
+def report(line: str) -> None:
+    # the app's own per-failure log lines are muted below; results are printed at the end
+    _report.append(line)
+
+
+def guard() -> resilience.Guard:
+    return resilience.guard("AWS", "ec2", REGION, clients.classify)
+
+
+def inventory(n: int = 10) -> List[models.Resource]:
+    return [
+        models.Resource(id=i, provider="AWS", type="VM", region=REGION, status="Running", external_id=f"i-{i:017x}")
+        for i in range(n)
+    ]
+
+
+async def outage(breaker: bool, refreshes: int, latency: float) -> None:
+    resilience.reset()
+    stub = FailingEC2(EndpointConnectionError(endpoint_url=f"https://ec2.{REGION}.amazonaws.com"), latency)
+    clients.set_client("ec2", stub, REGION)
+    if not breaker:
+        guard().breaker.threshold = 10 ** 9
+
+    timings, kept = [], 0
+    for _ in range(refreshes):
+        resources = inventory()
+        t0 = time.perf_counter()
+        await refresh.refresh_statuses(resources)
+        timings.append(time.perf_counter() - t0)
+        kept += sum(r.status == "Running" for r in resources)
+    label = "breaker on" if breaker else "breaker off"
+    report(f"outage {label:<12} refresh p50 {statistics.median(timings) * 1000:8.1f} ms  "
+           f"total {sum(timings):6.2f}s  calls sent {stub.calls:>4}  "
+           f"statuses kept {kept}/{refreshes * 10}  breaker {guard().breaker.state}")
+
+
+class ThrottlingEC2:
+    """Accepts `rate` describe_instances calls/s; the rest get ThrottlingException."""
+
+    def __init__(self, rate: float, latency: float = 0.01):
+        self.bucket = resilience.TokenBucket(rate, burst=rate, min_rate=rate)
+        self.latency = latency
+        self.calls = 0
+        self.throttled = 0
+
+    def describe_instances(self, InstanceIds: List[str]) -> Dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.bucket.reserve(0) is None:
+            self.throttled += 1
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"},
+                               "ResponseMetadata": {"HTTPStatusCode": 400}}, "DescribeInstances")
+        return {"Reservations": [{"Instances": [{"InstanceId": i, "State": {"Name": "running"}} for i in InstanceIds]}]}
+
+
+async def throttling(limiter: bool, calls: int, server_rate: float) -> None:
+    resilience.reset()
+    stub = ThrottlingEC2(server_rate)
+    clients.set_client("ec2", stub, REGION)
+    g = guard()
+    if limiter:
+        # start well above what the server allows, as after a quiet period
+        g.bucket = resilience.TokenBucket(server_rate * 4, burst=server_rate, min_rate=1)
+    else:
+        g.bucket = resilience.TokenBucket(0)
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(
+        *(aws.get_instance_states([f"i-{i:017x}"], REGION) for i in range(calls)), return_exceptions=True
+    )
+    elapsed = time.perf_counter() - t0
+    rejected = sum(isinstance(r, resilience.RateLimited) for r in results)
+    label = "limiter on" if limiter else "limiter off"
+    rate = f"{g.bucket.rate:.1f}/s" if limiter else "-"
+    report(f"throttle {label:<11} {elapsed:6.2f}s  sent {stub.calls:>4}  throttled {stub.throttled:>4}  "
+           f"rejected locally {rejected:>4}  settled rate {rate}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--refreshes", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the outage stub fails")
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--server-rate", type=float, default=40.0)
+    args = parser.parse_args()
+
+    async def run():
+        for breaker in (False, True):
+            await outage(breaker, args.refreshes, args.latency)
+        for limiter in (False, True):
+            await throttling(limiter, args.calls, args.server_rate)
+    logging.getLogger("app").setLevel(logging.CRITICAL)
+    asyncio.run(run())
+    print("\n".join(_report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_cost_ledger.py
+"""
+Cost ledger backfill and range queries on a synthetic history.
+
+Seeds a scratch SQLite file with --resources resources created at random
+times over the last --days days (a share of them stopped or failed),
+times the first ledger.accrue() pass (a full backfill), one incremental
+pass, and ledger.spend() for 30/90/365-day ranges by every group-by.
+Checks the backfilled total against a per-resource recount.
+
+    python -m benchmarks.bench_cost_ledger [--resources 50000] [--days 365] [--queries 20]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import migrations
+from app.services import ledger
+
+PROVIDERS = ["AWS", "GCP", "Azure"]
+REGIONS = ["ap-south-1", "us-east-1", "eu-west-1", "us-central1", "westeurope"]
+TYPES = ["VM", "Database", "Storage", "Serverless"]
+TAGS = ["web", "db", "batch", "prod", "staging"]
+STATUSES = ["Running"] * 8 + ["Stopped", "Failed"]
+
+
+def seed(engine, n: int, days: int, now: datetime) -> float:
+    """Insert the resources; returns the exact spend of the billable ones up to `now`."""
+    rnd = random.Random(11)
+    expected = 0.0
+    rows = []
+    for i in range(n):
+        created = now - timedelta(seconds=rnd.uniform(0, days * 86400))
+        status = rnd.choice(STATUSES)
+        monthly = round(rnd.uniform(50, 5000), 2)
+        if status not in ledger.NOT_BILLED:
+            expected += monthly * ledger.PER_SECOND * (now - created).total_seconds()
+        rows.append((
+            f"res-{i}", rnd.choice(PROVIDERS), rnd.choice(TYPES), rnd.choice(REGIONS), status, monthly,
+            json.dumps(rnd.sample(TAGS, rnd.randint(0, 2))), created.isoformat(sep=" "),
+        ))
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().executemany(
+            "INSERT INTO resources (name, provider, type, region, status, cost_per_month_inr, tags, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        raw.commit()
+    finally:
+        raw.close()
+    return expected
+
+
+async def run(path: str, args, now: datetime, expected: float) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with AsyncSession(engine) as db:
+        t0 = time.perf_counter()
+        n = await ledger.accrue(db, now)
+        await db.commit()
+        print(f"backfill accrue ({args.days} days): {time.perf_counter() - t0:8.2f} s  ({n} partitions)")
+
+        until = (now + timedelta(days=1)).date()
+        full = await ledger.spend(db, until - timedelta(days=args.days + 1), until, granularity="total")
+        drift = abs(full["total"] - expected) / expected if expected else 0.0
+        print(f"ledger total {full['total']:.2f} vs per-resource recount {expected:.2f}: drift {drift:.4%}")
+
+        t0 = time.perf_counter()
+        await ledger.accrue(db, now + timedelta(minutes=15))
+        await db.commit()
+        print(f"incremental accrue (15 min):   {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+        for days in (30, 90, 365):
+            for group_by in (None,) + ledger.GROUP_BY:
+                timings = []
+                for _ in range(args.queries):
+                    t0 = time.perf_counter()
+                    out = await ledger.spend(db, until - timedelta(days=days), until, group_by, "day")
+                    timings.append(time.perf_counter() - t0)
+                label = f"{days:>3}d group_by={group_by or '-'}"
+                print(f"{label:<24} p50 {statistics.median(timings) * 1000:7.2f} ms  "
+                      f"max {max(timings) * 1000:7.2f} ms  ({len(out['groups'])} groups x {len(out['periods'])} days)")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resources", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-ledger-"), "ledger.db")
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine)
+    now = datetime.utcnow().replace(microsecond=0)
+    t0 = time.perf_counter()
+    expected = seed(engine, args.resources, args.days, now)
+    engine.dispose()
+    print(f"seeded {args.resources} resources over {args.days} days in {time.perf_counter() - t0:.1f}s")
+
+    asyncio.run(run(path, args, now, expected))
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/bench_db_concurrency.py
+"""
+Mixed read/write API traffic against each database configuration.
+
+For every configuration a fresh worker process gets its own scratch
+database and settings (env vars read by app/database.py), seeds
+--resources rows, then runs --clients concurrent clients for --duration
+seconds through the ASGI app:
+
+    50%  GET /resources?limit=100
+    20%  GET /logs?limit=100
+    20%  PUT /resources/{id}        (rename + audit log)
+    10%  POST /resources            (GCP mock: row + job, then the job's write)
+
+and reports throughput, latency and errors (e.g. "database is locked").
+
+    python -m benchmarks.bench_db_concurrency [--clients 32] [--duration 10] [--resources 2000]
+    python -m benchmarks.bench_db_concurrency --url postgresql://...   # add another backend
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# name -> env overrides; "legacy" is the previous setup (rollback journal,
+# synchronous=FULL, no mmap, default pool)
+CONFIGS = {
+    "legacy": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_MMAP_SIZE": "0"},
+    "wal": {},
+    "wal-pool1": {"DB_POOL_SIZE": "1", "DB_MAX_OVERFLOW": "0"},
+    "wal-pool20": {"DB_POOL_SIZE": "20", "DB_MAX_OVERFLOW": "20"},
+}
+
+MIX = (("list", 50), ("logs", 20), ("update", 20), ("create", 10))
+
+
+async def client_loop(client, ids, stop_at: float, rnd: random.Random, stats) -> None:
+    ops, weights = zip(*MIX)
+    while time.perf_counter() < stop_at:
+        op = rnd.choices(ops, weights)[0]
+        t0 = time.perf_counter()
+        try:
+            if op == "list":
+                r = await client.get("/resources", params={"limit": 100})
+            elif op == "logs":
+                r = await client.get("/logs", params={"limit": 100})
+            elif op == "update":
+                r = await client.put(f"/resources/{rnd.choice(ids)}", json={"name": f"bench-{rnd.random():.6f}"})
+            else:
+                r = await client.post(
+                    "/resources", json={"name": "bench", "provider": "GCP", "type": "VM", "region": "us-central1"}
+                )
+            ok = r.status_code < 400
+            error = None if ok else f"HTTP {r.status_code}"
+        except Exception as e:   # a locked database surfaces as an exception out of the app
+            ok, error = False, type(e).__name__ + ": " + str(e).splitlines()[0][:80]
+        stats["latency"][op].append(time.perf_counter() - t0)
+        stats["ok" if ok else "errors"] += 1
+        if error:
+            stats["error_kinds"][error] = stats["error_kinds"].get(error, 0) + 1
+
+
+async def worker(args) -> dict:
+    import httpx
+
+    from app import migrations
+    from app.database import engine
+    from app.main import app
+
+    migrations.upgrade(engine)
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().executemany(
+            "INSERT INTO resources (name, provider, type, region, status, external_id, cost_per_month_inr,"
+            " uptime, tags, created_at, updated_at) VALUES (?, 'GCP', 'VM', 'us-central1', 'Running', '', 900,"
+            " 100, '[]', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)",
+            [(f"seed-{i}",) for i in range(args.resources)],
+        )
+        raw.commit()
+    finally:
+        raw.close()
+    ids = list(range(1, args.resources + 1))
+
+    stats = {"ok": 0, "errors": 0, "error_kinds": {}, "latency": {op: [] for op, _ in MIX}}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=True)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        t0 = time.perf_counter()
+        stop_at = t0 + args.duration
+        await asyncio.gather(*(
+            client_loop(client, ids, stop_at, random.Random(i), stats) for i in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - t0
+
+    def ms(samples, q):
+        if len(samples) < 2:
+            return None
+        return round(statistics.quantiles(samples, n=100, method="inclusive")[q - 1] * 1000, 2)
+
+    return {
+        "throughput": round((stats["ok"] + stats["errors"]) / elapsed, 1),
+        "ok": stats["ok"],
+        "errors": stats["errors"],
+        "error_kinds": stats["error_kinds"],
+        "latency": {op: {"n": len(s), "p50": ms(s, 50), "p99": ms(s, 99)} for op, s in stats["latency"].items()},
+    }
+
+
+def run_config(name: str, env: dict, args) -> dict:
+    scratch = tempfile.mkdtemp(prefix=f"bench-db-{name}-")
+    child_env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'bench.db')}",
+        "RECONCILER_ENABLED": "0",
+        "METRICS_COLLECTOR_ENABLED": "0",
+        "COST_LEDGER_ENABLED": "0",
+        **env,
+    }
+    cmd = [sys.executable, "-m", "benchmarks.bench_db_concurrency", "--worker",
+           "--clients", str(args.clients), "--duration", str(args.duration), "--resources", str(args.resources)]
+    # the app prints as it works; the result is the last line
+    out = subprocess.run(cmd, env=child_env, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"failed": out.stderr.strip().splitlines()[-1] if out.stderr.strip() else f"exit {out.returncode}"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--resources", type=int, default=2000)
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGS), help="run only these (repeatable)")
+    parser.add_argument("--url", action="append", default=[], help="also run against this DATABASE_URL")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(worker(args))))
+        return 0
+
+    configs = {name: CONFIGS[name] for name in (args.config or CONFIGS)}
+    for url in args.url:
+        configs[url.split("://", 1)[0]] = {"DATABASE_URL": url}
+
+    print(f"{args.clients} clients x {args.duration:.0f}s, mix "
+          + ", ".join(f"{op} {w}%" for op, w in MIX))
+    print(f"{'config':<12}{'req/s':>8}{'errors':>8}  " + "".join(f"{op + ' p50/p99 ms':>24}" for op, _ in MIX))
+    for name, env in configs.items():
+        r = run_config(name, env, args)
+        if "failed" in r:
+            print(f"{name:<12} failed: {r['failed']}")
+            continue
+        cols = "".join(
+            f"{(str(l['p50']) + ' / ' + str(l['p99'])):>24}" for l in r["latency"].values()
+        )
+        print(f"{name:<12}{r['throughput']:>8.1f}{r['errors']:>8}  {cols}")
+        for kind, n in r["error_kinds"].items():
+            print(f"{'':<12}  {n} x {kind}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
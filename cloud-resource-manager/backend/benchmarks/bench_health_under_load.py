@@ -0,0 +1,130 @@
+# benchmarks/bench_health_under_load.py
+"""
+/health and GET /resources latency while many slow provisioning calls
+are in flight.
+
+Fires N concurrent POST /resources (AWS VM) against a stub EC2 whose
+run_instances takes --provision-latency seconds, waits for every job to
+finish via /jobs/{id}, and samples both routes the whole time. POSTs
+return 202 straight away and the slow calls run on the provisioning
+workers, so p99 should stay close to its idle value. /health never
+touches the database; GET /resources needs a pooled connection, so it
+shows whether the workers leave any (errors are requests that failed,
+e.g. on DB_POOL_TIMEOUT).
+
+Runs in-process over ASGI (needs httpx) against a scratch SQLite file.
+
+    python -m benchmarks.bench_health_under_load [--inflight 200] [--provision-latency 2] [--timeout 600]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+
+def pct(samples: List[float], q: int) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+# sampled routes: one without the database, one that needs a connection
+ROUTES = ("/health", "/resources?limit=50")
+
+
+async def sample(client, path: str, stop: asyncio.Event | None, count: int) -> Tuple[List[float], int]:
+    samples: List[float] = []
+    errors = 0
+    while (stop is None and len(samples) < count) or (stop is not None and not stop.is_set()):
+        t0 = time.perf_counter()
+        r = await client.get(path)
+        if r.status_code == 200:
+            samples.append(time.perf_counter() - t0)
+        else:
+            errors += 1
+        await asyncio.sleep(0.005)
+    return samples, errors
+
+
+async def wait_for_jobs(client, job_ids: List[str], timeout: float) -> List[dict]:
+    """Finished jobs; gives up on the rest after `timeout` seconds (e.g. stuck in "running")."""
+    pending, done = set(job_ids), []
+    deadline = time.perf_counter() + timeout
+    while pending and time.perf_counter() < deadline:
+        for job_id in list(pending):
+            r = await client.get(f"/jobs/{job_id}")
+            if r.status_code != 200:
+                continue   # a starved pool fails the poll too; ask again next round
+            job = r.json()
+            if job["status"] in ("succeeded", "failed", "cancelled"):
+                pending.discard(job_id)
+                done.append(job)
+        await asyncio.sleep(0.1)
+    return done
+
+
+async def run(args) -> None:
+    import httpx
+
+    from app.aws import clients
+    from app.main import app
+
+    from .stubs import StubEC2
+
+    clients.set_client("ec2", StubEC2(latency=0.01, provision_latency=args.provision_latency), "ap-south-1")
+    # app errors (pool timeouts) come back as 500s and are counted, not raised
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    # ASGITransport doesn't send lifespan events; run startup/shutdown ourselves
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        idle = [await sample(client, path, None, 200) for path in ROUTES]
+
+        stop = asyncio.Event()
+        body = {"name": "bench", "provider": "AWS", "type": "VM", "region": "ap-south-1"}
+        t0 = time.perf_counter()
+        samplers = [asyncio.create_task(sample(client, path, stop, 0)) for path in ROUTES]
+        results = await asyncio.gather(*(client.post("/resources", json=body) for _ in range(args.inflight)))
+        accepted = time.perf_counter() - t0
+        job_ids = [r.json()["jobId"] for r in results if r.status_code == 202]
+        jobs = await wait_for_jobs(client, job_ids, args.timeout)
+        drain = time.perf_counter() - t0
+        stop.set()
+        loaded = await asyncio.gather(*samplers)
+
+    ok = sum(j["status"] == "succeeded" for j in jobs)
+    print(f"{args.inflight} provisioning jobs x {args.provision_latency:.1f}s stub latency: "
+          f"{len(job_ids)} accepted in {accepted:.2f}s, {ok} succeeded, "
+          f"{len(job_ids) - len(jobs)} unfinished, drained in {drain:.1f}s")
+    print(f"{'route':<30}{'samples':>8}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, runs in (("idle", idle), ("loaded", loaded)):
+        for path, (samples, errors) in zip(ROUTES, runs):
+            timings = (f"{pct(samples, 50) * 1000:>10.2f}{pct(samples, 99) * 1000:>10.2f}{max(samples) * 1000:>10.2f}"
+                       if len(samples) > 1 else f"{'-':>10}{'-':>10}{'-':>10}")
+            print(f"{label + ' ' + path:<30}{len(samples):>8}{errors:>8}{timings}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--inflight", type=int, default=200)
+    parser.add_argument("--provision-latency", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds to wait for the jobs to finish")
+    args = parser.parse_args()
+
+    # The app opens ./cloudmgr.db and starts background work on import/startup;
+    # keep both away from the real database.
+    os.environ.setdefault("RECONCILER_ENABLED", "0")
+    os.environ.setdefault("METRICS_COLLECTOR_ENABLED", "0")
+    os.environ.setdefault("COST_LEDGER_ENABLED", "0")
+    os.environ.setdefault("MIGRATE_ON_STARTUP", "1")
+    backend_dir = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="bench-health-"))
+    sys.path.insert(0, backend_dir)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_metrics_history.py
+"""
+30-day chart queries against the local metrics store.
+
+Seeds a scratch SQLite file with --days of 5-minute points for
+--resources resources, builds the hourly/daily rollups the collector
+maintains, then times metrics_store.query_range() for a 30-day window
+(which picks the hourly rollup) on random resources.
+
+    python -m benchmarks.bench_metrics_history [--resources 200] [--days 30] [--queries 500]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import migrations
+from app.services import metrics_store
+
+
+def seed(engine, n_resources: int, days: int, end: int) -> int:
+    rnd = random.Random(7)
+    start = end - days * 86400
+    rows = 0
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for rid in range(1, n_resources + 1):
+            base = rnd.uniform(10, 60)
+            cur.executemany(
+                "INSERT INTO metric_samples (resource_id, resolution, ts, cpu, cpu_max, memory,"
+                " network_in, network_out, samples) VALUES (?, 300, ?, ?, ?, ?, ?, ?, 1)",
+                (
+                    (rid, ts, c, c, min(100.0, c * 0.6 + 20.0), rnd.uniform(0, 1e6), rnd.uniform(0, 1e6))
+                    for ts in range(start, end, 300)
+                    for c in (base + rnd.uniform(-10, 10),)
+                ),
+            )
+            rows += (end - start) // 300
+        raw.commit()
+    finally:
+        raw.close()
+    return rows
+
+
+async def run(path: str, args, end: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    rnd = random.Random(1)
+    window = 30 * 86400
+    timings = []
+    points = 0
+    async with AsyncSession(engine) as db:
+        t0 = time.perf_counter()
+        await metrics_store.rollup(db, end - args.days * 86400)
+        await db.commit()
+        print(f"rollup 5m -> 1h -> 1d: {time.perf_counter() - t0:.2f}s")
+
+        for _ in range(args.queries):
+            rid = rnd.randint(1, args.resources)
+            t0 = time.perf_counter()
+            data = await metrics_store.query_range(db, rid, end - window, end)
+            timings.append(time.perf_counter() - t0)
+            points = len(data["ts"])
+    await engine.dispose()
+
+    q = statistics.quantiles(timings, n=100, method="inclusive")
+    print(f"30-day query ({points} points at {data['resolution']}s): "
+          f"p50 {q[49] * 1000:.2f} ms  p99 {q[98] * 1000:.2f} ms  max {max(timings) * 1000:.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resources", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-history-"), "history.db")
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine)
+    end = int(time.time()) // 300 * 300
+    t0 = time.perf_counter()
+    rows = seed(engine, args.resources, args.days, end)
+    engine.dispose()
+    print(f"seeded {rows} 5-minute points in {time.perf_counter() - t0:.1f}s")
+
+    asyncio.run(run(path, args, end))
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    main()
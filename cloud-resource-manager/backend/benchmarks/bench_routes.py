@@ -0,0 +1,532 @@
+# benchmarks/bench_routes.py
+"""
+Throughput and latency of every API route against a seeded database and
+local cloud stubs, with saved baselines so a regression fails a run.
+
+Seeds a scratch SQLite file with --resources resources, --logs audit
+entries, --days of 5-minute metric history for the first
+--history-resources resources and a cost ledger over the same days. AWS
+resources get the stub EC2 / DynamoDB / CloudWatch clients from
+benchmarks/stubs.py, which sleep --latency seconds per call; GCP and
+Azure use the in-process mocks. Every scenario then runs --requests
+requests from each --concurrency level of concurrent clients, in-process
+over ASGI and/or (--transport http) against uvicorn in a child process.
+All reads run before any writes, so the reads see the seeded data.
+
+Reports requests/s, p50/p95/p99 latency, non-2xx responses and the app
+process's RSS after each scenario. --save writes the results as JSON;
+--compare reads such a file, prints the change per scenario and exits 1
+if any scenario's p50 or p95 grew by more than --tolerance (and by more
+than --min-delta-ms), or it started failing.
+
+    python -m benchmarks.bench_routes [--resources 5000] [--logs 100000] [--concurrency 1,16] [--requests 300]
+    python -m benchmarks.bench_routes --transport asgi,http --save routes-baseline.json
+    python -m benchmarks.bench_routes --transport asgi,http --compare routes-baseline.json
+    python -m benchmarks.bench_routes --only logs,search        # scenarios whose name contains these
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+# The app reads its settings at import. Point it at a scratch database (never
+# the real one) before anything from app/ is imported; the --transport http
+# server process inherits the same scratch directory. Only a directory made
+# here is removed afterwards; one given as BENCH_ROUTES_SCRATCH is left alone.
+OWN_SCRATCH = not os.environ.get("BENCH_ROUTES_SCRATCH")
+SCRATCH = os.environ.get("BENCH_ROUTES_SCRATCH") or tempfile.mkdtemp(prefix="bench-routes-")
+os.environ["BENCH_ROUTES_SCRATCH"] = SCRATCH
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'routes.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["AUDIT_ARCHIVE_DIR"] = os.path.join(SCRATCH, "audit-archive")
+for _key, _value in {
+    "RECONCILER_ENABLED": "0",          # no background status refreshes while timing
+    "METRICS_COLLECTOR_ENABLED": "0",
+    "COST_LEDGER_ENABLED": "0",
+    "AUDIT_ARCHIVE_ENABLED": "0",
+    "CLOUD_RATE_LIMIT": "0",            # the stubs don't throttle; don't pace calls to them
+    "ACCESS_LOG": "0",
+    "LOG_LEVEL": "ERROR",              # slow-request warnings would break up the table
+    "TRACE_MODE": "off",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import resource  # noqa: E402
+import shutil  # noqa: E402
+import socket  # noqa: E402
+import statistics  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple  # noqa: E402
+
+from app import migrations  # noqa: E402
+from app.database import AsyncSessionLocal, engine  # noqa: E402
+
+from . import bench_metrics_history, bench_search  # noqa: E402
+from .stubs import StubCloudWatch, StubDynamoDB, StubEC2  # noqa: E402
+
+REGION = "ap-south-1"                 # every AWS adapter provisions here
+OTHER_REGIONS = ["us-central1", "europe-west1", "eastus", "westeurope"]
+ALL_TYPES = ["VM", "Database", "Storage", "Serverless", "Load Balancer"]
+TAGS = bench_search.TAGS
+WORDS = ["web", "prod", "worker", "tag:pci", "team-pay", "api-node", "zzzz"]
+BATCH = 10                            # items per /resources:batch request
+SKIPPED = {
+    "GET /events": "server-sent event stream; never completes",
+    "GET /debug/profile": "samples for seconds; off unless PROFILER_ENABLED=1",
+}
+
+
+# -----------------------------------------------------
+# Seeding
+# -----------------------------------------------------
+def resource_rows(n: int, days: int, rnd: random.Random, now: datetime):
+    for i in range(n):
+        created = (now - timedelta(seconds=rnd.uniform(0, days * 86400))).isoformat(sep=" ")
+        if rnd.random() < 0.4:
+            rtype = rnd.choice(["VM", "VM", "Database"])
+            provider, region = "AWS", REGION
+            external_id = f"i-{rnd.getrandbits(64):017x}" if rtype == "VM" else f"table_{i}"
+        else:
+            rtype = rnd.choice(ALL_TYPES)
+            provider, region = rnd.choice(["GCP", "Azure"]), rnd.choice(OTHER_REGIONS)
+            external_id = f"{provider.lower()}-{i}"
+        yield (
+            f"{rnd.choice(bench_search.ROLES)}-{rnd.choice(['server', 'node', 'svc'])}-{i:06d}", provider, rtype,
+            region, rnd.choice(["Running"] * 8 + ["Stopped", "Creating"]), external_id,
+            round(rnd.uniform(100, 8000), 2), round(rnd.uniform(95, 100), 2), json.dumps(rnd.sample(TAGS, rnd.randint(0, 3))),
+            created, created,
+        )
+
+
+RESOURCE_INSERT = (
+    "INSERT INTO resources (name, provider, type, region, status, external_id, cost_per_month_inr, uptime, tags,"
+    " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def insert_resources(rows) -> List[int]:
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        first = cur.execute("SELECT coalesce(max(id), 0) FROM resources").fetchone()[0] + 1
+        cur.executemany(RESOURCE_INSERT, rows)
+        last = cur.execute("SELECT max(id) FROM resources").fetchone()[0]
+        raw.commit()
+    finally:
+        raw.close()
+    return list(range(first, last + 1))
+
+
+def seed(args, now: datetime) -> None:
+    migrations.upgrade(engine)
+    rnd = random.Random(1)
+    insert_resources(resource_rows(args.resources, args.days, rnd, now))
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        chunk = 200_000
+        start = now - timedelta(seconds=args.logs)
+        for lo in range(0, args.logs, chunk):
+            cur.executemany(bench_search.LOG_INSERT, bench_search.log_rows(
+                min(chunk, args.logs - lo), args.resources, rnd, start + timedelta(seconds=lo)))
+            raw.commit()
+        cur.executemany(
+            "INSERT INTO users (email, name, role, status, last_login) VALUES (?, ?, ?, ?, ?)",
+            ((f"user{i}@example.com", f"User {i}", rnd.choice(["Admin", "DevOps", "Viewer"]), "Active",
+              now.isoformat(sep=" ")) for i in range(50)),
+        )
+        raw.commit()
+    finally:
+        raw.close()
+    end = int(now.timestamp()) // 300 * 300
+    bench_metrics_history.seed(engine, min(args.history_resources, args.resources), args.days, end)
+
+    async def derived():
+        from app import search
+        from app.services import ledger, metrics_store
+
+        async with AsyncSessionLocal() as db:
+            await metrics_store.rollup(db, end - args.days * 86400)
+            await ledger.accrue(db, now)
+            await db.commit()
+            while await search.index_pending(db, "action_logs_fts") >= search.INDEX_BATCH:
+                await db.commit()
+            await db.commit()
+
+    asyncio.run(derived())
+
+
+def victims(n: int) -> List[int]:
+    """`n` fresh resources for the delete scenarios (AWS VMs: deleting calls the EC2 stub)."""
+    rnd = random.Random(n)
+    now = datetime.utcnow().isoformat(sep=" ")
+    return insert_resources(
+        (f"victim-{rnd.getrandbits(32):08x}", "AWS", "VM", REGION, "Running", f"i-{rnd.getrandbits(64):017x}",
+         100.0, 100.0, "[]", now, now)
+        for _ in range(n)
+    )
+
+
+def install_stubs(latency: float) -> None:
+    from app.aws import clients
+
+    clients.set_client("ec2", StubEC2(latency=latency), REGION)
+    clients.set_client("dynamodb", StubDynamoDB(latency=latency), REGION)
+    clients.set_client("cloudwatch", StubCloudWatch(latency=latency), REGION)
+
+
+# -----------------------------------------------------
+# Scenarios
+# -----------------------------------------------------
+class Context:
+    """Ids and versions the scenarios draw from, read once per transport."""
+
+    def __init__(self):
+        self.aws_vms: List[int] = []
+        self.ids: List[int] = []
+        self.history_ids: List[int] = []
+        self.job_id = ""
+        self.etag = ""
+        self.resources_version = 0
+        self.logs_version = 0
+        self.victims: List[int] = []
+
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+class Scenario(NamedTuple):
+    name: str
+    route: str                                         # "METHOD /path" it covers
+    build: Callable[[Context, random.Random], Request]
+    write: bool = False
+    victims: int = 0                                   # resources each request deletes
+
+
+def _get(path: str, **params: Any) -> Callable[[Context, random.Random], Request]:
+    return lambda ctx, rnd: ("GET", path, {"params": params} if params else {})
+
+
+def _create(rnd: random.Random) -> Dict[str, Any]:
+    return {"name": f"bench-{rnd.getrandbits(32):08x}", "provider": "GCP", "type": "VM", "region": "us-central1"}
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("health", "GET /health", _get("/health")),
+    Scenario("prometheus", "GET /metrics", _get("/metrics")),
+    Scenario("resources", "GET /resources", _get("/resources")),
+    Scenario("resources filtered", "GET /resources", _get("/resources", provider="AWS", type="VM", limit=100)),
+    Scenario("resources fields", "GET /resources", _get("/resources", fields="id,name,status", limit=1000)),
+    Scenario("resources 304", "GET /resources",
+             lambda ctx, rnd: ("GET", "/resources", {"headers": {"If-None-Match": ctx.etag}})),
+    Scenario("resource changes", "GET /resources:changes",
+             lambda ctx, rnd: ("GET", "/resources:changes", {"params": {"since": max(0, ctx.resources_version - 200)}})),
+    Scenario("job", "GET /jobs/{job_id}", lambda ctx, rnd: ("GET", f"/jobs/{ctx.job_id}", {})),
+    Scenario("resource metrics", "GET /resources/{resource_id}/metrics",
+             lambda ctx, rnd: ("GET", f"/resources/{rnd.choice(ctx.aws_vms or ctx.ids)}/metrics", {})),
+    Scenario("metrics history", "GET /resources/{resource_id}/metrics/history",
+             lambda ctx, rnd: ("GET", f"/resources/{rnd.choice(ctx.history_ids)}/metrics/history", {})),
+    Scenario("fleet metrics", "GET /metrics/fleet",
+             lambda ctx, rnd: ("GET", "/metrics/fleet",
+                               {"params": {"ids": ",".join(map(str, rnd.sample(ctx.ids, min(50, len(ctx.ids)))))}})),
+    Scenario("metrics aggregate", "GET /metrics/aggregate", _get("/metrics/aggregate", metric="cpu", group_by="provider")),
+    Scenario("metrics cache", "GET /metrics/cache", _get("/metrics/cache")),
+    Scenario("alerts", "GET /alerts", _get("/alerts")),
+    Scenario("cost summary", "GET /costs/summary", _get("/costs/summary")),
+    Scenario("cost ledger", "GET /costs/ledger", _get("/costs/ledger", group_by="provider")),
+    Scenario("search", "GET /search", lambda ctx, rnd: ("GET", "/search", {"params": {"q": rnd.choice(WORDS)}})),
+    Scenario("logs", "GET /logs", _get("/logs")),
+    Scenario("logs last hour", "GET /logs",
+             lambda ctx, rnd: ("GET", "/logs", {"params": {
+                 "since": (datetime.utcnow() - timedelta(hours=1)).isoformat(timespec="seconds")}})),
+    Scenario("log changes", "GET /logs:changes",
+             lambda ctx, rnd: ("GET", "/logs:changes", {"params": {"since": max(0, ctx.logs_version - 200)}})),
+    Scenario("users", "GET /users", _get("/users")),
+    # writes
+    Scenario("create", "POST /resources", lambda ctx, rnd: ("POST", "/resources", {"json": _create(rnd)}), write=True),
+    Scenario("create batch", "POST /resources:batch",
+             lambda ctx, rnd: ("POST", "/resources:batch", {"json": [_create(rnd) for _ in range(BATCH)]}), write=True),
+    Scenario("update", "PUT /resources/{resource_id}",
+             lambda ctx, rnd: ("PUT", f"/resources/{rnd.choice(ctx.ids)}", {"json": {"tags": rnd.sample(TAGS, 2)}}),
+             write=True),
+    Scenario("update batch", "PUT /resources:batch",
+             lambda ctx, rnd: ("PUT", "/resources:batch",
+                               {"json": [{"id": i, "tags": rnd.sample(TAGS, 2)} for i in rnd.sample(ctx.ids, BATCH)]}),
+             write=True),
+    Scenario("delete", "DELETE /resources/{resource_id}",
+             lambda ctx, rnd: ("DELETE", f"/resources/{ctx.victims.pop()}", {}), write=True, victims=1),
+    Scenario("delete batch", "DELETE /resources:batch",
+             lambda ctx, rnd: ("DELETE", "/resources:batch", {"json": [ctx.victims.pop() for _ in range(BATCH)]}),
+             write=True, victims=BATCH),
+]
+
+
+def uncovered(app) -> List[str]:
+    """Routes in app.main with neither a scenario nor a reason to skip them."""
+    from fastapi.routing import APIRoute
+
+    covered = {s.route for s in SCENARIOS} | set(SKIPPED)
+    routes = {f"{m} {r.path}" for r in app.routes if isinstance(r, APIRoute) for m in r.methods if m != "HEAD"}
+    return sorted(routes - covered)
+
+
+async def load_context(client, args) -> Context:
+    ctx = Context()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        ctx.ids = [r[0] for r in cur.execute("SELECT id FROM resources WHERE name NOT LIKE 'victim-%' ORDER BY id")]
+        ctx.aws_vms = [r[0] for r in cur.execute(
+            "SELECT id FROM resources WHERE provider = 'AWS' AND type = 'VM' AND name NOT LIKE 'victim-%'")]
+    finally:
+        raw.close()
+    ctx.history_ids = ctx.ids[:max(1, min(args.history_resources, len(ctx.ids)))]
+    r = await client.get("/resources")
+    ctx.etag, ctx.resources_version = r.headers["ETag"], int(r.headers["X-Sync-Version"])
+    r = await client.get("/logs")
+    ctx.logs_version = int(r.headers.get("X-Sync-Version", 0))
+    r = await client.post("/resources", json=_create(random.Random(0)))
+    ctx.job_id = r.json()["jobId"]
+    return ctx
+
+
+# -----------------------------------------------------
+# Driving
+# -----------------------------------------------------
+def rss_mb(pid: Optional[int] = None) -> float:
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # not Linux: peak rather than current, and only for this process
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def pct(samples: List[float], q: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+async def drive(client, scenario: Scenario, ctx: Context, concurrency: int, args, pid: Optional[int]) -> Dict[str, Any]:
+    rnd = random.Random(f"{scenario.name}/{concurrency}")
+    if scenario.victims:
+        # off the loop: a blocking write here would stall the app's own writers (job workers, audit batches)
+        # while they hold the lock it is waiting for
+        ctx.victims = await asyncio.to_thread(victims, (args.requests + args.warmup) * scenario.victims)
+
+    async def one() -> Tuple[float, int]:
+        method, url, kwargs = scenario.build(ctx, rnd)
+        t0 = time.perf_counter()
+        r = await client.request(method, url, **kwargs)
+        return time.perf_counter() - t0, r.status_code
+
+    for _ in range(args.warmup):
+        await one()
+
+    latencies: List[float] = []
+    failed = 0
+    remaining = args.requests
+
+    async def worker() -> None:
+        nonlocal remaining, failed
+        while remaining > 0:
+            remaining -= 1
+            elapsed, status = await one()
+            latencies.append(elapsed)
+            if status >= 400:
+                failed += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    return {
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(pct(latencies, 50) * 1000, 3),
+        "p95_ms": round(pct(latencies, 95) * 1000, 3),
+        "p99_ms": round(pct(latencies, 99) * 1000, 3),
+        "errors": failed,
+        "rss_mb": round(rss_mb(pid), 1),
+    }
+
+
+async def run_scenarios(client, transport: str, args, pid: Optional[int], results: Dict[str, Dict]) -> None:
+    ctx = await load_context(client, args)
+    chosen = [s for s in SCENARIOS if not args.only or any(w in s.name for w in args.only)]
+    for write in (False, True):
+        for concurrency in args.concurrency:
+            for scenario in (s for s in chosen if s.write == write):
+                key = f"{transport}/c{concurrency}/{scenario.name}"
+                results[key] = await drive(client, scenario, ctx, concurrency, args, pid)
+                print(row(key, results[key]), flush=True)
+
+
+async def run_asgi(args, results: Dict[str, Dict]) -> None:
+    import httpx
+
+    from app.main import app
+
+    missing = uncovered(app)
+    if missing:
+        print("no scenario for:", ", ".join(missing))
+    install_stubs(args.latency)
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport doesn't send lifespan events; run startup/shutdown ourselves
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await run_scenarios(client, "asgi", args, None, results)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_http(args, results: Dict[str, Dict]) -> None:
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_routes", "--serve", str(port), "--latency", str(args.latency)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    try:
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/health")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError("benchmark server exited during startup")
+                    await asyncio.sleep(0.1)
+            await run_scenarios(client, "http", args, server.pid, results)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def serve(port: int, latency: float) -> None:
+    """--serve: the app under uvicorn with the cloud stubs installed (child of --transport http)."""
+    import uvicorn
+
+    from app.main import app
+
+    install_stubs(latency)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+# -----------------------------------------------------
+# Reporting and baselines
+# -----------------------------------------------------
+HEADER = f"{'scenario':<40}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'rss MB':>8}"
+DATASET = ("resources", "logs", "history_resources", "days", "latency", "requests", "warmup")
+
+
+def row(key: str, r: Dict[str, Any]) -> str:
+    return (f"{key:<40}{r['rps']:>9.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+            f"{r['errors']:>8}{r['rss_mb']:>8.1f}")
+
+
+def compare(results: Dict[str, Dict], config: Dict[str, Any], path: str, tolerance: float, min_delta: float) -> int:
+    with open(path) as f:
+        baseline = json.load(f)
+    differs = {k: (baseline["config"].get(k), config[k]) for k in DATASET if baseline["config"].get(k) != config[k]}
+    if differs:
+        print(f"\n{path} was recorded with different settings, not comparing: {differs}")
+        return 2
+
+    print(f"\nagainst {path} (tolerance {tolerance:.0%}, min delta {min_delta} ms)")
+    print(f"{'scenario':<40}{'req/s':>9}{'p50 ms':>16}{'p95 ms':>16}")
+    regressed = []
+    for key, now in results.items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        flags = []
+        for stat in ("p50_ms", "p95_ms"):
+            if now[stat] > base[stat] * (1 + tolerance) and now[stat] - base[stat] > min_delta:
+                flags.append(stat[:3])
+        if now["errors"] > base["errors"]:
+            flags.append("errors")
+        if flags:
+            regressed.append(key)
+
+        def change(stat: str) -> str:
+            return f"{(now[stat] / base[stat] - 1) * 100:+.0f}%" if base[stat] else "-"
+        print(f"{key:<40}{change('rps'):>9}{now['p50_ms']:>9.2f}{change('p50_ms'):>7}"
+              f"{now['p95_ms']:>9.2f}{change('p95_ms'):>7}  {'REGRESSED ' + ','.join(flags) if flags else ''}")
+    print(f"\n{len(regressed)} regressed" + (": " + ", ".join(regressed) if regressed else ""))
+    return 1 if regressed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=5000)
+    parser.add_argument("--logs", type=int, default=100_000)
+    parser.add_argument("--history-resources", type=int, default=50)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per stub cloud call")
+    parser.add_argument("--concurrency", default="1,16", help="comma-separated concurrent clients")
+    parser.add_argument("--requests", type=int, default=300, help="timed requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests first")
+    parser.add_argument("--transport", default="asgi", help="comma-separated: asgi (in-process), http (uvicorn)")
+    parser.add_argument("--only", default="", help="comma-separated substrings of scenario names")
+    parser.add_argument("--save", metavar="FILE", help="write the results here")
+    parser.add_argument("--compare", metavar="FILE", help="baseline to compare against; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50/p95 growth (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore growth smaller than this")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.latency)
+        return
+
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.only = [w for w in args.only.split(",") if w]
+    transports = [t for t in args.transport.split(",") if t]
+    config = {k: getattr(args, k) for k in DATASET}
+    config.update(concurrency=args.concurrency, python=platform.python_version(), platform=platform.platform())
+
+    # a given scratch directory may still hold the last run's database
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(os.path.join(SCRATCH, "routes.db" + suffix)):
+            os.remove(os.path.join(SCRATCH, "routes.db" + suffix))
+
+    t0 = time.perf_counter()
+    seed(args, datetime.utcnow())
+    print(f"seeded {args.resources} resources / {args.logs} logs / {args.history_resources} x {args.days}d "
+          f"metric history in {time.perf_counter() - t0:.1f}s; stub latency {args.latency * 1000:.0f} ms\n")
+
+    results: Dict[str, Dict] = {}
+    print(HEADER)
+    try:
+        for transport in transports:
+            asyncio.run({"asgi": run_asgi, "http": run_http}[transport](args, results))
+    finally:
+        engine.dispose()
+        if OWN_SCRATCH:
+            shutil.rmtree(SCRATCH, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=1)
+        print(f"\nsaved {len(results)} results to {args.save}")
+    if args.compare:
+        sys.exit(compare(results, config, args.compare, args.tolerance, args.min_delta_ms))
+
+
+if __name__ == "__main__":
+    main()
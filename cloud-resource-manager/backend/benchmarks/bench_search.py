@@ -0,0 +1,160 @@
+# benchmarks/bench_search.py
+"""
+/search latency on a large synthetic inventory and audit log.
+
+Seeds a scratch SQLite file with --resources resources (indexed by their
+trigger, as in production) and --logs audit entries, then times how fast
+search.index_pending catches the deferred log index up, and
+search.search_resources / search.search_logs for typical queries against
+the LIKE '%...%' scan they replace.
+
+    python -m benchmarks.bench_search [--resources 100000] [--logs 1000000] [--queries 20]
+    python -m benchmarks.bench_search --logs 10000000     # the 10M-row case (takes a while)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import migrations, search
+
+PROVIDERS = ["AWS", "GCP", "Azure"]
+REGIONS = ["ap-south-1", "us-east-1", "eu-west-1", "us-central1", "westeurope"]
+TYPES = ["VM", "Database", "Storage", "Serverless", "Load Balancer"]
+TAGS = ["prod", "staging", "dev", "web", "db", "batch", "team-payments", "team-search", "pci", "legacy"]
+ROLES = ["web", "api", "worker", "db", "cache", "queue", "etl", "ml", "auth", "billing"]
+USERS = [f"user{i}@example.com" for i in range(200)] + ["system"] * 200
+ACTIONS = ["create", "update", "update", "update", "delete"]
+
+
+def resource_rows(n: int, rnd: random.Random):
+    for i in range(n):
+        role = rnd.choice(ROLES)
+        yield (
+            f"{role}-{rnd.choice(['server', 'node', 'svc'])}-{i:06d}", rnd.choice(PROVIDERS), rnd.choice(TYPES),
+            rnd.choice(REGIONS), "Running", f"i-{rnd.getrandbits(64):016x}",
+            json.dumps(rnd.sample(TAGS, rnd.randint(0, 3))),
+        )
+
+
+def log_rows(n: int, n_resources: int, rnd: random.Random, start: datetime):
+    for i in range(n):
+        action = rnd.choice(ACTIONS)
+        if action == "update":
+            details = {"updated_fields": {"name": f"{rnd.choice(ROLES)}-renamed-{rnd.randint(1, 99999)}"}}
+        else:
+            details = {"job_id": f"{rnd.getrandbits(64):016x}"}
+        yield (
+            (start + timedelta(seconds=i)).isoformat(sep=" "), rnd.randint(1, n_resources), rnd.choice(USERS),
+            action, "Success" if rnd.random() < 0.97 else "Failure", rnd.choice(PROVIDERS), json.dumps(details),
+        )
+
+
+LOG_INSERT = (
+    "INSERT INTO action_logs (timestamp, resource_id, user_email, action, status, provider, details)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def seed(engine, n_resources: int, n_logs: int) -> None:
+    rnd = random.Random(5)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO resources (name, provider, type, region, status, external_id, tags) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            resource_rows(n_resources, rnd),
+        )
+        raw.commit()
+        start = datetime.utcnow() - timedelta(seconds=n_logs)
+        chunk = 200_000
+        for lo in range(0, n_logs, chunk):
+            cur.executemany(LOG_INSERT, log_rows(min(chunk, n_logs - lo), n_resources, rnd, start + timedelta(seconds=lo)))
+            raw.commit()
+    finally:
+        raw.close()
+
+
+async def catch_up(db: AsyncSession) -> None:
+    """Entries/s for the indexer bringing action_logs_fts level with the table."""
+    t0 = time.perf_counter()
+    total = 0
+    while True:
+        n = await search.index_pending(db, "action_logs_fts")
+        await db.commit()
+        total += n
+        if n < search.INDEX_BATCH:
+            break
+    elapsed = time.perf_counter() - t0
+    print(f"indexed {total} log entries in {elapsed:.1f}s ({total / elapsed:.0f}/s, "
+          f"{search.INDEX_BATCH} per transaction)\n")
+
+
+async def timed(fn, reps: int):
+    timings, out = [], None
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        out = await fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000, out
+
+
+async def run(path: str, reps: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with AsyncSession(engine) as db:
+        await catch_up(db)
+
+        async def like(sql: str, word: str):
+            return (await db.execute(text(sql), {"p": f"%{word}%"})).all()
+
+        print(f"{'query':<40}{'p50 ms':>10}{'hits':>8}")
+        for q in ("web-se", "prod", "tag:pci region:ap", "i-0a1b", "team-pay worker", "zzzz"):
+            ms, rows = await timed(lambda: search.search_resources(db, q, 20), reps)
+            print(f"{'resources ' + repr(q):<40}{ms:>10.2f}{len(rows):>8}")
+        ms, rows = await timed(lambda: like("SELECT id FROM resources WHERE name LIKE :p OR tags LIKE :p"
+                                            " OR external_id LIKE :p LIMIT 20", "zzzz"), reps)
+        print(f"{'  LIKE scan (no match)':<40}{ms:>10.2f}{len(rows):>8}")
+
+        for q in ("update", "user:user17", "details:billing-ren", "action:delete provider:azure", "zzzz"):
+            ms, rows = await timed(lambda: search.search_logs(db, q, 20), reps)
+            print(f"{'logs ' + repr(q):<40}{ms:>10.2f}{len(rows):>8}")
+        ms, rows = await timed(lambda: like("SELECT id FROM action_logs WHERE details LIKE :p"
+                                            " ORDER BY id DESC LIMIT 20", "zzzz"), max(1, reps // 10))
+        print(f"{'  LIKE scan (no match)':<40}{ms:>10.2f}{len(rows):>8}")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resources", type=int, default=100_000)
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-search-"), "search.db")
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine)
+    t0 = time.perf_counter()
+    seed(engine, args.resources, args.logs)
+    print(f"seeded {args.resources} resources / {args.logs} logs in {time.perf_counter() - t0:.1f}s")
+    engine.dispose()
+
+    asyncio.run(run(path, args.queries))
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_status_refresh.py
+"""
+Compare the old one-call-per-row status refresh with the batched engine
+in app.services.refresh, against local EC2/DynamoDB stubs.
+
+    python -m benchmarks.bench_status_refresh [--latency 0.02] [--runs 5]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Callable, List
+
+# count round trips, not rate-limiter waits (read when app.resilience is imported)
+os.environ.setdefault("CLOUD_RATE_LIMIT", "0")
+
+from app import models  # noqa: E402
+from app.aws import clients, dynamodb, ec2  # noqa: E402
+from app.services import refresh  # noqa: E402
+
+from .stubs import StubDynamoDB, StubEC2  # noqa: E402
+
+
+def make_inventory(n: int) -> List[models.Resource]:
+    # 2/3 VMs, 1/3 DynamoDB tables – roughly what a real inventory looks like
+    out = []
+    for i in range(n):
+        if i % 3 == 2:
+            out.append(models.Resource(id=i, provider="AWS", type="Database", region="ap-south-1",
+                                       status="Creating", external_id=f"table-{i}"))
+        else:
+            out.append(models.Resource(id=i, provider="AWS", type="VM", region="ap-south-1",
+                                       status="Creating", external_id=f"i-{i:017x}"))
+    return out
+
+
+def per_row_refresh(resources: List[models.Resource]) -> None:
+    """The pre-batching behaviour: one AWS call per resource, in series."""
+    for r in resources:
+        if r.type == "VM":
+            ec2.get_instance_state(r.external_id or "")
+        elif r.type == "Database":
+            dynamodb.get_table_status(r.external_id or "")
+
+
+def batched_refresh(resources: List[models.Resource]) -> None:
+    asyncio.run(refresh.refresh_statuses(resources))
+
+
+def measure(fn: Callable[[List[models.Resource]], object], n: int, runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        inventory = make_inventory(n)
+        t0 = time.perf_counter()
+        fn(inventory)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def pct(samples: List[float], q: int) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub round-trip seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--skip-per-row-above", type=int, default=100,
+                        help="per-row mode is linear in N; skip it for large inventories")
+    args = parser.parse_args()
+
+    stub_ec2 = StubEC2(args.latency)
+    stub_ddb = StubDynamoDB(args.latency)
+    clients.set_client("ec2", stub_ec2, "ap-south-1")
+    clients.set_client("dynamodb", stub_ddb, "ap-south-1")
+
+    print(f"stub latency {args.latency * 1000:.0f} ms, {args.runs} runs per row")
+    print(f"{'mode':<10}{'N':>7}{'p50 ms':>10}{'p95 ms':>10}{'calls':>8}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        modes = [("batched", batched_refresh)]
+        if n <= args.skip_per_row_above:
+            modes.insert(0, ("per-row", per_row_refresh))
+        for label, fn in modes:
+            stub_ec2.calls = stub_ddb.calls = 0
+            samples = measure(fn, n, args.runs)
+            calls = (stub_ec2.calls + stub_ddb.calls) // args.runs
+            print(f"{label:<10}{n:>7}{pct(samples, 50) * 1000:>10.1f}{pct(samples, 95) * 1000:>10.1f}{calls:>8}")
+
+
+if __name__ == "__main__":
+    main()
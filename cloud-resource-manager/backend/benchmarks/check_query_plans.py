@@ -0,0 +1,157 @@
+# benchmarks/check_query_plans.py
+"""
+Seed a scratch SQLite database and run EXPLAIN QUERY PLAN on the queries
+behind the list endpoints. Exits non-zero if any of them scans a whole
+table instead of using an index.
+
+    python -m benchmarks.check_query_plans [--logs 1000000] [--resources 10000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Select, create_engine
+from sqlalchemy.orm import Session
+
+from app import migrations, queries
+from app.services import alerts
+
+PROVIDERS = ("AWS", "GCP", "Azure")
+TYPES = ("VM", "Storage", "Database", "Serverless", "Load Balancer")
+STATUSES = ("Running", "Stopped", "Creating", "Failed", "Terminated")
+ACTIONS = ("create", "update", "delete")
+
+# "SCAN t" with nothing after it is a full table scan; "SCAN t USING INDEX ..."
+# walks an index in order and is fine.
+FULL_SCAN = re.compile(r"\bSCAN (\w+)\s*$")
+
+
+def is_bounded_rowid_walk(q: Select, plan: List[str]) -> bool:
+    """
+    An unfiltered first page ordered by id shows up as "SCAN t", but SQLite
+    walks the table in rowid order and stops after LIMIT rows.
+    """
+    return (
+        q.whereclause is None
+        and q._limit_clause is not None
+        and not any("TEMP B-TREE" in line for line in plan)
+    )
+
+
+def seed(engine, n_resources: int, n_logs: int) -> None:
+    rnd = random.Random(42)
+    start = datetime(2024, 1, 1)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO resources (id, name, provider, type, region, status, external_id,"
+            " cost_per_month_inr, uptime, tags, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, 0, 100, '[]', ?, ?)",
+            (
+                (i, f"res-{i}", rnd.choice(PROVIDERS), rnd.choice(TYPES), "ap-south-1",
+                 rnd.choice(STATUSES), f"ext-{i}", start.isoformat(" "), start.isoformat(" "))
+                for i in range(1, n_resources + 1)
+            ),
+        )
+        cur.executemany(
+            "INSERT INTO action_logs (id, timestamp, resource_id, user_email, action, status, provider, details)"
+            " VALUES (?, ?, ?, 'system', ?, 'Success', ?, '{}')",
+            (
+                (i, (start + timedelta(seconds=i * 30)).isoformat(" "), rnd.randint(1, n_resources),
+                 rnd.choice(ACTIONS), rnd.choice(PROVIDERS))
+                for i in range(1, n_logs + 1)
+            ),
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def endpoint_queries() -> List[Tuple[str, Callable[[], Select]]]:
+    """(label, query builder) for every query shape the list endpoints issue."""
+    mid = datetime(2024, 3, 1)
+    res_cursor = queries.encode_cursor({"id": 500})
+    log_cursor = queries.encode_cursor({"ts": mid.isoformat(), "id": 10})
+    RF, LF = queries.ResourceFilters, queries.LogFilters
+    page = queries.DEFAULT_LIMIT
+
+    return [
+        ("GET /resources", lambda: queries.resource_query(RF()).limit(page + 1)),
+        ("GET /resources (cursor)", lambda: queries.resource_query(RF(), res_cursor).limit(page + 1)),
+        ("GET /resources?provider&type&status",
+         lambda: queries.resource_query(RF(provider="AWS", type="VM", status="Running")).limit(page + 1)),
+        ("GET /resources?provider",
+         lambda: queries.resource_query(RF(provider="GCP"), res_cursor).limit(page + 1)),
+        ("GET /resources?status",
+         lambda: queries.resource_query(RF(status="Failed")).limit(page + 1)),
+        ("GET /resources?region",
+         lambda: queries.resource_query(RF(region="ap-south-1"), res_cursor).limit(page + 1)),
+        ("GET /resources?fields",
+         lambda: queries.resource_query(RF(), res_cursor, ["name", "status"]).limit(page + 1)),
+        ("GET /logs", lambda: queries.log_query(LF()).limit(page + 1)),
+        ("GET /logs (cursor)", lambda: queries.log_query(LF(), log_cursor).limit(page + 1)),
+        ("GET /logs?since&until",
+         lambda: queries.log_query(LF(since=mid, until=mid + timedelta(days=1))).limit(page + 1)),
+        ("GET /logs?resource_id", lambda: queries.log_query(LF(resource_id=42)).limit(page + 1)),
+        ("GET /logs?action", lambda: queries.log_query(LF(action="delete"), log_cursor).limit(page + 1)),
+        ("GET /logs?fields",
+         lambda: queries.log_query(LF(), log_cursor, ["timestamp", "action"]).limit(page + 1)),
+        ("GET /alerts", lambda: alerts.open_alerts_query()),
+    ]
+
+
+def explain(db: Session, q: Select) -> List[str]:
+    sql = q.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    raw = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+    return [row[-1] for row in raw]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--resources", type=int, default=10_000)
+    parser.add_argument("--db", help="reuse/keep this database file instead of a temp file")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="plans-"), "plans.db")
+    fresh = not os.path.exists(path)
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine)
+    if fresh:
+        t0 = time.perf_counter()
+        seed(engine, args.resources, args.logs)
+        print(f"seeded {args.resources} resources / {args.logs} logs in {time.perf_counter() - t0:.1f}s")
+
+    failures = 0
+    with Session(engine) as db:
+        for label, build in endpoint_queries():
+            q = build()
+            plan = explain(db, q)
+            scans = [line for line in plan if FULL_SCAN.search(line)]
+            if scans and is_bounded_rowid_walk(q, plan):
+                scans = []
+            t0 = time.perf_counter()
+            db.execute(q).all()
+            ms = (time.perf_counter() - t0) * 1000
+            mark = "FAIL" if scans else "ok"
+            failures += bool(scans)
+            print(f"[{mark:>4}] {label:<40} {ms:8.2f} ms  | " + " / ".join(plan))
+
+    if not args.db:
+        engine.dispose()
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# benchmarks/stubs.py
+"""
+Tiny in-process stand-ins for boto3 clients.
+Each call sleeps for a fixed latency so round-trip counts show up in timings.
+"""
+from __future__ import annotations
+
+import itertools
+import time
+from typing import Any, Dict, Iterator, List
+
+
+class StubEC2:
+    def __init__(self, latency: float = 0.02, provision_latency: float | None = None):
+        self.latency = latency
+        self.provision_latency = latency if provision_latency is None else provision_latency
+        self.calls = 0
+        self._seq = itertools.count(1)
+
+    def run_instances(self, **kwargs) -> Dict:
+        self.calls += 1
+        time.sleep(self.provision_latency)
+        return {"Instances": [{"InstanceId": f"i-{next(self._seq):017x}", "State": {"Name": "pending"}}]}
+
+    def terminate_instances(self, InstanceIds: List[str]) -> Dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        return {"TerminatingInstances": [{"InstanceId": i} for i in InstanceIds]}
+
+    def describe_instances(self, InstanceIds: List[str]) -> Dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        return {
+            "Reservations": [
+                {"Instances": [{"InstanceId": i, "State": {"Name": "running"}} for i in InstanceIds]}
+            ]
+        }
+
+
+class StubDynamoDB:
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.calls = 0
+
+    def describe_table(self, TableName: str) -> Dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        return {"Table": {"TableName": TableName, "TableStatus": "ACTIVE"}}
+
+
+class StubCloudWatch:
+    """get_metric_data (through its paginator, as app.aws.metrics uses it) with a value per period."""
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.calls = 0
+
+    def get_metric_data(self, MetricDataQueries: List[Dict], StartTime, EndTime, **kwargs: Any) -> Dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        results = []
+        for n, q in enumerate(MetricDataQueries):
+            period = q["MetricStat"]["Period"]
+            first = int(StartTime.timestamp()) // period * period + period
+            stamps = [StartTime.fromtimestamp(t, StartTime.tzinfo) for t in range(first, int(EndTime.timestamp()), period)]
+            results.append({
+                "Id": q["Id"],
+                "Timestamps": stamps,
+                "Values": [float((i * 7 + n * 13) % 100) for i in range(len(stamps))],
+            })
+        return {"MetricDataResults": results}
+
+    def get_paginator(self, operation_name: str) -> "_Paginator":
+        return _Paginator(getattr(self, operation_name))
+
+
+class _Paginator:
+    def __init__(self, call):
+        self._call = call
+
+    def paginate(self, **kwargs: Any) -> Iterator[Dict]:
+        yield self._call(**kwargs)
+
+
+class FailingEC2:
+    """describe_instances that takes `latency` seconds and then raises `error`."""
+
+    def __init__(self, error: Exception, latency: float = 0.2):
+        self.error = error
+        self.latency = latency
+        self.calls = 0
+
+    def describe_instances(self, InstanceIds: List[str]) -> Dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        raise self.error
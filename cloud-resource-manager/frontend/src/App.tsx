@@ -1,6 +1,6 @@
 // App.tsx
 
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 
 import Layout from "./components/Layout";
 import Auth from "./components/Auth";
@@ -18,10 +18,14 @@ import {
   fetchAlerts,
   fetchUsers,
   fetchLogs,
+  waitForJob,
   createResource,
   deleteResource,
   updateResource,
-  fetchMetrics,
+  fetchFleetMetrics,
+  fleetSeriesToPoints,
+  subscribeEvents,
+  ServerEvent,
 } from "./services/api";
 
 import { Alert, LogEntry, MetricData, Resource, User } from "./types";
@@ -53,6 +57,8 @@ function App() {
   const [users, setUsers] = useState<User[]>([]);
   const [logs, setLogs] = useState<LogEntry[]>([]);
   const [metrics, setMetrics] = useState<MetricData[]>([]);
+  // VM whose chart is shown; live metric points for it are appended
+  const metricsResourceId = useRef<number | null>(null);
 
   const [currentUser, setCurrentUser] = useState<User | null>(null);
 
@@ -113,6 +119,68 @@ function App() {
     loadAll();
   }, [isAuthenticated]);
 
+  // ---------- Live updates: one event stream instead of polling ----------
+  useEffect(() => {
+    if (!isAuthenticated) return;
+
+    const onEvent = ({ type, data }: ServerEvent) => {
+      switch (type) {
+        case "resource.created":
+          setResources((prev) =>
+            prev.some((r) => r.id === data.id) ? prev : [...prev, data]
+          );
+          break;
+        case "resource.updated":
+          setResources((prev) =>
+            prev.map((r) => (r.id === data.id ? { ...r, ...data } : r))
+          );
+          break;
+        case "resource.deleted":
+          setResources((prev) => prev.filter((r) => r.id !== data.id));
+          break;
+        case "alert.opened":
+          setAlerts((prev) => [data, ...prev.filter((a) => a.id !== data.id)]);
+          break;
+        case "alert.resolved":
+          setAlerts((prev) => prev.filter((a) => a.id !== data.id));
+          break;
+        case "metrics.points": {
+          const shown = metricsResourceId.current;
+          const p = shown !== null ? data.points[String(shown)] : undefined;
+          if (!p) break;
+          // same naive-UTC format as the fleet endpoint's timestamps
+          const time = new Date(p.ts * 1000).toISOString().slice(0, 19);
+          setMetrics((prev) =>
+            prev.some((m) => m.time === time)
+              ? prev
+              : [
+                  ...prev,
+                  {
+                    time,
+                    cpu: p.cpu ?? 0,
+                    memory: p.memory ?? 0,
+                    networkIn: p.networkIn ?? 0,
+                    networkOut: p.networkOut ?? 0,
+                  },
+                ]
+          );
+          break;
+        }
+        case "reset":
+          // missed events: resync once
+          Promise.all([fetchResources(), fetchAlerts()])
+            .then(([resList, alertList]) => {
+              setResources(resList || []);
+              setAlerts(alertList || []);
+            })
+            .catch(console.error);
+          break;
+      }
+    };
+
+    return subscribeEvents(onEvent);
+  }, [isAuthenticated]);
+
   // ---------- Effective user info based on loggedInRole ----------
   const effectiveRole: UserRole = loggedInRole || "Admin";
 
@@ -139,32 +207,42 @@ function App() {
   const currentRole: UserRole = effectiveRole;
 
   // ---------- Metrics: when Monitoring tab opens ----------
+  // (new points then arrive on the event stream; refetch only when the VM set changes)
+  const vmIds = resources
+    .filter((r) => r.type === "VM")
+    .map((r) => r.id)
+    .join(",");
+
   useEffect(() => {
     const loadMetrics = async () => {
       if (!isAuthenticated) return;
       if (activeTab !== "monitoring") return;
 
-      const firstVm = resources.find(
+      const vms = resources.filter(
         (r) =>
           r.type === "VM" &&
           (r.provider === "AWS" ||
             r.provider === "GCP" ||
             r.provider === "Azure")
       );
-      if (!firstVm) {
+      if (vms.length === 0) {
         setMetrics([]);
+        metricsResourceId.current = null;
         return;
       }
       try {
-        const data = await fetchMetrics(firstVm.id);
-        setMetrics(data || []);
+        // whole fleet in one request; chart the first VM that has data
+        const fleet = await fetchFleetMetrics(vms.map((r) => r.id));
+        const shown = vms.find((r) => fleet.series[String(r.id)]) ?? vms[0];
+        setMetrics(fleetSeriesToPoints(fleet, shown.id));
+        metricsResourceId.current = shown.id;
       } catch (e) {
         console.error(e);
       }
     };
 
     loadMetrics();
-  }, [activeTab, resources, isAuthenticated]);
+  }, [activeTab, vmIds, isAuthenticated]);
 
   // ---------- Auth ----------
   const handleLogin = (role: UserRole) => {
@@ -181,6 +259,7 @@ function App() {
     setUsers([]);
     setLogs([]);
     setMetrics([]);
+    metricsResourceId.current = null;
     setCurrentUser(null);
     setActiveTab("dashboard");
   };
@@ -221,8 +300,19 @@ function App() {
     }
 
     try {
-      const created = await createResource(data);
+      const { jobId, ...created } = await createResource(data);
       setResources((prev) => [...prev, created]);
+      setIsCreateOpen(false);
+      setLockedType(null);
+
+      // provisioning finishes in the background; swap in the final row when it does
+      const job = await waitForJob(jobId);
+      if (job.resource) {
+        setResources((prev) => prev.map((r) => (r.id === job.resource.id ? job.resource : r)));
+      }
+      if (job.status === "failed") {
+        alert(`Failed to create resource: ${job.error ?? "unknown error"}`);
+      }
 
       const logList = await fetchLogs();
       setLogs(logList || []);
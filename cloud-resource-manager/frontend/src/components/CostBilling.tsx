@@ -1,5 +1,6 @@
-import React from "react";
-import { Resource } from "../types";
+import React, { useEffect, useState } from "react";
+import { CostSummary, Resource } from "../types";
+import { fetchCostSummary } from "../services/api";
 import {
   ResponsiveContainer,
   BarChart,
@@ -19,15 +20,19 @@ const CostBilling: React.FC<Props> = ({ resources }) => {
   const inr = (n: number) =>
     `₹${n.toLocaleString("en-IN", { maximumFractionDigits: 0 })}`;
 
-  const totalMonthly = resources.reduce(
-    (sum, r) => sum + (r.costPerMonth || 0),
-    0
-  );
+  // totals come pre-aggregated from /costs/summary; the list is only needed for the top-5
+  const [summary, setSummary] = useState<CostSummary | null>(null);
+  useEffect(() => {
+    fetchCostSummary()
+      .then(setSummary)
+      .catch((e) => console.error(e));
+  }, [resources]);
+
+  const totalMonthly = summary?.totalMonthly ?? 0;
 
   const byProvider: Record<string, number> = {};
-  resources.forEach((r) => {
-    byProvider[r.provider] =
-      (byProvider[r.provider] || 0) + (r.costPerMonth || 0);
+  Object.entries(summary?.byProvider ?? {}).forEach(([prov, b]) => {
+    byProvider[prov] = b.monthly;
   });
 
   const providerCostData = Object.keys(byProvider).map((prov) => ({
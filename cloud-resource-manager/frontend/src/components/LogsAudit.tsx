@@ -1,13 +1,37 @@
-import React from "react";
+import React, { useEffect, useState } from "react";
 import { LogEntry } from "../types";
 import { Filter, Search } from "lucide-react";
+import { search } from "../services/api";
 
 interface Props {
   logs: LogEntry[];
 }
 
 const LogsAudit: React.FC<Props> = ({ logs }) => {
-  const hasLogs = logs && logs.length > 0;
+  const [query, setQuery] = useState("");
+  const [results, setResults] = useState<LogEntry[] | null>(null);
+
+  // Search the server-side index once typing pauses; an empty box shows the latest logs
+  useEffect(() => {
+    const q = query.trim();
+    if (!q) {
+      setResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      search(q, "logs", 200)
+        .then((data) => !cancelled && setResults(data.logs))
+        .catch((err) => console.error("Log search failed", err));
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query]);
+
+  const shown = results ?? logs;
+  const hasLogs = shown && shown.length > 0;
 
   return (
     <div className="space-y-4">
@@ -26,7 +50,9 @@ const LogsAudit: React.FC<Props> = ({ logs }) => {
           <Search className="h-4 w-4 text-slate-400 dark:text-slate-500" />
           <input
             className="w-full border-none bg-transparent text-sm text-slate-700 focus:outline-none dark:text-slate-100 placeholder:text-slate-400 dark:placeholder:text-slate-500"
-            placeholder="Search by user, resource, or action… (UI only)"
+            placeholder="Search by user, action, status or details… (e.g. user:admin delete)"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
           />
         </div>
         <button className="inline-flex items-center gap-1 rounded-lg border border-slate-200 px-3 py-1.5 text-xs font-medium text-slate-600 hover:bg-slate-50 dark:border-slate-700 dark:text-slate-300 dark:hover:bg-slate-800">
@@ -41,8 +67,9 @@ const LogsAudit: React.FC<Props> = ({ logs }) => {
       <div className="overflow-hidden rounded-xl border border-slate-200 bg-white shadow-sm dark:border-slate-700 dark:bg-slate-900">
         {!hasLogs ? (
           <div className="px-6 py-10 text-center text-sm text-slate-500 dark:text-slate-400">
-            No actions recorded yet. Create or delete some resources to see logs
-            here.
+            {results
+              ? "No log entries match this search."
+              : "No actions recorded yet. Create or delete some resources to see logs here."}
           </div>
         ) : (
           <table className="min-w-full divide-y divide-slate-200 text-sm dark:divide-slate-700">
@@ -69,7 +96,7 @@ const LogsAudit: React.FC<Props> = ({ logs }) => {
               </tr>
             </thead>
             <tbody className="divide-y divide-slate-100 dark:divide-slate-800">
-              {logs.map((log) => (
+              {shown.map((log) => (
                 <tr
                   key={log.id}
                   className="hover:bg-slate-50 dark:hover:bg-slate-800/60"
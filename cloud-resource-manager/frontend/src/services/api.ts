@@ -1,4 +1,6 @@
 // API client for backend
+import { FleetMetrics, MetricData } from "../types";
+
 const API_BASE = import.meta.env.VITE_API_BASE ??
   (window.location.hostname.includes("vercel.app")
     ? "https://cloud-resource-manager.onrender.com"
@@ -6,20 +8,56 @@ const API_BASE = import.meta.env.VITE_API_BASE ??
 
 const BASE_URL = "http://127.0.0.1:8000";
 
+// /resources and /logs are paged; the next page's cursor comes back in X-Next-Cursor.
+async function fetchAllPages(path: string, pageSize = 500) {
+  const items: any[] = [];
+  let cursor: string | null = null;
+  do {
+    const params = new URLSearchParams({ limit: String(pageSize) });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${API_BASE}${path}?${params}`);
+    items.push(...(await res.json()));
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return items;
+}
+
 export async function fetchResources() {
-  const res = await fetch(`${API_BASE}/resources`);
-  return res.json();
+  return fetchAllPages("/resources");
 }
 
+// Returns 202 with the "Creating" resource and a jobId; provisioning runs in the background.
 export async function createResource(payload: any) {
   const res = await fetch(`${API_BASE}/resources`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: {
+      "Content-Type": "application/json",
+      "Idempotency-Key": crypto.randomUUID(),
+    },
     body: JSON.stringify(payload),
   });
   return res.json();
 }
 
+export async function fetchJob(jobId: string) {
+  const res = await fetch(`${API_BASE}/jobs/${jobId}`);
+  if (!res.ok) {
+    throw new Error(`Failed to fetch job: ${res.status}`);
+  }
+  return res.json();
+}
+
+// Poll a job until it succeeds, fails or is cancelled; resolves with the final job.
+export async function waitForJob(jobId: string, intervalMs = 1000, timeoutMs = 120000) {
+  const deadline = Date.now() + timeoutMs;
+  for (;;) {
+    const job = await fetchJob(jobId);
+    if (job.status === "succeeded" || job.status === "failed" || job.status === "cancelled") return job;
+    if (Date.now() > deadline) throw new Error(`Job ${jobId} did not finish in time`);
+    await new Promise((r) => setTimeout(r, intervalMs));
+  }
+}
+
 export async function updateResource(id: number, payload: any) {
   const res = await fetch(`${API_BASE}/resources/${id}`, {
     method: "PUT",
@@ -35,18 +73,68 @@ export async function deleteResource(id: number) {
   });
 }
 
+// Bulk variants: one request, per-item results in request order.
+export async function createResourcesBatch(payloads: any[]) {
+  const res = await fetch(`${API_BASE}/resources:batch`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      "Idempotency-Key": crypto.randomUUID(),
+    },
+    body: JSON.stringify(payloads),
+  });
+  return res.json();
+}
+
+export async function updateResourcesBatch(updates: any[]) {
+  const res = await fetch(`${API_BASE}/resources:batch`, {
+    method: "PUT",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(updates),
+  });
+  return res.json();
+}
+
+export async function deleteResourcesBatch(ids: number[]) {
+  const res = await fetch(`${API_BASE}/resources:batch`, {
+    method: "DELETE",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(ids),
+  });
+  return res.json();
+}
+
 export async function fetchAlerts() {
   const res = await fetch(`${API_BASE}/alerts`);
   return res.json();
 }
 
+export async function fetchCostSummary() {
+  const res = await fetch(`${API_BASE}/costs/summary`);
+  if (!res.ok) {
+    throw new Error(`Failed to fetch cost summary: ${res.status}`);
+  }
+  return res.json();
+}
+
 export async function fetchUsers() {
   const res = await fetch(`${API_BASE}/users`);
   return res.json();
 }
 
-export async function fetchLogs() {
-  const res = await fetch(`${API_BASE}/logs`);
+// Newest entries only; older pages can be loaded with the X-Next-Cursor header.
+export async function fetchLogs(limit = 500) {
+  const res = await fetch(`${API_BASE}/logs?limit=${limit}`);
+  return res.json();
+}
+
+// Full-text search; words match as prefixes, "field:word" narrows to one field.
+export async function search(q: string, kind: "all" | "resources" | "logs" = "all", limit = 50) {
+  const params = new URLSearchParams({ q, kind, limit: String(limit) });
+  const res = await fetch(`${API_BASE}/search?${params}`);
+  if (!res.ok) {
+    throw new Error(`Search failed: ${res.status}`);
+  }
   return res.json();
 }
 
@@ -57,3 +145,58 @@ export async function fetchMetrics(resourceId: number) {
   }
   return res.json();
 }
+
+// Metrics for many resources in one request (columns on a shared time axis).
+export async function fetchFleetMetrics(ids: number[]) {
+  const res = await fetch(`${API_BASE}/metrics/fleet?ids=${ids.join(",")}`);
+  if (!res.ok) {
+    throw new Error(`Failed to fetch fleet metrics: ${res.status}`);
+  }
+  return res.json();
+}
+
+export type ServerEvent = { type: string; data: any };
+
+// One long-lived Server-Sent Events connection carrying committed changes
+// (resource.*, alert.*, metrics.points). EventSource reconnects on its own
+// and resumes from the last event id; "reset" means events were missed and
+// the caller should refetch. Returns a function that closes the stream.
+export function subscribeEvents(
+  onEvent: (ev: ServerEvent) => void,
+  topics: string[] = ["resource", "alert", "metrics"]
+) {
+  const source = new EventSource(`${API_BASE}/events?topics=${topics.join(",")}`);
+  const types = [
+    "resource.created",
+    "resource.updated",
+    "resource.deleted",
+    "alert.opened",
+    "alert.resolved",
+    "metrics.points",
+    "reset",
+  ];
+  for (const type of types) {
+    source.addEventListener(type, (e) => {
+      onEvent({ type, data: JSON.parse((e as MessageEvent).data) });
+    });
+  }
+  return () => source.close();
+}
+
+// Turn one resource's fleet columns back into chart points, skipping empty slots.
+export function fleetSeriesToPoints(fleet: FleetMetrics, id: number): MetricData[] {
+  const s = fleet.series[String(id)];
+  if (!s) return [];
+  const points: MetricData[] = [];
+  fleet.timestamps.forEach((time, i) => {
+    if (s.cpu[i] === null && s.networkIn[i] === null && s.networkOut[i] === null) return;
+    points.push({
+      time,
+      cpu: s.cpu[i] ?? 0,
+      memory: s.memory[i] ?? 0,
+      networkIn: s.networkIn[i] ?? 0,
+      networkOut: s.networkOut[i] ?? 0,
+    });
+  });
+  return points;
+}
@@ -12,13 +12,18 @@ export interface Resource {
   costPerMonth: number;
   uptime?: number;
   tags?: string[];
+  lastRefreshedAt?: string | null;
 }
 
 export interface Alert {
   id: string;
   title: string;
   severity: string;
-  time: string;
+  time: string; // first seen
+  rule?: string;
+  resourceId?: number | null;
+  lastSeen?: string;
+  occurrences?: number;
 }
 
 export type UserRole = "Admin" | "Developer" | "Viewer";
@@ -50,3 +55,34 @@ export interface MetricData {
   networkIn: number;
   networkOut: number;
 }
+
+// /metrics/fleet: one shared time axis, columns per resource (null = no point)
+export interface FleetSeries {
+  source: "cloudwatch" | "mock";
+  cpu: (number | null)[];
+  memory: (number | null)[];
+  networkIn: (number | null)[];
+  networkOut: (number | null)[];
+}
+
+export interface FleetMetrics {
+  period: number;
+  timestamps: string[];
+  series: Record<string, FleetSeries>;
+  missing: number[];
+}
+
+export interface CostBucket {
+  monthly: number;
+  resources: number;
+}
+
+export interface CostSummary {
+  currency: string;
+  totalMonthly: number;
+  resources: number;
+  byProvider: Record<string, CostBucket>;
+  byRegion: Record<string, CostBucket>;
+  byType: Record<string, CostBucket>;
+  byTag: Record<string, CostBucket>;
+}